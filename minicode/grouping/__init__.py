@@ -0,0 +1,11 @@
+# Persona grouping for the small-repos setup
+"""
+Similarity and clustering of persona repositories by their TASK.md files,
+used by setup_repos to split each library's personas into groups.
+
+These tools provide:
+- A batched, multithreaded TASK.md similarity matrix
+- Approximate top-k TF-IDF neighbour graphs and connectivity-constrained clustering
+- Average-linkage clustering and cohesion ranking on condensed distances
+- A persistent, content-hash keyed similarity cache with incremental updates
+"""
@@ -0,0 +1,146 @@
+"""
+Persistent cache of TASK.md pair similarities.
+
+Pair similarities are stored on disk keyed by the content hashes of the two
+TASK.md files, so rerunning setup (or trying another num_groups) reuses
+every pair already scored, and a new persona only costs its own row against
+the others. The four-scorer average is symmetric, so a pair is stored once,
+whatever order the personas are listed in.
+
+The cache is one .npz file:
+
+    hashes     the content hashes (sha256, hex), one per id
+    keys       uint64, sorted; a pair of ids (lower id in the high 32 bits)
+    scores     float32 averaged similarity of each pair (multiples of 0.25)
+    last_used  uint32, the run that last read or wrote each pair
+
+When it holds more than `max_pairs` pairs, the least recently used are
+evicted on save, and hashes no pair refers to any more are dropped.
+"""
+
+import hashlib
+import os
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from minicode.grouping.similarity import pair_scores
+
+DEFAULT_MAX_PAIRS = 20_000_000
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _pair_keys(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    low, high = np.minimum(a, b).astype(np.uint64), np.maximum(a, b).astype(np.uint64)
+    return (low << np.uint64(32)) | high
+
+
+class SimilarityCache:
+    """TASK.md pair similarities keyed by content hash.
+
+    Args:
+        path: .npz file to load from and save to (None keeps the cache in memory)
+        max_pairs: Pairs kept on save; the least recently used beyond this are evicted
+    """
+
+    def __init__(self, path: Optional[str] = None, max_pairs: int = DEFAULT_MAX_PAIRS):
+        self.path = path
+        self.max_pairs = max_pairs
+        self.hashes: List[str] = []
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.scores = np.empty(0, dtype=np.float32)
+        self.last_used = np.empty(0, dtype=np.uint32)
+        self.run = 1
+        if path is not None and os.path.exists(path):
+            with np.load(path, allow_pickle=False) as data:
+                self.hashes = data["hashes"].tolist()
+                self.keys, self.scores, self.last_used = data["keys"], data["scores"], data["last_used"]
+            self.run = int(self.last_used.max(initial=0)) + 1
+            print(f"Loaded {len(self.keys)} cached similarities from {path}")
+        self._ids: Dict[str, int] = {h: i for i, h in enumerate(self.hashes)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _id(self, digest: str) -> int:
+        if digest not in self._ids:
+            self._ids[digest] = len(self.hashes)
+            self.hashes.append(digest)
+        return self._ids[digest]
+
+    def _insert(self, keys: np.ndarray, scores: np.ndarray):
+        keys, first = np.unique(keys, return_index=True)
+        order = np.argsort(np.concatenate([self.keys, keys]), kind="stable")
+        self.keys = np.concatenate([self.keys, keys])[order]
+        self.scores = np.concatenate([self.scores, scores[first].astype(np.float32)])[order]
+        self.last_used = np.concatenate([self.last_used, np.full(len(keys), self.run, dtype=np.uint32)])[order]
+
+    def condensed(
+        self, task_strings: Sequence[str], workers: Optional[int] = None, block_size: int = 64
+    ) -> np.ndarray:
+        """Averaged four-scorer similarity of every pair i < j (scipy's condensed order), scoring only uncached pairs."""
+        n = len(task_strings)
+        ids = np.array([self._id(content_hash(s)) for s in task_strings], dtype=np.uint64)
+        i, j = np.triu_indices(n, k=1)
+        keys = _pair_keys(ids[i], ids[j])
+
+        position = np.searchsorted(self.keys, keys)
+        found = position < len(self.keys)
+        found[found] = self.keys[position[found]] == keys[found]
+        condensed = np.zeros(len(keys))
+        condensed[found] = self.scores[position[found]]
+        self.last_used[position[found]] = self.run
+
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            # score each persona with uncached pairs against the others it is missing, a block of rows at a time
+            missing_i, missing_j = i[missing], j[missing]
+            rows = np.unique(missing_i)
+            print(f"Scoring {len(missing)} uncached pairs ({len(keys) - len(missing)} cached)")
+            for start in range(0, len(rows), block_size):
+                block = rows[start : start + block_size]
+                in_block = np.isin(missing_i, block)
+                others = np.unique(missing_j[in_block])
+                scores = pair_scores([task_strings[r] for r in block], [task_strings[c] for c in others], workers)
+                row_index = np.searchsorted(block, missing_i[in_block])
+                col_index = np.searchsorted(others, missing_j[in_block])
+                condensed[missing[in_block]] = scores[row_index, col_index]
+            self._insert(keys[missing], condensed[missing])
+        return condensed
+
+    def save(self):
+        """Write the cache (atomically), evicting the least recently used pairs beyond `max_pairs`."""
+        if self.path is None:
+            return
+        keep = np.arange(len(self.keys))
+        if len(keep) > self.max_pairs:
+            newest = np.argsort(self.last_used, kind="stable")[-self.max_pairs :]
+            keep = np.sort(newest)
+            print(f"Evicting {len(self.keys) - len(keep)} least recently used similarities")
+        keys = self.keys[keep]
+
+        # renumber the hashes still referenced; keys stay sorted since ids keep their order
+        low, high = (keys >> np.uint64(32)).astype(np.int64), (keys & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        referenced = np.unique(np.concatenate([low, high]))
+        renumber = np.zeros(len(self.hashes), dtype=np.uint64)
+        renumber[referenced] = np.arange(len(referenced), dtype=np.uint64)
+        keys = _pair_keys(renumber[low], renumber[high])
+
+        self.hashes = [self.hashes[h] for h in referenced]
+        self._ids = {h: i for i, h in enumerate(self.hashes)}
+        self.keys, self.scores, self.last_used = keys, self.scores[keep], self.last_used[keep]
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(
+                f,
+                hashes=np.array(self.hashes, dtype="U64"),
+                keys=self.keys,
+                scores=self.scores,
+                last_used=self.last_used,
+            )
+        os.replace(tmp_path, self.path)
+        print(f"Saved {len(keys)} similarities to {self.path}")
@@ -0,0 +1,59 @@
+"""
+Average-linkage clustering and cluster ranking on condensed distances.
+
+The exact persona distances are kept in scipy's condensed form (the
+n(n-1)/2 pairs i < j), which is what average linkage consumes, so no
+n x n matrix is built. Clusters are ranked by their mean pairwise distance,
+gathered for all pairs of a cluster at once.
+"""
+
+from typing import List, Sequence
+
+import numpy as np
+from scipy.cluster.hierarchy import cut_tree, linkage
+from scipy.spatial.distance import num_obs_y
+
+from minicode.grouping.neighbors import NeighborGraph
+
+
+def condensed_index(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """Positions of pairs (i, j), i < j, in a condensed distance vector of n observations."""
+    return n * i - i * (i + 1) // 2 + (j - i - 1)
+
+
+def average_linkage_clusters(condensed: np.ndarray, num_clusters: int) -> List[List[int]]:
+    """Indices of each cluster of an average-linkage (UPGMA) tree cut into `num_clusters`.
+
+    Same tree and cut as AgglomerativeClustering(metric="precomputed", linkage="average"),
+    which also runs scipy's linkage on the condensed upper triangle.
+    """
+    labels = cut_tree(linkage(condensed, method="average"), n_clusters=num_clusters).ravel()
+    clusters: List[List[int]] = [[] for _ in range(num_clusters)]
+    for idx, label in enumerate(labels):
+        clusters[label].append(idx)
+    return clusters
+
+
+def mean_pair_distance(cluster: Sequence[int], distances) -> float:
+    """Mean distance over a cluster's pairs (inf for singletons).
+
+    Args:
+        cluster: Observation indices
+        distances: Condensed distances, a square distance matrix, or a NeighborGraph
+    """
+    if len(cluster) < 2:
+        return float("inf")
+    if isinstance(distances, NeighborGraph):
+        return distances.mean_distance(cluster)
+    index = np.sort(np.asarray(cluster))
+    i, j = np.triu_indices(len(index), k=1)
+    distances = np.asarray(distances)
+    if distances.ndim == 2:
+        return float(distances[index[i], index[j]].mean())
+    return float(distances[condensed_index(num_obs_y(distances), index[i], index[j])].mean())
+
+
+def rank_clusters(clusters: Sequence[List[int]], distances) -> List[List[int]]:
+    """Clusters from most to least cohesive (lowest mean pairwise distance first)."""
+    avg_dists = [mean_pair_distance(cluster, distances) for cluster in clusters]
+    return [cluster for (_, cluster) in sorted(zip(avg_dists, clusters))]
@@ -0,0 +1,116 @@
+"""
+Approximate persona similarity for large libraries.
+
+The exact similarity needs a dense n x n matrix. Here TASK.md files are
+TF-IDF vectorized (character n-grams, so near-duplicate wording still
+matches, as with the fuzzy scorers) and only each persona's top-k most
+similar personas are kept, as a sparse symmetric graph. The graph is the
+connectivity constraint of an average-linkage clustering over a low-rank
+(LSA) projection of the vectors, so memory stays O(n*k + n*d).
+
+Similarities are cosine similarities scaled to 0-100, so `100 - similarity`
+is on the same scale as the exact fuzzy distances.
+"""
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+DEFAULT_NEIGHBORS = 15
+# dimensions of the projection the clustering runs on
+LSA_COMPONENTS = 128
+# rows of the similarity product held densely at a time
+BLOCK_SIZE = 128
+
+
+def tfidf_vectors(task_strings: Sequence[str]) -> sparse.csr_matrix:
+    """L2-normalized TF-IDF vectors of character 3-5-grams (within word boundaries)."""
+    vectorizer = TfidfVectorizer(analyzer="char_wb", ngram_range=(3, 5), sublinear_tf=True, lowercase=True)
+    try:
+        return vectorizer.fit_transform(task_strings).tocsr()
+    except ValueError:
+        # no n-grams at all (empty or tiny TASK.md files)
+        return sparse.csr_matrix((len(task_strings), 1))
+
+
+def top_k_neighbors(vectors: sparse.csr_matrix, k: int = DEFAULT_NEIGHBORS, block_size: int = BLOCK_SIZE):
+    """Symmetric sparse graph of each row's k most similar other rows (cosine similarity x 100)."""
+    n = vectors.shape[0]
+    k = min(k, n - 1)
+    rows, cols, values = [], [], []
+    if k > 0:
+        for start in range(0, n, block_size):
+            end = min(start + block_size, n)
+            block = (vectors[start:end] @ vectors.T).toarray()
+            block[np.arange(end - start), np.arange(start, end)] = -np.inf  # never your own neighbour
+            top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+            rows.append(np.repeat(np.arange(start, end), k))
+            cols.append(top.ravel())
+            values.append(np.take_along_axis(block, top, axis=1).ravel())
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    cols = np.concatenate(cols) if cols else np.empty(0, dtype=np.int64)
+    values = np.clip(np.concatenate(values) if values else np.empty(0), 0, 1) * 100
+    graph = sparse.csr_matrix((values, (rows, cols)), shape=(n, n))
+    # a neighbour relation in either direction is an edge
+    return graph.maximum(graph.T).tocsr()
+
+
+def lsa_vectors(vectors: sparse.csr_matrix, components: int = LSA_COMPONENTS) -> np.ndarray:
+    """Unit-length low-rank projection of the TF-IDF vectors."""
+    components = min(components, vectors.shape[0] - 1, vectors.shape[1] - 1)
+    if components < 2:
+        dense = vectors.toarray()
+    else:
+        dense = TruncatedSVD(n_components=components, random_state=0).fit_transform(vectors)
+    return normalize(dense)
+
+
+class NeighborGraph:
+    """Top-k TF-IDF similarity graph of a library's personas.
+
+    Args:
+        task_strings: TASK.md contents
+        n_neighbors: Neighbours kept per persona
+    """
+
+    def __init__(self, task_strings: Sequence[str], n_neighbors: int = DEFAULT_NEIGHBORS):
+        vectors = tfidf_vectors(task_strings)
+        self.similarity = top_k_neighbors(vectors, n_neighbors)
+        self.vectors = lsa_vectors(vectors)
+
+    def __len__(self) -> int:
+        return self.similarity.shape[0]
+
+    def cluster(self, num_clusters: int) -> np.ndarray:
+        """Average-linkage cluster labels, merging only along (or, between components, across) graph edges.
+
+        The vectors have unit length (or are zero, for empty files), so euclidean
+        distance orders pairs as cosine distance does.
+        """
+        clusterer = AgglomerativeClustering(
+            n_clusters=num_clusters, metric="euclidean", linkage="average", connectivity=self.similarity
+        )
+        return clusterer.fit_predict(self.vectors)
+
+    def mean_distance(self, cluster: Sequence[int]) -> float:
+        """Average 100 - similarity over a cluster's pairs; pairs that are not neighbours count as 100."""
+        if len(cluster) < 2:
+            return float("inf")
+        index = np.asarray(cluster)
+        within = self.similarity[index][:, index].sum() / 2
+        return 100 - within / (len(index) * (len(index) - 1) / 2)
+
+
+def neighbor_clusters(task_strings: Sequence[str], num_clusters: int, n_neighbors: Optional[int] = None):
+    """(clusters as lists of indices, NeighborGraph) of the approximate clustering."""
+    graph = NeighborGraph(task_strings, n_neighbors or DEFAULT_NEIGHBORS)
+    labels = graph.cluster(num_clusters)
+    clusters: List[List[int]] = [[] for _ in range(num_clusters)]
+    for idx, label in enumerate(labels):
+        clusters[label].append(idx)
+    return clusters, graph
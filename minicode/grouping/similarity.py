@@ -0,0 +1,84 @@
+"""
+Batched TASK.md similarity.
+
+The similarity of two personas is the average of four thefuzz scores of
+their TASK.md files (ratio, partial_ratio, token_sort_ratio and
+token_set_ratio, each rounded to an int as thefuzz does). Rather than
+calling the four scorers once per pair from a process pool, each scorer
+runs over blocks of (preprocessed) strings with rapidfuzz's multithreaded
+cdist, the native batch form of the scorers thefuzz wraps.
+"""
+
+import os
+from typing import List, Optional, Sequence
+
+import numpy as np
+from rapidfuzz import fuzz, process
+from scipy.spatial.distance import squareform
+from thefuzz import utils
+
+# scorer, and whether thefuzz runs full_process (force_ascii=True) on its inputs first
+SCORERS = (
+    (fuzz.ratio, False),
+    (fuzz.partial_ratio, False),
+    (fuzz.token_sort_ratio, True),
+    (fuzz.token_set_ratio, True),
+)
+
+
+def read_task_strings(directory_paths: Sequence[str]) -> List[str]:
+    """TASK.md contents of each persona directory."""
+    task_strings = []
+    for path in directory_paths:
+        with open(os.path.join(path, "TASK.md"), "r", encoding="utf-8") as f:
+            task_strings.append(f.read())
+    return task_strings
+
+
+def preprocess(strings: Sequence[str]) -> List[str]:
+    """thefuzz's full_process with force_ascii, as applied by its token scorers."""
+    return [utils.full_process(s, force_ascii=True) for s in strings]
+
+
+def pair_scores(queries: Sequence[str], choices: Sequence[str], workers: Optional[int] = None) -> np.ndarray:
+    """len(queries) x len(choices) matrix of the averaged four-scorer similarity (0-100)."""
+    processed = {False: (queries, choices), True: (preprocess(queries), preprocess(choices))}
+    total = np.zeros((len(queries), len(choices)))
+    for scorer, full_process in SCORERS:
+        q, c = processed[full_process]
+        scores = process.cdist(q, c, scorer=scorer, dtype=np.float64, workers=workers or -1)
+        # thefuzz rounds each score to an int (round half to even, as np.round does)
+        total += np.round(scores)
+    return total / len(SCORERS)
+
+
+def condensed_similarity(
+    task_strings: Sequence[str], workers: Optional[int] = None, block_size: int = 64
+) -> np.ndarray:
+    """Averaged four-scorer similarity of every pair i < j, in scipy's condensed order.
+
+    Only these n(n-1)/2 pairs are scored, a block of rows at a time, each
+    with the lower index as the query (as the pairwise loop did); nothing
+    n x n is allocated.
+
+    Args:
+        task_strings: TASK.md contents
+        workers: Threads per scorer (defaults to all cores)
+        block_size: Rows scored per batch
+    """
+    n = len(task_strings)
+    condensed = np.zeros(n * (n - 1) // 2)
+    for start in range(0, n - 1, block_size):
+        end = min(start + block_size, n)
+        scores = pair_scores(task_strings[start:end], task_strings[start + 1 :], workers)
+        for i in range(start, end):
+            offset = i * n - i * (i + 1) // 2
+            condensed[offset : offset + n - i - 1] = scores[i - start, i - start :]
+    return condensed
+
+
+def similarity_matrix(task_strings: Sequence[str], workers: Optional[int] = None, block_size: int = 64) -> np.ndarray:
+    """Symmetric n x n averaged four-scorer similarity, with zeros on the diagonal."""
+    if not task_strings:
+        return np.zeros((0, 0))
+    return squareform(condensed_similarity(task_strings, workers, block_size))
@@ -0,0 +1,70 @@
+import argparse
+import os
+from pathlib import Path
+
+from minicode.scoring.attribution import attribute_programs, attribution_path, hot_spots, write_attribution
+from minicode.scoring.layouts import ClusterLayout, LargeRepoLayout
+from minicode.scoring.token_store import TokenLogprobs, token_store_path
+
+# Thin CLI over minicode.scoring.attribution: per-definition tokens, logprobs
+# and complexity of a scored repo or codecontests cluster, read from the run's
+# token store (.logprobs.npz) where it has the file.
+
+
+def programs_and_output(args):
+    """(program name, source file) pairs to attribute, and the metrics file of the run they belong to."""
+    if args.cluster_name:
+        cluster_dirs = (Path("codecontests") / args.cluster_name, Path("codecontests_original") / args.cluster_name)
+        layout = ClusterLayout(*cluster_dirs, None)
+        return list(layout.discover()), args.metrics_file or f"{args.cluster_name}_comparison_metrics.json"
+    layout = LargeRepoLayout(args.directory, None, skip_unified=args.skip_unified, condition_on_codebank=False)
+    metrics_file = args.metrics_file or os.path.join(args.directory, "LIBRARYBENCH_metrics.json")
+    return list(layout.programs().items()), metrics_file
+
+
+def main(args):
+    programs, metrics_file = programs_and_output(args)
+    store = None
+    if os.path.exists(token_store_path(metrics_file)):
+        store = TokenLogprobs.load(token_store_path(metrics_file))
+        print(f"Using token logprobs from {token_store_path(metrics_file)}")
+    else:
+        print(f"No token store next to {metrics_file}; counting tokens locally (no logprobs)")
+
+    report = attribute_programs(programs, store)
+    output_file = attribution_path(metrics_file)
+    write_attribution(output_file, report)
+
+    by = args.by if store is not None or args.by != "logprobs" else "tokens"
+    print(f"\n=== Top {args.top} definitions by {by} ===")
+    for row in hot_spots(report, top=args.top, by=by):
+        print(
+            f"{row['logprobs']:>12.2f} {row['tokens']:>8} {row['cyclomatic']:>5}  "
+            f"{row['program']}:{row['lineno'] or 1} {row['name']}"
+        )
+    print(f"\nWritten attribution to {output_file}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Attribute token and logprob costs to the definitions of files.")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--directory", type=str, help="repo directory scored by score_large_repos / score_small_repos")
+    target.add_argument("--cluster_name", type=str, help="codecontests cluster scored by score_codecontests")
+    parser.add_argument(
+        "--metrics_file",
+        type=str,
+        default=None,
+        help="metrics JSON of the run (defaults to the scorer's output for the directory or cluster)",
+    )
+    parser.add_argument("--skip_unified", action="store_true", default=False, help="skip the unified repo")
+    parser.add_argument("--top", type=int, default=20, help="number of definitions to list")
+    parser.add_argument(
+        "--by", choices=("logprobs", "tokens", "cyclomatic"), default="logprobs", help="cost to rank definitions by"
+    )
+    args = parser.parse_args()
+
+    main(args)
+
+# ---- Example usage ----
+# python -m minicode.score_attribution --directory large_repos/workflow_orchestration/unified
+# python -m minicode.score_attribution --cluster_name cluster0 --by tokens
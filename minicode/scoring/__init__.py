@@ -0,0 +1,21 @@
+# Shared scoring infrastructure
+"""
+The scoring engine behind score_codecontests, score_small_repos and
+score_large_repos, which are thin CLIs over a layout adapter each
+(ClusterLayout, SmallRepoLayout, LargeRepoLayout) run by ScoringEngine.
+
+These tools provide:
+- Rate-limited, adaptive scheduling of logprob requests
+- Resumable JSONL checkpoints of per-file results
+- Incremental rescoring from a git revision or file-hash manifest
+- Process-pool computation of static (radon) code metrics
+- A parse-once source cache (text, AST, imports, definitions)
+- A repository module/symbol index for deterministic import resolution
+- A cached, scandir-based index of each tree's Python files and packages, shared with setup
+- Transitive, symbol-sliced conditioning context
+- Bounded, streaming pipeline stages for the repo scorers
+- A shared tokenizer registry, Together client and metrics writer
+- A columnar per-file metrics table with Parquet output and compact summaries
+- A compact per-token logprob store for offline re-aggregation
+- Per-definition token, logprob and complexity attribution
+"""
@@ -0,0 +1,189 @@
+"""
+Per-definition token and logprob attribution.
+
+File totals do not say where the tokens (and bits) go. This stage maps each
+scored token back to the definition it falls in, giving one row per
+top-level function, class and method (plus "<module>" for top-level code)
+with its token count, summed logprob and cyclomatic complexity.
+
+Tokens and logprobs come from a run's token store when it has the file;
+otherwise the file is tokenized locally (token counts only, logprobs NaN).
+"""
+
+import ast
+import json
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from radon.visitors import ComplexityVisitor
+
+from minicode.scoring.token_store import TokenLogprobs
+from minicode.scoring.tokenizers import FALLBACK_ENCODING, get_encoding
+
+MODULE_ROW = "<module>"
+
+# characters of the code used to line it up with the scored token text
+_ANCHOR_CHARS = 64
+
+
+def attribution_path(output_file) -> str:
+    """Path of the attribution report that accompanies a metrics output file."""
+    root, _ = os.path.splitext(str(output_file))
+    return root + ".attribution.json"
+
+
+def _function_points(function) -> int:
+    return function.complexity - 1 + sum(_function_points(closure) for closure in function.closures)
+
+
+def _class_points(cls) -> int:
+    return sum(_function_points(method) for method in cls.methods) + sum(
+        _class_points(inner) for inner in cls.inner_classes
+    )
+
+
+def cyclomatic(statements: Sequence[ast.stmt]) -> int:
+    """McCabe complexity of a group of statements: 1 + radon's decision points, nested functions included."""
+    visitor = ComplexityVisitor.from_ast(ast.Module(body=list(statements), type_ignores=[]))
+    points = visitor.complexity - 1
+    points += sum(_function_points(function) for function in visitor.functions)
+    points += sum(_class_points(cls) for cls in visitor.classes)
+    return 1 + points
+
+
+def _first_line(node) -> int:
+    return min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+
+
+def definitions(tree: ast.Module) -> List[Tuple[str, str, List[ast.stmt], List[Tuple[int, int]]]]:
+    """(name, kind, own statements, line ranges) of the module, its top-level definitions and their methods."""
+    functions = (ast.FunctionDef, ast.AsyncFunctionDef)
+    module_statements, rows = [], []
+    for node in tree.body:
+        if isinstance(node, functions):
+            rows.append((node.name, "function", [node], [(_first_line(node), node.end_lineno)]))
+        elif isinstance(node, ast.ClassDef):
+            methods = [item for item in node.body if isinstance(item, functions)]
+            own = [item for item in node.body if not isinstance(item, functions)]
+            rows.append((node.name, "class", own, [(_first_line(node), node.end_lineno)]))
+            for method in methods:
+                span = [(_first_line(method), method.end_lineno)]
+                rows.append((f"{node.name}.{method.name}", "method", [method], span))
+        else:
+            module_statements.append(node)
+    return [(MODULE_ROW, "module", module_statements, [])] + rows
+
+
+def _line_labels(rows, num_lines: int) -> np.ndarray:
+    # later (inner) rows overwrite the lines of the rows that contain them
+    labels = np.zeros(num_lines + 2, dtype=np.int64)
+    for index, (_, _, _, ranges) in enumerate(rows):
+        for start, end in ranges:
+            labels[start : end + 1] = index
+    return labels
+
+
+def align(token_texts: Sequence[str], code: str) -> np.ndarray:
+    """Character offset within `code` of each token's first non-blank character.
+
+    The scored text can carry prompt markers around the code, or start a few
+    tokens inside it; a short anchor lines the two up.
+    """
+    lengths = np.array([len(text) for text in token_texts], dtype=np.int64)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]]) if len(lengths) else lengths
+    text = "".join(token_texts)
+    shift = text.find(code[:_ANCHOR_CHARS])
+    if shift < 0:
+        inside = code.find(text[:_ANCHOR_CHARS])
+        shift = -inside if inside >= 0 else 0
+    blank = np.array([len(t) - len(t.lstrip()) if t.strip() else 0 for t in token_texts], dtype=np.int64)
+    return starts + blank - shift
+
+
+def attribute(code: str, offsets: np.ndarray, logprobs: Optional[np.ndarray] = None) -> List[dict]:
+    """Rows of per-definition tokens, logprobs and complexity for one file.
+
+    Args:
+        code: File contents
+        offsets: Character offset in `code` of each scored token (outside [0, len(code)) is ignored)
+        logprobs: Logprob of each token, or None to report token counts only
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        tree = None
+    rows = definitions(tree) if tree is not None else [(MODULE_ROW, "module", None, [])]
+    line_starts = [0] + [i + 1 for i, char in enumerate(code) if char == "\n"]
+    labels = _line_labels(rows, len(line_starts))
+
+    inside = (offsets >= 0) & (offsets < len(code))
+    token_rows = labels[np.searchsorted(line_starts, offsets[inside], side="right")]
+    tokens = np.bincount(token_rows, minlength=len(rows))
+    if logprobs is not None:
+        weights = np.nan_to_num(np.asarray(logprobs, dtype=np.float64)[inside])
+        row_logprobs = np.bincount(token_rows, weights=weights, minlength=len(rows))
+    else:
+        row_logprobs = np.full(len(rows), np.nan)
+
+    result = []
+    for index, (name, kind, statements, ranges) in enumerate(rows):
+        result.append(
+            {
+                "name": name,
+                "kind": kind,
+                "lineno": ranges[0][0] if ranges else None,
+                "end_lineno": ranges[0][1] if ranges else None,
+                "tokens": int(tokens[index]),
+                "logprobs": float(row_logprobs[index]),
+                "cyclomatic": cyclomatic(statements) if statements is not None else float("nan"),
+            }
+        )
+    return result
+
+
+def scored_tokens(store: TokenLogprobs, program: str) -> Tuple[List[str], np.ndarray]:
+    """Scored (non-context) tokens and logprobs of a program's requests, in window order."""
+    texts, logprobs = [], []
+    for start, request_logprobs, request_tokens in store.requests(program):
+        texts.extend(request_tokens[start:])
+        logprobs.append(np.asarray(request_logprobs[start:], dtype=np.float64))
+    return texts, np.concatenate(logprobs) if logprobs else np.empty(0)
+
+
+def attribute_file(code: str, program: str, store: Optional[TokenLogprobs] = None) -> List[dict]:
+    """Attribution rows for a file, from the token store if it has the program, else from local tokens."""
+    if store is not None and program in store.programs:
+        texts, logprobs = scored_tokens(store, program)
+        return attribute(code, align(texts, code), logprobs)
+    enc = get_encoding(FALLBACK_ENCODING)
+    return attribute(code, align([enc.decode([token]) for token in enc.encode(code)], code))
+
+
+def attribute_programs(
+    programs: Iterable[Tuple[str, Path]], store: Optional[TokenLogprobs] = None
+) -> Dict[str, List[dict]]:
+    """Attribution rows of every (program name, source file) pair."""
+    report = {}
+    for program, path in programs:
+        try:
+            code = Path(path).read_text()
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"[WARN] Could not read {path}: {e}")
+            continue
+        report[program] = attribute_file(code, program, store)
+    return report
+
+
+def hot_spots(report: Dict[str, List[dict]], top: int = 20, by: str = "logprobs") -> List[dict]:
+    """The `top` definitions with the largest cost (most negative logprob, or most tokens / complexity)."""
+    rows = [{"program": program} | row for program, rows in report.items() for row in rows]
+    rows = [row for row in rows if not np.isnan(row[by])]
+    # logprobs are negative: the most expensive definitions have the lowest sums
+    return sorted(rows, key=lambda row: row[by], reverse=by != "logprobs")[:top]
+
+
+def write_attribution(path, report: Dict[str, List[dict]]):
+    with open(path, "w") as wf:
+        json.dump(report, wf, indent=1)
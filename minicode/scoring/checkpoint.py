@@ -0,0 +1,125 @@
+"""
+Append-only JSONL checkpoints for scoring runs.
+
+Each scored file is written as one JSON line as soon as it completes, so a
+crash or network failure only loses the files that were in flight. A resumed
+run reloads the checkpoint, skips the files already recorded, and rebuilds
+the final aggregate from the checkpoint rather than from memory. Records
+with an "error" field (files whose requests kept failing) are dropped on
+reload, so a resumed run retries those files.
+
+The file keeps full records, but while a run is going the in-memory copy
+replaces each file's `internal_imports` (the imported code segments it was
+conditioned on) with their count, which is all the summaries use, so a large
+run's context code is not held in memory until the end. full_records()
+re-reads the file for the metrics output, which keeps the imported code.
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterator, Optional
+
+ON_EXISTING_CHOICES = ("overwrite", "skip", "error")
+
+
+def checkpoint_path(output_file) -> str:
+    """Path of the checkpoint that accompanies a metrics output file."""
+    root, _ = os.path.splitext(str(output_file))
+    return root + ".checkpoint.jsonl"
+
+
+def should_run(output_file, on_existing: str, resume: bool) -> bool:
+    """Apply the non-interactive policy for an already-written metrics file.
+
+    Returns False when the run should be skipped. A resumed run always proceeds,
+    since the final output is rebuilt from its checkpoint.
+    """
+    if resume or not os.path.exists(output_file):
+        return True
+    if on_existing == "skip":
+        print(f"Metrics file {output_file} already exists, skipping")
+        return False
+    if on_existing == "error":
+        raise FileExistsError(f"Metrics file {output_file} already exists")
+    print(f"Metrics file {output_file} already exists, overwriting")
+    return True
+
+
+def _compact(record: Dict[str, Any]) -> Dict[str, Any]:
+    metrics = record.get("metrics")
+    if isinstance(metrics, dict) and isinstance(metrics.get("internal_imports"), list):
+        record = {**record, "metrics": {**metrics, "internal_imports": len(metrics["internal_imports"])}}
+    return record
+
+
+class Checkpoint:
+    """Per-file results keyed by program name, mirrored to a JSONL file.
+
+    Args:
+        path: JSONL file to append to; None keeps results in memory only
+        resume: Reload records from an existing file instead of truncating it
+    """
+
+    def __init__(self, path: Optional[str] = None, resume: bool = False):
+        self.path = path
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self._file = None
+        self._torn = False
+        if path is None:
+            return
+        if resume and os.path.exists(path):
+            self._load()
+            print(f"Resuming from {path}: {len(self.records)} files already scored")
+        self._file = open(path, "a" if resume else "w")
+        if resume and self._torn:
+            # terminate the torn line so the next record starts cleanly
+            self._file.write("\n")
+
+    def _read(self) -> Iterator[Dict[str, Any]]:
+        with open(self.path, "r") as f:
+            for line in f:
+                self._torn = not line.endswith("\n")
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # a torn final line from an interrupted write; that file is rescored
+                    continue
+
+    def _load(self):
+        for record in self._read():
+            if "error" in record:
+                # scoring this file failed; rescore it
+                self.records.pop(record["program"], None)
+                continue
+            self.records[record["program"]] = _compact(record)
+
+    def full_records(self) -> Dict[str, Dict[str, Any]]:
+        """`records` with each file's imported code segments, as written to the checkpoint file."""
+        if self.path is None:
+            return self.records
+        if self._file is not None:
+            self._file.flush()
+        latest = {record["program"]: record for record in self._read() if record["program"] in self.records}
+        return {program: latest.get(program, record) for program, record in self.records.items()}
+
+    def __contains__(self, program: str) -> bool:
+        return program in self.records
+
+    def append(self, program: str, **fields):
+        record = {"program": program, **fields}
+        # without a file there is nothing to re-read the full record from
+        self.records[program] = _compact(record) if self.path is not None else record
+        if self._file is not None:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,34 @@
+"""
+Together AI client shared by the scoring layouts.
+
+The client is created on first use, so importing a scorer (or running it
+without --enable_logprobs) does not need TOGETHER_API_KEY.
+"""
+
+import os
+from typing import List, Tuple
+
+from together import Together
+
+_client = None
+
+
+def get_client() -> Together:
+    global _client
+    if _client is None:
+        _client = Together(api_key=os.getenv("TOGETHER_API_KEY"))
+    return _client
+
+
+def echo_logprobs(text: str, model: str) -> Tuple[List[float], List[str]]:
+    """Prompt logprobs and tokens of `text`, without the leading (BOS) token."""
+    response = get_client().chat.completions.create(
+        model=model,
+        messages=[{"role": "user", "content": text}],
+        max_tokens=1,  # Only process the input
+        echo=True,  # Return input tokens and logprobs
+        logprobs=1,
+    )
+    logprobs = response.prompt[0].logprobs.token_logprobs[1:]
+    tokens = response.prompt[0].logprobs.tokens[1:]
+    return logprobs, tokens
@@ -0,0 +1,177 @@
+"""
+Scoring engine shared by every scorer.
+
+A Layout adapter says which files a directory layout scores, what context
+each one is conditioned on, how a file becomes logprob requests and how the
+responses become a result record. The engine does everything else, once for
+all layouts:
+
+    discover -> load + context -> static metrics -> requests -> score -> checkpoint
+
+(bounded read-ahead, the static-metrics process pool and the rate-limited
+request scheduler). Results land in a Checkpoint, keyed by the layout's
+program names. A file whose requests still fail after the scheduler's
+retries is recorded with NaN logprobs and tokens and an "error" field, and
+the run goes on; a resumed run scores it again.
+"""
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from minicode.scoring.checkpoint import Checkpoint
+from minicode.scoring.pipeline import DEFAULT_BUFFER_SIZE, bounded_map
+from minicode.scoring.scheduler import RequestFailed, RequestScheduler, ScheduledRequest
+from minicode.scoring.static_metrics import stream_code_metrics
+from minicode.scoring.token_store import TokenStore
+
+Response = Tuple[ScheduledRequest, Any]
+
+
+@dataclass
+class ScoringUnit:
+    """One file to score.
+
+    Attributes:
+        key: Program name; also the checkpoint key
+        path: Source file
+        code: Text the static metrics are computed on (None if unreadable)
+        context: Context segments the file is conditioned on
+        metrics: Static metrics to use instead of computing them from `code`
+        extra: Layout-specific state carried from load() to record()
+    """
+
+    key: str
+    path: Path
+    code: Optional[str] = None
+    context: List[str] = field(default_factory=list)
+    metrics: Optional[dict] = None
+    extra: Dict[str, Any] = field(default_factory=dict)
+
+
+class Layout:
+    """Adapter between a directory layout and the ScoringEngine.
+
+    Subclasses set `metrics_fn` (a picklable, module-level function) and
+    `enable_logprobs`, and implement the methods below. load() runs on the
+    engine's read-ahead thread; logprobs() runs on the scheduler's threads.
+    """
+
+    metrics_fn: Callable[[str], dict]
+    enable_logprobs: bool = False
+
+    def discover(self) -> Iterable[Tuple[str, Path]]:
+        """(program name, source file) pairs to score."""
+        raise NotImplementedError
+
+    def load(self, key: str, path: Path) -> Optional[ScoringUnit]:
+        """Read a file and its context; None skips it."""
+        raise NotImplementedError
+
+    def requests(self, unit: ScoringUnit, code_metrics: dict) -> List[ScheduledRequest]:
+        """Logprob requests for a unit; each request key must start with the unit key."""
+        raise NotImplementedError
+
+    def logprobs(self, text: str) -> Any:
+        """Score one request's text."""
+        raise NotImplementedError
+
+    def record(self, unit: ScoringUnit, code_metrics: dict, responses: List[Response]) -> dict:
+        """Checkpoint fields for a unit from its responses, in request order."""
+        raise NotImplementedError
+
+    def failed(self, unit: ScoringUnit, code_metrics: dict) -> dict:
+        """Checkpoint fields for a unit some of whose requests failed (the engine adds the error)."""
+        return {"logprobs": float("nan"), "tokens": float("nan"), "metrics": code_metrics}
+
+    def context_tokens(self, request: ScheduledRequest) -> int:
+        """Leading response tokens of a request that are context rather than scored code."""
+        return 0
+
+
+class ScoringEngine:
+    """Streams a layout's files through context, static metrics and rate-limited scoring.
+
+    Args:
+        requests_per_minute: Optional provider requests/minute limit
+        tokens_per_minute: Optional provider prompt tokens/minute limit
+        max_concurrency: Upper bound on in-flight logprob requests
+        processes: Worker processes for static metrics (defaults to all cores)
+        buffer_size: Files read ahead of scoring; also the scheduler's lookahead
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 8,
+        processes: Optional[int] = None,
+        buffer_size: int = DEFAULT_BUFFER_SIZE,
+    ):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.processes = processes
+        self.buffer_size = buffer_size
+
+    def run(self, layout: Layout, checkpoint: Checkpoint, token_store: Optional[TokenStore] = None) -> Checkpoint:
+        """Score every file of `layout` not already in `checkpoint`, appending a record per file.
+
+        With a `token_store`, the per-token (logprobs, tokens) responses are kept there as well.
+        """
+        todo = ((key, path) for key, path in layout.discover() if key not in checkpoint)
+        loaded = bounded_map(lambda item: layout.load(*item), todo, self.buffer_size)
+        units = (unit for unit in loaded if unit is not None)
+
+        # per-file state until all of its requests have been answered
+        pending: Dict[str, Tuple[ScoringUnit, dict, int, List[Response]]] = {}
+
+        failed: List[str] = []
+
+        def finish(unit: ScoringUnit, code_metrics: dict, responses: List[Response]):
+            errors = [str(response) for _, response in responses if isinstance(response, RequestFailed)]
+            if errors:
+                failed.append(unit.key)
+                checkpoint.append(unit.key, **layout.failed(unit, code_metrics), error="; ".join(errors))
+                print(f"[ERROR] Failed to score {unit.key}: {errors[0]}")
+                return
+            record = layout.record(unit, code_metrics, responses)
+            checkpoint.append(unit.key, **record)
+            if token_store is not None:
+                for window, (request, (logprobs, tokens)) in enumerate(responses):
+                    if tokens:
+                        token_store.add(unit.key, window, layout.context_tokens(request), logprobs, tokens)
+            print(f"Processed {unit.key}: logprob={record['logprobs']:.2f}, tokens={record['tokens']}")
+
+        def requests():
+            for unit, _, computed in stream_code_metrics(
+                ((unit, unit.code or "") for unit in units),
+                layout.metrics_fn,
+                processes=self.processes,
+                batch_size=self.buffer_size,
+            ):
+                code_metrics = unit.metrics if unit.metrics is not None else computed
+                unit_requests = layout.requests(unit, code_metrics)
+                if not unit_requests:
+                    finish(unit, code_metrics, [])
+                    continue
+                # register the whole file before any of its requests can complete
+                pending[unit.key] = (unit, code_metrics, len(unit_requests), [])
+                yield from unit_requests
+
+        # rate limits only matter when we actually call the API
+        scheduler = RequestScheduler(
+            layout.logprobs,
+            requests_per_minute=self.requests_per_minute if layout.enable_logprobs else None,
+            tokens_per_minute=self.tokens_per_minute if layout.enable_logprobs else None,
+            max_concurrency=self.max_concurrency,
+        )
+        for request, response in scheduler.map(requests(), lookahead=self.buffer_size):
+            unit, code_metrics, expected, responses = pending[request.key[0]]
+            responses.append((request, response))
+            if len(responses) == expected:
+                del pending[unit.key]
+                finish(unit, code_metrics, sorted(responses, key=lambda r: r[0].key))
+        if failed:
+            print(f"[WARN] {len(failed)} files failed to score and were recorded as NaN; rerun with --resume to retry")
+        return checkpoint
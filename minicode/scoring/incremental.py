@@ -0,0 +1,187 @@
+"""
+Incremental rescoring from a previous metrics file.
+
+Given the LIBRARYBENCH_metrics.json of an earlier run and either a git
+revision or a file-hash manifest, work out which files changed and which
+files import from a changed file (their context changed), and reuse the
+previous per-file results for everything else. Changes cover every Python
+file under the tree, scored or not, deleted files included; the manifest
+also records which files each program took context from, so importers of a
+deleted module are rescored too. The reused results are fed
+into the run's checkpoint, so totals are re-aggregated exactly as for a
+resumed run.
+"""
+
+import hashlib
+import json
+import math
+import os
+import subprocess
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from minicode.scoring.tree_index import tree_index
+
+
+def manifest_path(output_file) -> str:
+    """Path of the file-hash manifest that accompanies a metrics output file."""
+    root, _ = os.path.splitext(str(output_file))
+    return root + ".manifest.json"
+
+
+def hash_file(path) -> str:
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def tree_files(directory) -> Dict[str, Path]:
+    """Every Python file under `directory`, scored or not, keyed like program names (relative to its parent)."""
+    directory = Path(directory)
+    return {str(path.relative_to(directory.parent)): path for path in tree_index(directory).python_files(directory)}
+
+
+def build_manifest(directory, imports: Optional[Dict[str, Iterable[Path]]] = None) -> dict:
+    """sha256 of every Python file under `directory`, plus the files each program took context from."""
+    directory = Path(directory)
+    manifest = {"files": {name: hash_file(path) for name, path in tree_files(directory).items()}}
+    if imports is not None:
+        # imported files are resolved paths; the directory may be relative
+        base = directory.resolve().parent
+        manifest["imports"] = {
+            program: sorted({os.path.relpath(Path(dep).resolve(), base) for dep in deps})
+            for program, deps in imports.items()
+        }
+    return manifest
+
+
+def write_manifest(path, manifest: dict):
+    with open(path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+
+def load_manifest(path) -> dict:
+    with open(path, "r") as f:
+        manifest = json.load(f)
+    # manifests written before imports were recorded map program names straight to hashes
+    return manifest if isinstance(manifest.get("files"), dict) else {"files": manifest}
+
+
+def changed_from_manifest(directory, manifest: dict) -> Set[Path]:
+    """Files under `directory` added, modified or deleted since the manifest was written."""
+    directory = Path(directory)
+    files = tree_files(directory)
+    previous = manifest["files"]
+    changed = {name for name, path in files.items() if previous.get(name) != hash_file(path)}
+    changed.update(name for name in previous if name not in files)
+    return {(directory.parent / name).resolve() for name in changed}
+
+
+def changed_since_revision(directory, revision: str) -> Set[Path]:
+    """Files under `directory` added, modified or deleted since `revision`, uncommitted and untracked ones included."""
+    directory = Path(directory).resolve()
+    toplevel = subprocess.run(
+        ["git", "rev-parse", "--show-toplevel"], cwd=directory, capture_output=True, text=True, check=True
+    ).stdout.strip()
+    diff = subprocess.run(
+        ["git", "diff", "--name-only", revision, "--", "."], cwd=directory, capture_output=True, text=True, check=True
+    ).stdout.splitlines()
+    untracked = subprocess.run(
+        ["git", "ls-files", "--others", "--exclude-standard", "--full-name", "--", "."],
+        cwd=directory,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    return {(Path(toplevel) / name).resolve() for name in diff + untracked}
+
+
+def load_previous_results(metrics_file) -> Dict[str, dict]:
+    """Read the per-file entries of a previous metrics JSON, keyed by program name."""
+    with open(metrics_file, "r") as f:
+        metrics = json.load(f)
+    return {
+        program: entry
+        for program, entry in metrics.items()
+        if isinstance(entry, dict) and "metrics" in entry
+    }
+
+
+def stale_programs(
+    programs: Dict[str, Path],
+    changed_paths: Set[Path],
+    imported_files: Optional[Callable[[Path], Iterable[Path]]] = None,
+    previous_imports: Optional[Dict[str, List[Path]]] = None,
+) -> Set[str]:
+    """Changed programs plus every program that takes context from a changed file.
+
+    Args:
+        programs: Program name -> file path for the current tree
+        changed_paths: Resolved paths of every file added, modified or deleted under the tree,
+            including files that are not scored themselves (tests, helpers, skipped directories)
+        imported_files: Returns the files a program pulls context from now; None when
+            scoring without imported context
+        previous_imports: Program name -> files it pulled context from when last scored, which
+            catches imports of since deleted modules
+    """
+    stale = {program for program, path in programs.items() if Path(path).resolve() in changed_paths}
+    if imported_files is None:
+        return stale
+    previous_imports = previous_imports or {}
+    for program, path in programs.items():
+        if program in stale:
+            continue
+        deps = list(imported_files(path)) + previous_imports.get(program, [])
+        if any(Path(dep).resolve() in changed_paths for dep in deps):
+            stale.add(program)
+    return stale
+
+
+def _scored(entry: dict) -> bool:
+    tokens = entry.get("tokens")
+    return tokens is not None and not (isinstance(tokens, float) and math.isnan(tokens))
+
+
+def reusable_results(
+    programs: Dict[str, Path],
+    previous_metrics,
+    directory,
+    revision: Optional[str] = None,
+    manifest_file: Optional[str] = None,
+    imported_files: Optional[Callable[[Path], Iterable[Path]]] = None,
+) -> Dict[str, dict]:
+    """Previous per-file results that are still valid for the current tree.
+
+    Changes are detected from `revision` when given, otherwise from
+    `manifest_file` (defaulting to the manifest written next to
+    `previous_metrics`); without a manifest every file is rescored. Entries
+    without a per-file token count predate incremental support, and entries
+    with a NaN count failed to score; both are always rescored.
+    """
+    directory = Path(directory)
+    manifest_file = manifest_file or manifest_path(previous_metrics)
+    manifest = load_manifest(manifest_file) if os.path.exists(manifest_file) else None
+    if revision is not None:
+        changed = changed_since_revision(directory, revision)
+    elif manifest is None:
+        print(f"[WARN] No manifest at {manifest_file}; rescoring every file")
+        return {}
+    else:
+        changed = changed_from_manifest(directory, manifest)
+    previous_imports = None
+    if manifest is not None and "imports" in manifest:
+        previous_imports = {
+            program: [directory.parent / name for name in deps] for program, deps in manifest["imports"].items()
+        }
+    stale = stale_programs(programs, changed, imported_files, previous_imports)
+
+    previous = load_previous_results(previous_metrics)
+    reusable = {
+        program: previous[program]
+        for program in programs
+        if program not in stale and program in previous and _scored(previous[program])
+    }
+    print(
+        f"Incremental rescoring: {len(changed)} files changed, {len(stale)} files to rescore, "
+        f"reusing {len(reusable)} of {len(programs)} files"
+    )
+    return reusable
@@ -0,0 +1,607 @@
+"""
+Layout adapters for the ScoringEngine.
+
+- SmallRepoLayout: every file of a small repo, conditioned on its imports
+- LargeRepoLayout: every file of a large repo (with or without unified/),
+  optionally conditioned on its imports, scored in context windows
+- ClusterLayout: a codecontests cluster pair; refactored main.py files are
+  conditioned on the cluster's library.py, originals are scored on their own
+
+Each adapter keeps its scorer's prompt format and result records exactly, so
+outputs are comparable with earlier runs.
+"""
+
+import math
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from minicode.scoring.checkpoint import Checkpoint, checkpoint_path
+from minicode.scoring.client import echo_logprobs
+from minicode.scoring.engine import Layout, Response, ScoringEngine, ScoringUnit
+from minicode.scoring.incremental import build_manifest, manifest_path, reusable_results, write_manifest
+from minicode.scoring.metrics_table import MetricsTable, write_table_and_summary
+from minicode.scoring.output import failed_programs, package_all_metrics, summarize, write_metrics
+from minicode.scoring.repo_index import RepoIndex
+from minicode.scoring.scheduler import ScheduledRequest, estimate_tokens
+from minicode.scoring.slicer import ContextSlicer
+from minicode.scoring.source_cache import SourceCache
+from minicode.scoring.static_metrics import METRIC_NAMES, compute_cluster_code_metrics, compute_code_metrics
+from minicode.scoring.token_store import TokenStore, token_store_path
+from minicode.scoring.tokenizers import FALLBACK_ENCODING, encoding_for_model, get_encoding
+from minicode.scoring.tree_index import tree_index
+
+# ---- Imported context ----
+
+
+def parse_imports(file_path, cache: SourceCache = None):
+    """Non-stdlib imports of a file ("module::name" or "module")."""
+    cache = cache or SourceCache()
+    return cache.get(file_path).imports
+
+
+def get_imported_files(
+    file_path, directory, cache: SourceCache = None, index: RepoIndex = None, slicer: ContextSlicer = None
+):
+    """Files that get_imported_code would pull context from."""
+    index = index or RepoIndex(directory, cache)
+    try:
+        imports = parse_imports(file_path, index.cache)
+    except Exception:
+        return []
+    if slicer is not None:
+        return slicer.files(file_path)
+    files = []
+    for imported_fn_ref in imports:
+        module_name, fn_name = (imported_fn_ref.split("::") + [None])[:2]
+        src_file, _ = index.resolve_import(module_name, fn_name, file_path)
+        if src_file is not None:
+            files.append(src_file)
+    return files
+
+
+def get_imported_code(
+    file_path, directory, cache: SourceCache = None, index: RepoIndex = None, slicer: ContextSlicer = None
+):
+    """Context segments for a file: imported definitions, or whole modules for plain imports."""
+    index = index or RepoIndex(directory, cache)
+    cache = index.cache
+    try:
+        imports = parse_imports(file_path, cache)
+    except Exception as e:
+        print(f"[ERROR] Failed to parse {file_path}: {e}")
+        return ""
+    if slicer is not None:
+        # only the referenced definitions and their transitive dependencies
+        return slicer.slice(file_path)
+
+    imported_code_segments = []
+    for imported_fn_ref in imports:
+        module_name, fn_name = (imported_fn_ref.split("::") + [None])[:2]
+        # nearest module file, or the submodule / defining file for re-exported names
+        src_file, whole_module = index.resolve_import(module_name, fn_name, file_path)
+
+        if src_file is None:
+            print(f"[WARN] Cannot find module file for '{module_name}'")
+            continue
+
+        source = cache.get(src_file)
+        if whole_module:
+            # imported the whole module
+            imported_code_segments.append(source.text)
+            continue
+        try:
+            matches = source.definitions(fn_name)
+        except Exception as e:
+            print(f"[ERROR] Failed to parse {src_file}: {e}")
+            continue
+        if matches:
+            imported_code_segments.append(matches[-1])
+        else:
+            print(f"[WARN] No definition '{fn_name}' in {src_file}")
+
+    return imported_code_segments
+
+
+# ---- Repo layouts ----
+
+
+class RepoLayout(Layout):
+    """Shared parts of the small and large repo layouts."""
+
+    metrics_fn = staticmethod(compute_code_metrics)
+
+    def __init__(
+        self,
+        directory,
+        model: str,
+        enable_logprobs: bool = False,
+        condition_on_codebank: bool = True,
+        context: str = "full",
+        cache: Optional[SourceCache] = None,
+        index: Optional[RepoIndex] = None,
+    ):
+        self.directory = Path(directory)
+        self.model = model
+        self.enable_logprobs = enable_logprobs
+        self.condition_on_codebank = condition_on_codebank
+        self.cache = cache or SourceCache()
+        self.index = self.slicer = None
+        if condition_on_codebank:
+            self.index = index or RepoIndex(self.directory, self.cache)
+            self.slicer = ContextSlicer(self.index) if context == "sliced" else None
+
+    def programs(self) -> Dict[str, Path]:
+        """Map program names (relative to the directory's parent) to the source files to score.
+
+        Files come from the shared tree index, which never lists .venv, .git and other IGNORED_DIRS.
+        """
+        programs = {}
+        for file in tree_index(self.directory).python_files(self.directory):
+            if not self.skip(file):
+                programs[str(file.relative_to(self.directory.parent))] = file
+        return programs
+
+    def skip(self, file: Path) -> bool:
+        return file.name.startswith("test_")
+
+    def discover(self) -> Iterable[Tuple[str, Path]]:
+        return self.programs().items()
+
+    def imported_code(self, path: Path) -> List[str]:
+        if not self.condition_on_codebank:
+            return []
+        return get_imported_code(path, self.directory, index=self.index, slicer=self.slicer)
+
+    def imported_files(self, path: Path) -> List[Path]:
+        return get_imported_files(path, self.directory, index=self.index, slicer=self.slicer)
+
+    def logprobs(self, text: str):
+        if not self.enable_logprobs:
+            return [], []
+        return echo_logprobs(text, self.model)
+
+    def failed(self, unit: ScoringUnit, code_metrics: dict) -> dict:
+        return super().failed(unit, code_metrics | {"internal_imports": unit.context})
+
+
+class SmallRepoLayout(RepoLayout):
+    """One request per file: imported code as context, then the file between markers."""
+
+    def load(self, key: str, path: Path) -> Optional[ScoringUnit]:
+        imported_code_segments = self.imported_code(path)
+        code = self.cache.text(path)
+        if len(code.strip()) == 0:
+            return None
+        # stitch together: imported code (context) + main file
+        codebank = ""
+        if imported_code_segments:
+            imported_code = "\n\n".join(imported_code_segments)
+            codebank = f"""# === IMPORTED LIBRARY CODE START ===
+{imported_code}
+
+# === IMPORTED LIBRARY CODE END ===
+
+# === MAIN SOURCE CODE START ===
+"""
+            code = f"""{code}
+# === MAIN SOURCE CODE END ===
+"""
+        return ScoringUnit(key, path, code=code, context=imported_code_segments, extra={"codebank": codebank})
+
+    def requests(self, unit: ScoringUnit, code_metrics: dict) -> List[ScheduledRequest]:
+        enc = encoding_for_model(self.model)
+        codebank = unit.extra["codebank"]
+        full_text = codebank + unit.code
+        # count how many tokens came from the codebank
+        num_codebank_tokens = len(enc.encode(codebank)) if enc is not None and codebank else 0
+        return [
+            ScheduledRequest(
+                key=(unit.key, num_codebank_tokens), text=full_text, tokens=estimate_tokens(full_text, enc)
+            )
+        ]
+
+    def context_tokens(self, request: ScheduledRequest) -> int:
+        return request.key[1]
+
+    def record(self, unit: ScoringUnit, code_metrics: dict, responses: List[Response]) -> dict:
+        [(request, (logprobs, tokens))] = responses
+        _, num_codebank_tokens = request.key
+        # sum only the logprobs for the “new” code
+        return {
+            "logprobs": sum(logprobs[num_codebank_tokens:]),
+            "tokens": len(tokens[num_codebank_tokens:]),
+            "metrics": code_metrics | {"internal_imports": unit.context},
+        }
+
+
+class LargeRepoLayout(RepoLayout):
+    """Files split into context windows, each prefixed with the codebank and the preceding code."""
+
+    # adjust to your model’s max context length
+    MAX_CONTEXT = 32_768
+
+    def __init__(self, directory, model: str, skip_unified: bool = False, **kwargs):
+        super().__init__(directory, model, **kwargs)
+        self.skip_unified = skip_unified
+
+    def skip(self, file: Path) -> bool:
+        if file.name.startswith("test_"):
+            return True
+        return self.skip_unified and "unified" in file.relative_to(self.directory).parts
+
+    def load(self, key: str, path: Path) -> Optional[ScoringUnit]:
+        imported = self.imported_code(path)
+        code = self.cache.text(path)
+        # empty files are not scored
+        if not code.strip():
+            return None
+        return ScoringUnit(key, path, code=code, context=imported)
+
+    def requests(self, unit: ScoringUnit, code_metrics: dict) -> List[ScheduledRequest]:
+        enc = get_encoding(FALLBACK_ENCODING)  # hacky, for qwen2.5 models
+        codebank = ""
+        if self.condition_on_codebank and unit.context:
+            # build the static “codebank” prefix
+            codebank = (
+                "# === IMPORTED LIBRARY CODE START ===\n"
+                + "\n\n".join(unit.context)
+                + "\n\n# === IMPORTED LIBRARY CODE END ===\n\n"
+                + "# === MAIN SOURCE CODE START ===\n"
+            )
+
+        code_tokens = enc.encode(unit.code)
+        codebank_tokens = enc.encode(codebank) if codebank else []
+
+        # how many new tokens we can send each window
+        max_chunk_tokens = self.MAX_CONTEXT - len(codebank_tokens)
+        if max_chunk_tokens <= 0:
+            raise ValueError("Your codebank alone exceeds the model's context length!")
+
+        previous_tokens = []  # tokens of source already scored
+        start = 0
+        requests = []
+        while start < len(code_tokens):
+            # grab the next slice of code tokens
+            end = start + max_chunk_tokens
+            chunk = code_tokens[start:end]
+
+            prefix_text = codebank
+            previous_code_tokens_context = []
+            if len(chunk) < max_chunk_tokens:
+                previous_code_tokens_context = previous_tokens[-(max_chunk_tokens - len(chunk)) :]
+                prefix_text += enc.decode(previous_code_tokens_context)
+            window_text = prefix_text + enc.decode(chunk)
+
+            # where the new chunk starts within the window
+            prefix_len = len(codebank_tokens) + len(previous_code_tokens_context)
+            requests.append(
+                ScheduledRequest(
+                    key=(unit.key, len(requests), prefix_len), text=window_text, tokens=prefix_len + len(chunk)
+                )
+            )
+
+            previous_tokens.extend(chunk)
+            start = end
+        return requests
+
+    def context_tokens(self, request: ScheduledRequest) -> int:
+        return request.key[2]
+
+    def record(self, unit: ScoringUnit, code_metrics: dict, responses: List[Response]) -> dict:
+        logprob, num_tokens = 0.0, 0
+        for request, (logprobs, tokens) in responses:
+            _, _, prefix_len = request.key
+            # sum only the logprobs for the new chunk
+            logprob += sum(logprobs[prefix_len:])
+            num_tokens += len(tokens) - prefix_len
+        return {"logprobs": logprob, "tokens": num_tokens, "metrics": code_metrics | {"internal_imports": unit.context}}
+
+
+def score_repo(
+    layout: RepoLayout,
+    output_file,
+    engine: ScoringEngine,
+    resume: bool = False,
+    previous_metrics: Optional[str] = None,
+    since_revision: Optional[str] = None,
+    manifest: Optional[str] = None,
+) -> dict:
+    """Score a repo layout into `output_file` (LIBRARYBENCH metrics JSON), checkpointing as it goes."""
+    programs = layout.programs()
+    with Checkpoint(checkpoint_path(output_file), resume=resume) as checkpoint:
+        if previous_metrics:
+            reusable = reusable_results(
+                programs,
+                previous_metrics,
+                layout.directory,
+                revision=since_revision,
+                manifest_file=manifest,
+                # files conditioned on their imports go stale with them
+                imported_files=layout.imported_files if layout.condition_on_codebank else None,
+            )
+            for program, entry in reusable.items():
+                if program not in checkpoint:
+                    checkpoint.append(program, **entry)
+        # resumed and reused files keep their tokens from the previous store
+        carried = set(checkpoint.records)
+        token_store = TokenStore() if layout.enable_logprobs else None
+        try:
+            engine.run(layout, checkpoint, token_store)
+        finally:
+            # an interrupted run still keeps the tokens of the files it checkpointed
+            if token_store is not None:
+                token_store.save(token_store_path(output_file), keep=carried)
+
+    logprobs_dict, _, metrics_dict, _ = summarize(checkpoint)
+    tokens_dict = {prog: r["tokens"] for prog, r in checkpoint.records.items()}
+    metrics = package_all_metrics(logprobs_dict, metrics_dict, tokens_dict)
+    write_metrics(output_file, metrics)
+    summary = {"programs": len(checkpoint.records), "failed": len(failed_programs(checkpoint))}
+    summary |= {k: v for k, v in metrics.items() if k.startswith("total_")}
+    write_table_and_summary(output_file, MetricsTable.from_records(checkpoint.records), summary)
+    imports = None
+    if layout.condition_on_codebank:
+        imports = {program: layout.imported_files(path) for program, path in programs.items()}
+    write_manifest(manifest_path(output_file), build_manifest(layout.directory, imports))
+    print(f"Written metrics to {output_file}")
+    return metrics
+
+
+# ---- Codecontests clusters ----
+
+# aggregated over a cluster side, in report order
+AGGREGATED_COLUMNS = ("logprobs", "tokens") + METRIC_NAMES
+
+
+def count_tokens(text, model):
+    """Counts tokens using the model's tiktoken encoding, with a cl100k_base fallback."""
+    if not text:
+        return 0
+    try:
+        return len(encoding_for_model(model, fallback=FALLBACK_ENCODING).encode(text))
+    except Exception as e:
+        print(f"[ERROR] Tiktoken encoding failed for model {model}: {e}. Cannot count tokens accurately.")
+        return float("nan")
+
+
+class ClusterLayout(Layout):
+    """A codecontests cluster and its original counterpart.
+
+    Program names: "refactored/library.py", "refactored/<problem>" and
+    "original/<problem>". Refactored main.py files get the cluster's library.py
+    (or, with context="sliced", just the parts they use) as context.
+    """
+
+    metrics_fn = staticmethod(compute_cluster_code_metrics)
+
+    CONTEXT_START = "# === CONTEXT CODE START ===\n"
+    CONTEXT_END = "\n# === CONTEXT CODE END ===\n\n"
+    MAIN_START = "# === MAIN CODE START ===\n"
+    MAIN_END = "\n# === MAIN CODE END ==="
+
+    def __init__(
+        self,
+        refactored_dir,
+        original_dir,
+        model: str,
+        enable_logprobs: bool = False,
+        context: str = "full",
+        cache: Optional[SourceCache] = None,
+    ):
+        self.refactored_dir = Path(refactored_dir)
+        self.original_dir = Path(original_dir)
+        self.library_path = self.refactored_dir / "library.py"
+        self.model = model
+        self.enable_logprobs = enable_logprobs
+        self.cache = cache or SourceCache()
+        self.slicer = None
+        if context == "sliced":
+            self.slicer = ContextSlicer(RepoIndex(self.refactored_dir, self.cache))
+
+    @staticmethod
+    def problems(cluster_dir: Path) -> List[Path]:
+        return [d for d in cluster_dir.iterdir() if d.is_dir()]
+
+    def discover(self) -> Iterable[Tuple[str, Path]]:
+        if self.library_path.exists():
+            yield "refactored/library.py", self.library_path
+        else:
+            print("[WARN] library.py not found in refactored cluster.")
+        for side, cluster_dir in (("refactored", self.refactored_dir), ("original", self.original_dir)):
+            for problem_dir in self.problems(cluster_dir):
+                main_py_path = problem_dir / "main.py"
+                if main_py_path.exists():
+                    yield f"{side}/{problem_dir.name}", main_py_path
+                else:
+                    print(f"[WARN] main.py not found in {problem_dir}")
+
+    def library_context(self, main_py_path: Path) -> str:
+        try:
+            library_content = self.cache.text(self.library_path) if self.library_path.exists() else ""
+        except Exception:
+            return ""
+        if self.slicer is None or not library_content:
+            return library_content
+        try:
+            return "\n\n".join(self.slicer.slice(main_py_path))
+        except Exception as e:
+            print(f"[WARN] Could not slice library context for {main_py_path}, using all of library.py: {e}")
+            return library_content
+
+    def load(self, key: str, path: Path) -> Optional[ScoringUnit]:
+        extra = {"file_path": str(path)}
+        if key != "refactored/library.py":
+            extra["problem_name"] = path.parent.name
+        try:
+            code = self.cache.text(path)
+        except Exception as e:
+            print(f"[ERROR] Failed to read file {path}: {e}")
+            return ScoringUnit(key, path, metrics={name: float("nan") for name in METRIC_NAMES}, extra=extra)
+        # refactored main.py files are conditioned on the library; the library and originals are not
+        is_refactored_main = key.startswith("refactored/") and "problem_name" in extra
+        context_code = self.library_context(path) if is_refactored_main else ""
+        return ScoringUnit(key, path, code=code, context=[context_code] if context_code else [], extra=extra)
+
+    def requests(self, unit: ScoringUnit, code_metrics: dict) -> List[ScheduledRequest]:
+        if unit.code is None or not self.enable_logprobs:
+            return []
+        if unit.context:
+            # Add markers for clarity when context is present
+            context_with_markers = self.CONTEXT_START + unit.context[0] + self.CONTEXT_END + self.MAIN_START
+            full_text = context_with_markers + unit.code + self.MAIN_END
+            # Need token count of the context *including markers* for correct offset
+            num_context_tokens = count_tokens(context_with_markers, self.model)
+        else:
+            full_text = unit.code
+            num_context_tokens = 0
+
+        if math.isnan(num_context_tokens):
+            print(f"[WARN] Could not calculate context tokens for {unit.path}. Skipping logprobs for this file.")
+            return []
+        if not full_text.strip():
+            return []
+        return [
+            ScheduledRequest(
+                key=(unit.key, num_context_tokens),
+                text=full_text,
+                tokens=estimate_tokens(full_text, encoding_for_model(self.model)),
+            )
+        ]
+
+    def context_tokens(self, request: ScheduledRequest) -> int:
+        return request.key[1]
+
+    def logprobs(self, text: str):
+        # errors reach the scheduler, which retries them and reports files that keep failing
+        return echo_logprobs(text, self.model)
+
+    def failed(self, unit: ScoringUnit, code_metrics: dict) -> dict:
+        results = {"file_path": unit.extra["file_path"]} | super().failed(unit, code_metrics)
+        if "problem_name" in unit.extra:
+            results["problem_name"] = unit.extra["problem_name"]
+        return results
+
+    def record(self, unit: ScoringUnit, code_metrics: dict, responses: List[Response]) -> dict:
+        results = {"file_path": unit.extra["file_path"], "metrics": code_metrics, "logprobs": float("nan"), "tokens": 0}
+        if unit.code is None:
+            pass
+        elif responses:
+            [(request, (all_logprobs, all_tokens))] = responses
+            _, num_context_tokens = request.key
+            # Extract logprobs and tokens *only* for the main code part
+            main_logprobs = all_logprobs[num_context_tokens:]
+            results["logprobs"] = sum(main_logprobs) if main_logprobs else 0.0
+            results["tokens"] = len(all_tokens[num_context_tokens:])
+        elif self.enable_logprobs and unit.code.strip():
+            # context tokens could not be counted: main code tokens only
+            results["tokens"] = count_tokens(unit.code, self.model)
+        elif self.enable_logprobs:
+            # the code file itself is empty
+            results["logprobs"] = 0.0
+        else:
+            # If logprobs disabled, still count tokens for the main code
+            results["tokens"] = count_tokens(unit.code, self.model)
+        if isinstance(results["tokens"], float) and math.isnan(results["tokens"]):
+            print(f"[WARN] Token count failed for {unit.path}. Setting tokens to NaN.")
+        if "problem_name" in unit.extra:
+            results["problem_name"] = unit.extra["problem_name"]
+        return results
+
+
+def aggregate_metrics(program_results: list) -> dict:
+    """Sums of logprobs, tokens and static metrics over programs, skipping NaNs (NaN if none are valid)."""
+    table = MetricsTable.from_records(dict(enumerate(program_results)))
+    return table.totals(AGGREGATED_COLUMNS, empty=float("nan"))
+
+
+def comparison_ratios(aggregated_refactored: dict, aggregated_original: dict) -> dict:
+    """Refactored / original ratios of tokens and logprobs, plus average logprob per token."""
+    ratios = {}
+    orig_tokens = aggregated_original.get("tokens", float("nan"))
+    ref_tokens = aggregated_refactored.get("tokens", float("nan"))
+    if not math.isnan(orig_tokens) and not math.isnan(ref_tokens) and orig_tokens != 0:
+        ratios["tokens_refactored_div_original"] = ref_tokens / orig_tokens
+    else:
+        ratios["tokens_refactored_div_original"] = float("nan")
+
+    orig_logprobs = aggregated_original.get("logprobs", float("nan"))
+    ref_logprobs = aggregated_refactored.get("logprobs", float("nan"))
+    # logprobs are negative, so also compare the average logprob per token
+    if not math.isnan(orig_logprobs) and not math.isnan(ref_logprobs) and orig_logprobs != 0:
+        ratios["logprobs_refactored_div_original"] = ref_logprobs / orig_logprobs
+        ratios["avg_logprob_per_token_original"] = orig_logprobs / orig_tokens if orig_tokens else float("nan")
+        ratios["avg_logprob_per_token_refactored"] = ref_logprobs / ref_tokens if ref_tokens else float("nan")
+    else:
+        ratios["logprobs_refactored_div_original"] = float("nan")
+        ratios["avg_logprob_per_token_original"] = float("nan")
+        ratios["avg_logprob_per_token_refactored"] = float("nan")
+    return ratios
+
+
+def _cluster_results(layout: ClusterLayout, checkpoint: Checkpoint):
+    """(library result, refactored main results, original main results) of a scored cluster pair."""
+
+    def result(key):
+        return {k: v for k, v in checkpoint.records[key].items() if k != "program"}
+
+    if "refactored/library.py" in checkpoint:
+        library_results = result("refactored/library.py")
+    else:
+        # Metrics/logprobs/tokens are 0 if there is no library
+        library_results = {
+            "file_path": str(layout.library_path),
+            "metrics": {name: 0 for name in METRIC_NAMES},
+            "logprobs": 0.0,
+            "tokens": 0,
+        }
+    refactored_program_results, original_program_results = [
+        [result(f"{side}/{d.name}") for d in layout.problems(cluster_dir) if f"{side}/{d.name}" in checkpoint]
+        for side, cluster_dir in (("refactored", layout.refactored_dir), ("original", layout.original_dir))
+    ]
+    return library_results, refactored_program_results, original_program_results
+
+
+def cluster_table(layout: ClusterLayout, checkpoint: Checkpoint) -> MetricsTable:
+    """Per-file metrics of a scored cluster pair, grouped "refactored_library" / "refactored" / "original"."""
+    library_results, refactored_program_results, original_program_results = _cluster_results(layout, checkpoint)
+    return MetricsTable.concat(
+        [
+            MetricsTable.from_records({"library.py": library_results}, group="refactored_library"),
+            MetricsTable.from_records(
+                {res["problem_name"]: res for res in refactored_program_results}, group="refactored"
+            ),
+            MetricsTable.from_records({res["problem_name"]: res for res in original_program_results}, group="original"),
+        ]
+    )
+
+
+def cluster_report(layout: ClusterLayout, checkpoint: Checkpoint, cluster_name: str) -> dict:
+    """The comparison metrics document for a scored cluster pair."""
+    library_results, refactored_program_results, original_program_results = _cluster_results(layout, checkpoint)
+    table = cluster_table(layout, checkpoint)
+
+    # The refactored aggregate combines the library with the main programs
+    refactored = MetricsTable.concat([table.group("refactored_library"), table.group("refactored")])
+    aggregated_refactored_total = refactored.totals(AGGREGATED_COLUMNS, empty=float("nan"))
+    aggregated_original_total = table.group("original").totals(AGGREGATED_COLUMNS, empty=float("nan"))
+
+    return {
+        "cluster_name": cluster_name,
+        "model": layout.model,
+        "logprobs_enabled": layout.enable_logprobs,
+        "refactored_library": library_results,
+        "refactored_programs": {res["problem_name"]: res for res in refactored_program_results},
+        "original_programs": {res["problem_name"]: res for res in original_program_results},
+        "aggregated_metrics_refactored": aggregated_refactored_total,
+        "aggregated_metrics_original": aggregated_original_total,
+        "comparison_ratios": comparison_ratios(aggregated_refactored_total, aggregated_original_total),
+    }
+
+
+def cluster_summary(report: dict) -> dict:
+    """The compact summary of a cluster report: aggregates and ratios without the per-file entries."""
+    keys = ("cluster_name", "model", "logprobs_enabled", "aggregated_metrics_refactored",
+            "aggregated_metrics_original", "comparison_ratios")
+    return {key: report[key] for key in keys} | {
+        "programs": {"refactored": len(report["refactored_programs"]), "original": len(report["original_programs"])}
+    }
@@ -0,0 +1,171 @@
+"""
+Columnar per-file metrics.
+
+Scored files become rows of a MetricsTable (numpy columns, NaN for missing
+values), so totals are vectorized NaN-aware reductions instead of per-field
+loops over nested dicts. A table is written to Parquet next to the metrics
+JSON together with a compact JSON summary of the totals, so analyses across
+runs can scan the Parquet files or read the summaries instead of parsing the
+full nested JSON.
+"""
+
+import json
+import math
+import os
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from minicode.scoring.static_metrics import METRIC_NAMES
+
+NUMERIC_COLUMNS = ("logprobs", "tokens") + METRIC_NAMES + ("internal_imports",)
+# counts: totals are reported as ints
+INTEGER_COLUMNS = frozenset(NUMERIC_COLUMNS) - {"logprobs"}
+
+
+def table_path(output_file) -> str:
+    """Parquet table next to a metrics file: `<name>.parquet`."""
+    return os.path.splitext(str(output_file))[0] + ".parquet"
+
+
+def summary_path(output_file) -> str:
+    """Compact summary next to a metrics file: `<name>.summary.json`."""
+    return os.path.splitext(str(output_file))[0] + ".summary.json"
+
+
+def _number(value) -> float:
+    return float("nan") if value is None else float(value)
+
+
+def _imports(value) -> float:
+    """Number of internal imports: a count, or the list of imported code segments."""
+    if isinstance(value, (int, float)):
+        return _number(value)
+    return _number(len(value))
+
+
+class MetricsTable:
+    """Per-file metrics as numpy columns, one row per program.
+
+    Args:
+        programs: Program name of each row
+        columns: Numeric column name -> float64 array (NaN = missing)
+        groups: Optional label of each row (e.g. "refactored" / "original")
+    """
+
+    def __init__(self, programs: Sequence[str], columns: Dict[str, np.ndarray], groups: Optional[Sequence[str]] = None):
+        self.programs = list(programs)
+        self.columns = columns
+        self.groups = list(groups) if groups is not None else None
+
+    @classmethod
+    def from_records(cls, records: Mapping[str, dict], group: Optional[str] = None) -> "MetricsTable":
+        """Rows from result records ({"logprobs", "tokens", "metrics": {...}}) keyed by program."""
+        programs = list(records)
+        columns = {
+            "logprobs": [_number(records[p].get("logprobs")) for p in programs],
+            "tokens": [_number(records[p].get("tokens")) for p in programs],
+        }
+        for name in METRIC_NAMES:
+            columns[name] = [_number((records[p].get("metrics") or {}).get(name)) for p in programs]
+        if any("internal_imports" in (records[p].get("metrics") or {}) for p in programs):
+            columns["internal_imports"] = [
+                _imports((records[p].get("metrics") or {}).get("internal_imports", [])) for p in programs
+            ]
+        arrays = {name: np.asarray(values, dtype=np.float64) for name, values in columns.items()}
+        return cls(programs, arrays, [group] * len(programs) if group is not None else None)
+
+    @classmethod
+    def concat(cls, tables: Iterable["MetricsTable"]) -> "MetricsTable":
+        tables = list(tables)
+        names = [name for name in NUMERIC_COLUMNS if any(name in t.columns for t in tables)]
+        columns = {
+            name: np.concatenate(
+                [t.columns.get(name, np.full(len(t), np.nan)) for t in tables] or [np.empty(0)]
+            )
+            for name in names
+        }
+        groups = None
+        if any(t.groups is not None for t in tables):
+            groups = [g for t in tables for g in (t.groups or [None] * len(t))]
+        return cls([p for t in tables for p in t.programs], columns, groups)
+
+    def __len__(self) -> int:
+        return len(self.programs)
+
+    def group(self, label: str) -> "MetricsTable":
+        """Rows labelled `label`."""
+        mask = np.array([g == label for g in (self.groups or [])], dtype=bool)
+        return self._take(mask)
+
+    def _take(self, mask: np.ndarray) -> "MetricsTable":
+        index = np.flatnonzero(mask)
+        return MetricsTable(
+            [self.programs[i] for i in index],
+            {name: column[index] for name, column in self.columns.items()},
+            [self.groups[i] for i in index] if self.groups is not None else None,
+        )
+
+    def total(self, name: str, empty=0):
+        """Sum of the non-NaN values of a column; `empty` if there are none."""
+        column = self.columns.get(name)
+        if column is None:
+            return empty
+        valid = column[~np.isnan(column)]
+        if valid.size == 0:
+            return empty
+        total = valid.sum()
+        return int(total) if name in INTEGER_COLUMNS else float(total)
+
+    def totals(self, names: Sequence[str] = NUMERIC_COLUMNS, empty=0) -> Dict[str, float]:
+        """NaN-skipping totals of several columns."""
+        return {name: self.total(name, empty) for name in names}
+
+    def write_parquet(self, path, metadata: Optional[Dict[str, str]] = None) -> bool:
+        """Write the table to Parquet (needs pyarrow); returns whether it was written."""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            print(f"[WARN] pyarrow is not installed; not writing {path}")
+            return False
+        arrays = {"program": pa.array(self.programs, type=pa.string())}
+        if self.groups is not None:
+            arrays["group"] = pa.array(self.groups, type=pa.string())
+        for name, column in self.columns.items():
+            array = pa.array(column, from_pandas=True)  # NaN -> null
+            arrays[name] = array.cast(pa.int64()) if name in INTEGER_COLUMNS else array
+        table = pa.table(arrays)
+        if metadata:
+            table = table.replace_schema_metadata({k: str(v) for k, v in metadata.items()})
+        pq.write_table(table, path)
+        return True
+
+
+def _json_safe(value):
+    # NaN is not valid JSON: null in the compact summary
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _json_safe(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_safe(v) for v in value]
+    return value
+
+
+def write_summary(path, summary: dict):
+    """Write a compact JSON summary (NaN as null)."""
+    with open(path, "w") as wf:
+        json.dump(_json_safe(summary), wf, indent=2)
+
+
+def write_table_and_summary(output_file, table: MetricsTable, summary: dict) -> List[str]:
+    """Write `<name>.parquet` and `<name>.summary.json` next to `output_file`; returns the paths written."""
+    written = []
+    parquet_file = table_path(output_file)
+    if table.write_parquet(parquet_file, metadata={"summary": json.dumps(_json_safe(summary))}):
+        written.append(parquet_file)
+        summary = summary | {"table": os.path.basename(parquet_file)}
+    write_summary(summary_path(output_file), summary)
+    written.append(summary_path(output_file))
+    return written
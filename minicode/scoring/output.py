@@ -0,0 +1,82 @@
+"""
+Result summaries and the metrics writer shared by the scorers.
+"""
+
+import json
+from pathlib import Path
+from typing import List
+
+from minicode.scoring.checkpoint import Checkpoint
+from minicode.scoring.metrics_table import MetricsTable
+from minicode.scoring.static_metrics import METRIC_NAMES
+
+
+def failed_programs(checkpoint: Checkpoint) -> List[str]:
+    """Programs whose scoring failed in this run."""
+    return [program for program, record in checkpoint.records.items() if "error" in record]
+
+
+def summarize(checkpoint: Checkpoint):
+    """Print the repo summary of every checkpointed file.
+
+    Totals skip NaNs, so files that failed to score (recorded with an "error") are left out of them
+    and counted separately.
+
+    Returns:
+        (logprobs per program, total logprob, metrics per program, total tokens)
+    """
+    logprobs_dict = {prog: r["logprobs"] for prog, r in checkpoint.records.items()}
+    # the emitted metrics keep each file's imported code segments
+    metrics_dict = {prog: r["metrics"] for prog, r in checkpoint.full_records().items()}
+    totals = MetricsTable.from_records(checkpoint.records).totals()
+    total_logprob, total_tokens = totals["logprobs"], totals["tokens"]
+    failed = failed_programs(checkpoint)
+
+    print("\n=== Summary ===")
+    print(f"Full Repo Log Probability: {total_logprob:.2f}")
+    print(f"Total Tokens: {total_tokens}")
+    if failed:
+        print(f"Failed Files: {len(failed)} (not in the totals; rerun with --resume to retry them)")
+    print(f"Total Logical LOC (LLOC): {totals['lloc']}")
+    print(f"Total Source LOC (SLOC): {totals['sloc']}")
+    print(f"Total Cyclomatic Complexity: {totals['cyclomatic']}")
+    print(f"Total Internal Imports: {totals['internal_imports']}")
+
+    return logprobs_dict, total_logprob, metrics_dict, total_tokens
+
+
+def package_all_metrics(logprobs, metrics, tokens=None):
+    """The LIBRARYBENCH metrics document: per-program entries plus NaN-skipping totals.
+
+    Every total, logprobs and tokens included, comes from the MetricsTable of the entries, the same
+    reduction as the Parquet table and summary.
+    """
+    tokens = tokens or {}
+    result = {"total_logprobs": None, "total_tokens": None}
+    all_programs = set(logprobs) | set(metrics)
+
+    for program in all_programs:
+        result[program] = {
+            "logprobs": logprobs.get(program, float("nan")),
+            "tokens": tokens.get(program, float("nan")),
+            "metrics": metrics.get(program, {}),
+        }
+
+    table = MetricsTable.from_records({program: result[program] for program in all_programs})
+    for name, total in table.totals(("logprobs", "tokens") + METRIC_NAMES + ("internal_imports",)).items():
+        result[f"total_{name}"] = total
+
+    return result
+
+
+class _Encoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, Path):
+            return str(obj)
+        return super().default(obj)
+
+
+def write_metrics(output_file, metrics: dict):
+    """Write a metrics document as indented JSON (paths as strings, NaN as NaN)."""
+    with open(output_file, "w") as wf:
+        json.dump(metrics, wf, indent=4, cls=_Encoder)
@@ -0,0 +1,73 @@
+"""
+Bounded-memory streaming stages for the repo scorers.
+
+Instead of reading every file (and its imported context) into one dict
+before scoring starts, the scorers chain generators:
+
+    discover -> read + context -> static metrics -> windows -> score -> emit
+
+Each stage pulls from the one before it, and the read stage runs on a
+background thread behind a bounded queue, so it stays at most `maxsize`
+files ahead of scoring (backpressure) while I/O overlaps with scoring.
+"""
+
+import queue
+import threading
+from itertools import islice
+from typing import Callable, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# files buffered between stages
+DEFAULT_BUFFER_SIZE = 64
+
+
+def bounded_map(fn: Callable[[T], R], items: Iterable[T], maxsize: int = DEFAULT_BUFFER_SIZE) -> Iterator[R]:
+    """Yield fn(item) for each item, computed on a background thread at most `maxsize` results ahead.
+
+    Exceptions raised by `fn` or `items` are re-raised in the consumer; closing the
+    generator early stops the background thread.
+    """
+    results: queue.Queue = queue.Queue(maxsize=max(1, maxsize))
+    stop = threading.Event()
+
+    def put(message) -> bool:
+        while not stop.is_set():
+            try:
+                results.put(message, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in items:
+                if not put(("item", fn(item))):
+                    return
+        except BaseException as e:
+            put(("error", e))
+            return
+        put(("done", None))
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+    try:
+        while True:
+            kind, value = results.get()
+            if kind == "done":
+                return
+            if kind == "error":
+                raise value
+            yield value
+    finally:
+        stop.set()
+        thread.join()
+
+
+def batched(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Consecutive lists of up to `size` items."""
+    it = iter(items)
+    while batch := list(islice(it, max(1, size))):
+        yield batch
@@ -0,0 +1,164 @@
+"""
+Repository module/symbol index for import resolution.
+
+Built once per run, the index maps dotted module names to files and
+top-level symbol names to the files defining them, so resolving an import
+is a dict lookup instead of a directory walk per import. Module names are
+registered relative to every plausible package root:
+- the nearest ancestor that is not itself a package (no __init__.py)
+- the scanned directory and each of its immediate subdirectories
+  (persona repos, or unified/<pkg>)
+- any `src/` directory
+When several files match, the one sharing the longest path prefix with the
+importing file wins, with ties broken by path so resolution is deterministic.
+"""
+
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from minicode.scoring.source_cache import SourceCache
+from minicode.scoring.tree_index import tree_index
+
+
+def _dotted(path: Path, root: Path) -> Optional[str]:
+    try:
+        rel = path.relative_to(root)
+    except ValueError:
+        return None
+    parts = list(rel.with_suffix("").parts)
+    if parts and parts[-1] == "__init__":
+        parts = parts[:-1]
+    if not parts or not all(part.isidentifier() for part in parts):
+        return None
+    return ".".join(parts)
+
+
+class RepoIndex:
+    """Dotted-module and symbol index over the Python files under `directory`."""
+
+    def __init__(self, directory, cache: Optional[SourceCache] = None):
+        self.directory = Path(directory).resolve()
+        self.cache = cache or SourceCache()
+        self.files: List[Path] = []
+        self.modules: Dict[str, List[Path]] = {}
+        self._suffixes: Dict[str, List[Path]] = {}
+        self._symbols: Optional[Dict[str, List[Path]]] = None
+        self._package_roots: Dict[Path, Path] = {}
+        self.tree = tree_index(self.directory)
+        self._build()
+
+    def _is_package(self, directory: Path) -> bool:
+        if directory == self.directory or self.directory in directory.parents:
+            return self.tree.is_package(directory)
+        return (directory / "__init__.py").exists()
+
+    def _package_root(self, directory: Path) -> Path:
+        """Nearest ancestor of `directory` (inclusive) that is not a package."""
+        if directory not in self._package_roots:
+            if self._is_package(directory) and directory.parent != directory:
+                self._package_roots[directory] = self._package_root(directory.parent)
+            else:
+                self._package_roots[directory] = directory
+        return self._package_roots[directory]
+
+    def _roots(self, path: Path):
+        roots = {self._package_root(path.parent), self.directory}
+        rel = path.relative_to(self.directory)
+        if len(rel.parts) > 1:
+            roots.add(self.directory / rel.parts[0])
+        for ancestor in path.parents:
+            if ancestor.name == "src":
+                roots.add(ancestor)
+            if ancestor == self.directory:
+                break
+        return roots
+
+    def _build(self):
+        for path in self.tree.python_files(self.directory):
+            self.files.append(path)
+            names = {_dotted(path, root) for root in self._roots(path)} - {None}
+            suffixes = set()
+            for name in names:
+                self.modules.setdefault(name, []).append(path)
+                parts = name.split(".")
+                suffixes.update(".".join(parts[i:]) for i in range(1, len(parts)))
+            for suffix in suffixes - names:
+                self._suffixes.setdefault(suffix, []).append(path)
+        self._file_set = set(self.files)
+
+    def _nearest(self, candidates: List[Path], from_file: Path) -> Path:
+        from_parts = Path(from_file).resolve().parts
+
+        def key(path: Path) -> Tuple[int, int, str]:
+            common = 0
+            for a, b in zip(path.parts, from_parts):
+                if a != b:
+                    break
+                common += 1
+            return (-common, len(path.parts), str(path))
+
+        return min(candidates, key=key)
+
+    def resolve_module(self, module_name: str, from_file) -> Optional[Path]:
+        """File implementing `module_name` as imported from `from_file`."""
+        from_dir = Path(from_file).resolve().parent
+        rel = Path(*module_name.split("."))
+        for candidate in (from_dir / rel.with_suffix(".py"), from_dir / rel / "__init__.py"):
+            if candidate in self._file_set:
+                return candidate
+        candidates = self.modules.get(module_name) or self._suffixes.get(module_name)
+        if not candidates:
+            # last resort: any module with the same final component
+            basename = module_name.split(".")[-1]
+            candidates = self.modules.get(basename) or self._suffixes.get(basename)
+        return self._nearest(candidates, from_file) if candidates else None
+
+    @property
+    def symbols(self) -> Dict[str, List[Path]]:
+        """Top-level function/class/assignment name -> files defining it (built on first use)."""
+        if self._symbols is None:
+            self._symbols = {}
+            for path in self.files:
+                try:
+                    top_level = self.cache.get(path).top_level
+                except Exception:
+                    continue
+                for name in top_level:
+                    self._symbols.setdefault(name, []).append(path)
+        return self._symbols
+
+    def find_symbol(self, name: str, from_file) -> Optional[Path]:
+        """Nearest file with a function or class definition of `name`."""
+        candidates = [path for path in self.symbols.get(name, []) if self._defines(path, name)]
+        return self._nearest(candidates, from_file) if candidates else None
+
+    def _defines(self, path: Path, name: str) -> bool:
+        try:
+            return bool(self.cache.get(path).definitions(name))
+        except Exception:
+            return False
+
+    def resolve_import(self, module_name: str, name: Optional[str], from_file) -> Tuple[Optional[Path], bool]:
+        """Resolve `import module_name` / `from module_name import name`.
+
+        Returns (file, whole_module): the file to take context from, and whether
+        the whole module is imported (True) or just the definition of `name`.
+        A `name` that is a submodule resolves to that module; one that the module
+        only re-exports resolves to the file that actually defines it; a name
+        imported from a module outside the repo resolves to (None, False).
+        """
+        module_file = self.resolve_module(module_name, from_file)
+        if name is None:
+            return module_file, True
+        if module_file is not None and self._defines(module_file, name):
+            return module_file, False
+        submodule = self.modules.get(f"{module_name}.{name}")
+        if submodule:
+            return self._nearest(submodule, from_file), True
+        if module_file is None:
+            # not a module of this repo (e.g. third-party): a local definition of `name` is not what was imported
+            return None, False
+        defining_file = self.find_symbol(name, from_file)
+        if defining_file is not None:
+            return defining_file, False
+        return module_file, False
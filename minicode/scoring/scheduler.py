@@ -0,0 +1,280 @@
+"""
+Rate-limited scheduling of logprob requests.
+
+The scorers send one request per file (or per context window) to the
+logprob provider. This module sits in front of that client and:
+1. Enforces requests/minute and tokens/minute limits with token buckets
+2. Adapts the number of in-flight requests to 429s and observed latency
+3. Dispatches the longest requests first so large files don't become the tail
+4. Backs off globally on rate limits instead of letting every worker retry at once
+5. Reports a request that still fails after its last retry as a RequestFailed
+   result, so one bad file doesn't abort the rest of the run
+"""
+
+import heapq
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from itertools import count
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+
+@dataclass
+class ScheduledRequest:
+    """A single logprob request: an opaque key, the prompt text and its estimated token count."""
+
+    key: Any
+    text: str
+    tokens: int
+
+
+@dataclass
+class RequestFailed:
+    """Result of a request that failed on every attempt."""
+
+    error: BaseException
+
+    def __str__(self) -> str:
+        return f"{type(self.error).__name__}: {self.error}"
+
+
+def estimate_tokens(text: str, enc=None) -> int:
+    """Estimate the prompt size of `text`, using `enc` (a tiktoken encoding) when available."""
+    if enc is not None:
+        try:
+            return len(enc.encode(text))
+        except Exception:
+            pass
+    # ~4 characters per token is a reasonable estimate for source code
+    return max(1, len(text) // 4)
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    """Check whether an exception raised by the client is an HTTP 429."""
+    for attr in ("status_code", "http_status", "status"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    return type(exc).__name__ == "RateLimitError"
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Extract a Retry-After hint (in seconds) from a rate-limit error, if present."""
+    headers = getattr(exc, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(exc, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after") or headers.get("Retry-After"))
+    except (TypeError, ValueError):
+        return None
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at `rate_per_minute`.
+
+    Requests larger than the bucket capacity wait for a full bucket and then
+    drain it, so oversized prompts are still sent rather than blocking forever.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None, clock=time.monotonic):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._clock = clock
+        self._last = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, amount: float = 1) -> float:
+        """Take `amount` tokens if available; otherwise return the seconds to wait."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            self._refill()
+            if self._tokens >= amount:
+                self._tokens -= amount
+                return 0.0
+            return (amount - self._tokens) / self.rate
+
+    def acquire(self, amount: float = 1, sleep=time.sleep):
+        """Block until `amount` tokens have been taken from the bucket."""
+        while True:
+            delay = self.try_acquire(amount)
+            if delay <= 0:
+                return
+            sleep(delay)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit driven by rate-limit and latency feedback.
+
+    The limit grows by one after a full window of fast successes, shrinks by
+    one when the smoothed latency exceeds `latency_target`, and halves on 429.
+    """
+
+    def __init__(self, max_limit: int, min_limit: int = 1, initial: Optional[int] = None,
+                 latency_target: Optional[float] = None):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = initial if initial is not None else self.max_limit
+        self.limit = max(self.min_limit, min(self.limit, self.max_limit))
+        self.latency_target = latency_target
+        self._latency = None
+        self._successes = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            while self._in_flight >= self.limit:
+                self._cond.wait()
+            self._in_flight += 1
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._cond.notify_all()
+
+    def on_success(self, latency: float):
+        with self._cond:
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            if self.latency_target is not None and self._latency > self.latency_target:
+                self.limit = max(self.min_limit, self.limit - 1)
+                self._successes = 0
+                return
+            self._successes += 1
+            if self._successes >= self.limit:
+                self.limit = min(self.max_limit, self.limit + 1)
+                self._successes = 0
+                self._cond.notify_all()
+
+    def on_throttle(self):
+        with self._cond:
+            self.limit = max(self.min_limit, self.limit // 2)
+            self._successes = 0
+
+
+class RequestScheduler:
+    """Run logprob requests concurrently under rate limits, longest first.
+
+    Args:
+        fn: Called as fn(text) for each request; its return value is yielded back
+        requests_per_minute: Optional requests/minute limit
+        tokens_per_minute: Optional prompt tokens/minute limit
+        max_concurrency: Upper bound on in-flight requests
+        min_concurrency: Lower bound the adaptive limit never drops below
+        latency_target: Optional latency (seconds) above which concurrency is reduced
+        max_retries: Attempts per request before it is reported as a RequestFailed
+        base_backoff: Initial backoff (seconds) after a rate-limit error
+        max_backoff: Cap on the backoff between attempts
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[str], Any],
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        latency_target: Optional[float] = None,
+        max_retries: int = 5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        self.fn = fn
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.max_concurrency = max(1, max_concurrency)
+        self.concurrency = AdaptiveConcurrency(self.max_concurrency, min_concurrency, latency_target=latency_target)
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._pause_until = 0.0
+        self._pause_lock = threading.Lock()
+
+    def _wait_for_pause(self):
+        while True:
+            with self._pause_lock:
+                delay = self._pause_until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def _pause(self, seconds: float):
+        # one shared cooldown for all workers, so a burst of 429s doesn't turn into a retry storm
+        with self._pause_lock:
+            self._pause_until = max(self._pause_until, time.monotonic() + seconds)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff, self.base_backoff * 2**attempt))
+
+    def _call(self, request: ScheduledRequest):
+        for attempt in range(self.max_retries):
+            self._wait_for_pause()
+            if self.request_bucket:
+                self.request_bucket.acquire(1)
+            if self.token_bucket:
+                self.token_bucket.acquire(request.tokens)
+            self.concurrency.acquire()
+            start = time.monotonic()
+            try:
+                result = self.fn(request.text)
+            except Exception as e:
+                if attempt == self.max_retries - 1:
+                    print(f"[ERROR] Request {request.key} failed after {self.max_retries} attempts: {e}")
+                    return RequestFailed(e)
+                if is_rate_limit_error(e):
+                    self.concurrency.on_throttle()
+                    self._pause(_retry_after(e) or self._backoff(attempt))
+                    print(f"[WARN] Rate limited; concurrency now {self.concurrency.limit}")
+                else:
+                    time.sleep(self._backoff(attempt))
+                    print(f"[WARN] Request {request.key} failed (attempt {attempt + 1}): {e}")
+                continue
+            finally:
+                self.concurrency.release()
+            self.concurrency.on_success(time.monotonic() - start)
+            return result
+
+    def map(
+        self, requests: Iterable[ScheduledRequest], lookahead: Optional[int] = None
+    ) -> Iterator[Tuple[ScheduledRequest, Any]]:
+        """Yield (request, result) pairs as requests complete, dispatching the longest first.
+
+        A request that fails on every retry yields a RequestFailed result instead of raising.
+
+        With `lookahead`, `requests` is consumed lazily and "longest first" applies to
+        the next `lookahead` requests only, so a streamed input is never fully buffered.
+        """
+        requests = iter(requests)
+        pending = []  # heap of (-tokens, order, request)
+        order = count()
+
+        def refill():
+            while lookahead is None or len(pending) < max(lookahead, self.max_concurrency):
+                request = next(requests, None)
+                if request is None:
+                    return
+                heapq.heappush(pending, (-request.tokens, next(order), request))
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            futures = {}
+            refill()
+            while pending or futures:
+                while pending and len(futures) < self.max_concurrency:
+                    request = heapq.heappop(pending)[2]
+                    futures[pool.submit(self._call, request)] = request
+                    refill()
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    request = futures.pop(future)
+                    yield request, future.result()
@@ -0,0 +1,175 @@
+"""
+Symbol-sliced conditioning context.
+
+Rather than prepending every imported module (or all of library.py), the
+slicer keeps only the top-level definitions a file actually references
+through its imports, plus whatever those definitions reference in turn
+within the repo, following imports across files. Each definition appears
+once, after the definitions it depends on.
+"""
+
+import ast
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from minicode.scoring.repo_index import RepoIndex
+from minicode.scoring.source_cache import EXCLUDED_MODULES
+
+# "full": whole imported modules / library.py (original behaviour); "sliced": this module
+CONTEXT_CHOICES = ("full", "sliced")
+
+# local name -> (module, imported name); name is None for `import module [as alias]`
+Bindings = Dict[str, Tuple[str, Optional[str]]]
+
+
+def import_bindings(tree: ast.Module) -> Tuple[Bindings, List[str]]:
+    """Names bound by non-stdlib imports, and the modules star-imported."""
+    bindings, star_modules = {}, []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom):
+            if not node.module or node.module.split(".")[0] in EXCLUDED_MODULES:
+                continue
+            for alias in node.names:
+                if alias.name == "*":
+                    star_modules.append(node.module)
+                else:
+                    bindings[alias.asname or alias.name] = (node.module, alias.name)
+        elif isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name.split(".")[0] in EXCLUDED_MODULES:
+                    continue
+                if alias.asname:
+                    bindings[alias.asname] = (alias.name, None)
+                else:
+                    # `import a.b` binds `a`; a.b.f is resolved from the full chain
+                    top = alias.name.split(".")[0]
+                    bindings[top] = (top, None)
+    return bindings, star_modules
+
+
+def name_chains(node: ast.AST) -> List[List[str]]:
+    """Dotted name chains read under `node`: `a.b.c` -> ["a", "b", "c"] (and its prefixes)."""
+    chains = []
+    for sub in ast.walk(node):
+        parts = []
+        while isinstance(sub, ast.Attribute):
+            parts.append(sub.attr)
+            sub = sub.value
+        if isinstance(sub, ast.Name) and isinstance(sub.ctx, ast.Load):
+            chains.append([sub.id] + parts[::-1])
+    return chains
+
+
+class ContextSlicer:
+    """Transitive, deduplicated definition slices over a RepoIndex."""
+
+    def __init__(self, index: RepoIndex):
+        self.index = index
+        self.cache = index.cache
+        self._bindings: Dict[Path, Tuple[Bindings, List[str]]] = {}
+
+    def _file_bindings(self, path: Path) -> Tuple[Bindings, List[str]]:
+        if path not in self._bindings:
+            tree = self.cache.get(path).tree
+            self._bindings[path] = import_bindings(tree) if tree is not None else ({}, [])
+        return self._bindings[path]
+
+    def _top_level(self, path: Path) -> dict:
+        try:
+            return self.cache.get(path).top_level
+        except Exception:
+            return {}
+
+    def _resolve_chain(self, chain: List[str], from_file: Path) -> Optional[Tuple[Path, str]]:
+        """(file, top-level name) that a chain read in `from_file` refers to via its imports."""
+        bindings, star_modules = self._file_bindings(from_file)
+        head, rest = chain[0], chain[1:]
+        if head not in bindings:
+            for module in star_modules:
+                module_file = self.index.resolve_module(module, from_file)
+                if module_file is not None and head in self._top_level(module_file):
+                    return module_file, head
+            return None
+
+        module, name = bindings[head]
+        if name is not None:
+            src_file, whole_module = self.index.resolve_import(module, name, from_file)
+            if src_file is None:
+                return None
+            if not whole_module:
+                return src_file, name
+            # `from pkg import submodule`: resolve the attribute chain inside it
+            module = f"{module}.{name}"
+        # module alias: the longest module prefix of the chain that defines the next name
+        parts = module.split(".") + rest
+        for i in range(len(parts) - 1, 0, -1):
+            module_file = self.index.resolve_module(".".join(parts[:i]), from_file)
+            if module_file is not None and parts[i] in self._top_level(module_file):
+                return module_file, parts[i]
+        return None
+
+    def _collect(self, file_path) -> List[Tuple[Path, str]]:
+        file_path = Path(file_path)
+        entry = self.cache.get(file_path)
+        if entry.tree is None:
+            raise entry.error
+
+        root = file_path.resolve()
+        seen, seen_nodes, segments = set(), set(), []
+
+        def visit(path: Path, name: str):
+            if (path, name) in seen:
+                return
+            seen.add((path, name))
+            source = self.cache.get(path)
+            node = self._top_level(path).get(name)
+            if node is None:
+                # only defined in a nested scope: take the definition without its dependencies
+                try:
+                    definitions = source.definitions(name)
+                except Exception:
+                    definitions = []
+                if definitions:
+                    segments.append((path, definitions[-1]))
+                return
+            if (path, id(node)) in seen_nodes:
+                return  # another target of the same assignment
+            seen_nodes.add((path, id(node)))
+            local = self._top_level(path)
+            for chain in name_chains(node):
+                if chain[0] == name:
+                    continue
+                if chain[0] in local:
+                    visit(path, chain[0])
+                else:
+                    target = self._resolve_chain(chain, path)
+                    if target is not None:
+                        visit(*target)
+            segment = source.segment(node)
+            if segment:
+                segments.append((path, segment))
+
+        for chain in name_chains(entry.tree):
+            target = self._resolve_chain(chain, file_path)
+            # the file's own definitions are scored, not context
+            if target is not None and target[0] != root:
+                visit(*target)
+
+        deduped, texts = [], set()
+        for path, segment in segments:
+            if segment not in texts:
+                texts.add(segment)
+                deduped.append((path, segment))
+        return deduped
+
+    def slice(self, file_path) -> List[str]:
+        """Context segments for `file_path`, dependencies first; raises the file's parse error."""
+        return [segment for _, segment in self._collect(file_path)]
+
+    def files(self, file_path) -> List[Path]:
+        """Files contributing to the slice of `file_path`."""
+        try:
+            collected = self._collect(file_path)
+        except Exception:
+            return []
+        return list(dict.fromkeys(path for path, _ in collected))
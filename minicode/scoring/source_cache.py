@@ -0,0 +1,152 @@
+"""
+Parse-once source cache shared across scorer stages.
+
+A scorer touches the same file several times: reading it, parsing its
+imports, and (once per importing file) reading and re-parsing it again to
+pull out the definitions other files import. SourceCache reads and parses
+each file once per run, keyed by path + mtime + size, and derives the facts
+those stages need from the single parsed tree.
+"""
+
+import ast
+import os
+import re
+import sys
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+EXCLUDED_MODULES = set(sys.stdlib_module_names) | set(sys.builtin_module_names)
+DEFINITION_NODES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)
+
+# files kept parsed by the streaming repo scorers
+DEFAULT_MAX_ENTRIES = 4096
+
+# same line splitting as ast.get_source_segment (no form feeds or other separators)
+_LINE_RE = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)|[^\r\n]+$")
+
+
+def source_segment(lines: List[str], node: ast.AST) -> Optional[str]:
+    """Equivalent of ast.get_source_segment over pre-split lines."""
+    if getattr(node, "end_lineno", None) is None or getattr(node, "end_col_offset", None) is None:
+        return None
+    start, end = node.lineno - 1, node.end_lineno - 1
+    # column offsets are utf-8 byte offsets
+    if start == end:
+        return lines[start].encode()[node.col_offset : node.end_col_offset].decode()
+    first = lines[start].encode()[node.col_offset :].decode()
+    last = lines[end].encode()[: node.end_col_offset].decode()
+    return "".join([first, *lines[start + 1 : end], last])
+
+
+def extract_imports(tree: ast.Module) -> List[str]:
+    """Non-stdlib imports as "module::name" (from-imports) or "module" (plain imports)."""
+    imports = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.ImportFrom):
+            if node.module and node.module.split(".")[0] not in EXCLUDED_MODULES:
+                for alias in node.names:
+                    imports.append(f"{node.module}::{alias.name}")
+        elif isinstance(node, ast.Import):
+            for import_alias in node.names:
+                if import_alias.name not in EXCLUDED_MODULES:
+                    imports.append(import_alias.name)
+    return imports
+
+
+class SourceEntry:
+    """One file's text, parsed tree and lazily derived facts."""
+
+    def __init__(self, path: Path, text: str):
+        self.path = path
+        self.text = text
+        self.error: Optional[Exception] = None
+        try:
+            self.tree: Optional[ast.Module] = ast.parse(text)
+        except Exception as e:  # SyntaxError, ValueError (null bytes), ...
+            self.tree = None
+            self.error = e
+        self._lines = None
+        self._imports = None
+        self._definitions = None
+        self._top_level = None
+
+    def _require_tree(self) -> ast.Module:
+        if self.tree is None:
+            raise self.error
+        return self.tree
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = _LINE_RE.findall(self.text)
+        return self._lines
+
+    def segment(self, node: ast.AST) -> Optional[str]:
+        return source_segment(self.lines, node)
+
+    @property
+    def imports(self) -> List[str]:
+        """Imports in parse_imports format; raises the parse error for invalid files."""
+        if self._imports is None:
+            self._imports = extract_imports(self._require_tree())
+        return self._imports
+
+    def definitions(self, name: str) -> List[str]:
+        """Source of every function/class named `name`, at any depth, in ast.walk order."""
+        if self._definitions is None:
+            self._definitions = {}
+            for node in ast.walk(self._require_tree()):
+                if isinstance(node, DEFINITION_NODES):
+                    src = self.segment(node)
+                    if src:
+                        self._definitions.setdefault(node.name, []).append(src)
+        return self._definitions.get(name, [])
+
+    @property
+    def top_level(self) -> Dict[str, ast.AST]:
+        """Module-level functions, classes and simple assignments by name (last one wins)."""
+        if self._top_level is None:
+            self._top_level = {}
+            for node in self._require_tree().body:
+                if isinstance(node, DEFINITION_NODES):
+                    self._top_level[node.name] = node
+                elif isinstance(node, (ast.Assign, ast.AnnAssign)):
+                    targets = node.targets if isinstance(node, ast.Assign) else [node.target]
+                    for target in targets:
+                        if isinstance(target, ast.Name):
+                            self._top_level[target.id] = node
+        return self._top_level
+
+
+class SourceCache:
+    """Per-run cache of SourceEntry objects keyed by path, mtime and size.
+
+    With `max_entries`, the least recently used entries are evicted so the
+    cache stays bounded on very large repos.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, path) -> SourceEntry:
+        key = os.path.abspath(path)
+        stat = os.stat(key)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = self._entries.get(key)
+        if cached is not None and cached[0] == version:
+            self._entries.move_to_end(key)
+            return cached[1]
+        entry = SourceEntry(Path(path), Path(path).read_text())
+        self._entries[key] = (version, entry)
+        self._entries.move_to_end(key)
+        if self.max_entries is not None and len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
+
+    def text(self, path) -> str:
+        return self.get(path).text
+
+    def __len__(self):
+        return len(self._entries)
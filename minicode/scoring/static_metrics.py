@@ -0,0 +1,107 @@
+"""
+Static (radon) code metrics and the process pool that computes them.
+
+radon's raw and complexity analysis is pure CPU work, so the per-file metric
+dicts are computed across a process pool with chunked submission. Each layout
+passes its own metrics function (compute_code_metrics for the repo layouts,
+compute_cluster_code_metrics for codecontests clusters), so the output
+(including NaN handling for unparsable files) is exactly what the inline call
+produces.
+"""
+
+from multiprocessing import Pool, cpu_count
+from typing import Any, Callable, Iterable, Iterator, Optional, Tuple
+
+from radon.complexity import cc_visit
+from radon.raw import analyze
+
+from minicode.scoring.pipeline import DEFAULT_BUFFER_SIZE, batched
+
+METRIC_NAMES = ("loc", "sloc", "lloc", "comments", "multi", "blank", "cyclomatic")
+
+def compute_code_metrics(code: str) -> dict:
+    """radon metrics of `code`; all NaN if it cannot be analyzed (repo layouts)."""
+    try:
+        raw_metrics = analyze(code)
+        complexity_metrics = cc_visit(code)
+
+        return {
+            "loc": raw_metrics.loc,  # total lines of code
+            "sloc": raw_metrics.sloc,  # source lines of code (non-blank, non-comment)
+            "lloc": raw_metrics.lloc,  # logical lines (statements, e.g. `if`, `for`, `return`)
+            "comments": raw_metrics.comments,
+            "multi": raw_metrics.multi,
+            "blank": raw_metrics.blank,
+            "cyclomatic": sum(block.complexity for block in complexity_metrics),
+        }
+    except Exception:
+        return {name: float("nan") for name in METRIC_NAMES}
+
+
+def compute_cluster_code_metrics(code: str) -> dict:
+    """radon metrics of `code` for codecontests clusters: zeros for empty code, NaN only where analysis fails."""
+    if not code or not code.strip():
+        return {name: 0 for name in METRIC_NAMES}
+    try:
+        raw_metrics = analyze(code)
+        # Handle potential parsing errors in cc_visit
+        try:
+            complexity_metrics = cc_visit(code)
+            cyclo = sum(block.complexity for block in complexity_metrics)
+        except Exception:
+            cyclo = float("nan")
+
+        return {
+            "loc": raw_metrics.loc,
+            "sloc": raw_metrics.sloc,
+            "lloc": raw_metrics.lloc,
+            "comments": raw_metrics.comments,
+            "multi": raw_metrics.multi,
+            "blank": raw_metrics.blank,
+            "cyclomatic": cyclo,
+        }
+    except Exception as e:  # Catch broader errors during analysis
+        print(f"[WARN] Radon analysis failed: {e}. Code snippet:\n{code[:200]}...")
+        return {name: float("nan") for name in METRIC_NAMES}
+
+
+# batches smaller than this are computed inline; shipping them to the pool costs more than it saves
+MIN_PARALLEL_FILES = 16
+
+
+def stream_code_metrics(
+    items: Iterable[Tuple[Any, str]],
+    metrics_fn: Callable[[str], dict],
+    processes: Optional[int] = None,
+    batch_size: int = DEFAULT_BUFFER_SIZE,
+) -> Iterator[Tuple[Any, str, dict]]:
+    """Apply `metrics_fn` to a stream of source strings, a batch at a time across a process pool.
+
+    The pool is started before `items` is first read: when `items` is fed by a reader thread
+    (bounded_map), forking only after that thread started could copy locks it holds into the workers.
+
+    Args:
+        items: (payload, source code) pairs, consumed `batch_size` at a time
+        metrics_fn: Picklable, module-level function returning a metrics dict
+        processes: Worker count; defaults to all cores, 1 runs inline
+        batch_size: Files per pool round; bounds how many sources are held at once
+
+    Yields:
+        (payload, source code, metrics dict), in input order
+    """
+    procs = min(processes or cpu_count(), cpu_count())
+    # one pool for the whole stream
+    pool = Pool(processes=procs) if procs > 1 else None
+    try:
+        for batch in batched(items, batch_size):
+            codes = [code for _, code in batch]
+            if pool is None or len(batch) < MIN_PARALLEL_FILES:
+                results = [metrics_fn(code) for code in codes]
+            else:
+                results = pool.map(metrics_fn, codes, chunksize=max(1, len(codes) // (procs * 4)))
+            for (payload, code), metrics in zip(batch, results):
+                yield payload, code, metrics
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
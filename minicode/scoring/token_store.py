@@ -0,0 +1,158 @@
+"""
+Compact per-token logprob store.
+
+The scorers only keep the summed logprob of each file; the token-level
+arrays of every logprob request are kept here, so new analyses (per-line
+surprisal, per-function cost, other context cut points) can be run locally
+instead of re-querying the API.
+
+A store is one .npz file next to the metrics output:
+
+    logprobs   float16, every request's prompt logprobs concatenated
+    token_ids  int32, the matching tokens as ids into `vocab`
+    offsets    int64, request i spans [offsets[i], offsets[i + 1])
+    starts     int32, tokens of request i before the scored span (its context)
+    windows    int32, index of request i within its file
+    program    int32, index of request i's file in `programs`
+    programs   UTF-8 JSON list of program names
+    vocab      UTF-8 JSON list of token strings (as returned by the API)
+"""
+
+import json
+import os
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+def token_store_path(output_file) -> str:
+    """Path of the token store that accompanies a metrics output file."""
+    root, _ = os.path.splitext(str(output_file))
+    return root + ".logprobs.npz"
+
+
+def _encode_json(value) -> np.ndarray:
+    return np.frombuffer(json.dumps(value).encode("utf-8"), dtype=np.uint8)
+
+
+def _decode_json(array: np.ndarray):
+    return json.loads(array.tobytes().decode("utf-8"))
+
+
+class TokenLogprobs:
+    """Read-only view of a token store's arrays."""
+
+    def __init__(self, arrays: Dict[str, np.ndarray], programs: List[str], vocab: List[str]):
+        self.logprobs = arrays["logprobs"]
+        self.token_ids = arrays["token_ids"]
+        self.offsets = arrays["offsets"]
+        self.starts = arrays["starts"]
+        self.windows = arrays["windows"]
+        self.program = arrays["program"]
+        self.programs = programs
+        self.vocab = vocab
+
+    @classmethod
+    def load(cls, path) -> "TokenLogprobs":
+        with np.load(path, allow_pickle=False) as data:
+            arrays = {name: data[name] for name in data.files}
+        return cls(arrays, _decode_json(arrays.pop("programs")), _decode_json(arrays.pop("vocab")))
+
+    def __len__(self) -> int:
+        """Number of requests."""
+        return len(self.starts)
+
+    def requests(self, program: str) -> List[Tuple[int, np.ndarray, List[str]]]:
+        """(context tokens, logprobs, tokens) of each request of `program`, in window order."""
+        if program not in self.programs:
+            return []
+        index = np.flatnonzero(self.program == self.programs.index(program))
+        index = index[np.argsort(self.windows[index], kind="stable")]
+        return [
+            (
+                int(self.starts[i]),
+                self.logprobs[self.offsets[i] : self.offsets[i + 1]],
+                [self.vocab[t] for t in self.token_ids[self.offsets[i] : self.offsets[i + 1]]],
+            )
+            for i in index
+        ]
+
+    def program_totals(self, context: Optional[np.ndarray] = None) -> Dict[str, Tuple[float, int]]:
+        """(logprob, tokens) of each program's scored spans.
+
+        Args:
+            context: Tokens to drop from the front of each request instead of the stored `starts`
+        """
+        starts = self.starts if context is None else np.asarray(context)
+        lengths = np.diff(self.offsets)
+        starts = np.minimum(starts, lengths)
+        # prefix sums turn every span sum into one subtraction
+        cumulative = np.concatenate([[0.0], np.cumsum(np.nan_to_num(self.logprobs), dtype=np.float64)])
+        span_logprobs = cumulative[self.offsets[1:]] - cumulative[self.offsets[:-1] + starts]
+        span_tokens = lengths - starts
+        logprobs = np.bincount(self.program, weights=span_logprobs, minlength=len(self.programs))
+        tokens = np.bincount(self.program, weights=span_tokens, minlength=len(self.programs))
+        return {name: (float(logprobs[i]), int(tokens[i])) for i, name in enumerate(self.programs)}
+
+
+class TokenStore:
+    """Collects the per-token logprobs of a run and writes them as one .npz."""
+
+    def __init__(self):
+        self._requests: List[Tuple[str, int, int, np.ndarray, List[str]]] = []
+        self._programs = set()
+
+    def add(self, program: str, window: int, start: int, logprobs: Iterable[Optional[float]], tokens: List[str]):
+        """Record one request's prompt logprobs; `start` is where its scored span begins."""
+        values = np.array([np.nan if lp is None else lp for lp in logprobs], dtype=np.float16)
+        self._requests.append((program, window, start, values, list(tokens)))
+        self._programs.add(program)
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def save(self, path, keep: Optional[Iterable[str]] = None):
+        """Write the store to `path`.
+
+        Args:
+            path: .npz file; written atomically
+            keep: Programs scored by an earlier run (resumed or reused files) whose
+                requests are carried over from an existing store at `path`; those
+                missing from it are reported
+        """
+        requests = list(self._requests)
+        if keep is not None:
+            carried = set(keep) - self._programs
+            previous = TokenLogprobs.load(path) if os.path.exists(path) else None
+            found = carried & set(previous.programs) if previous is not None else set()
+            for program in sorted(found):
+                for window, (start, logprobs, tokens) in enumerate(previous.requests(program)):
+                    requests.append((program, window, start, logprobs, tokens))
+            missing = sorted(carried - found)
+            if missing:
+                # e.g. the earlier run was killed before it saved its store
+                print(
+                    f"[WARN] {len(missing)} resumed or reused files have no token logprobs in {path} "
+                    f"(first: {missing[0]}); rescore them without --resume to record them"
+                )
+
+        programs = sorted({request[0] for request in requests})
+        program_index = {program: i for i, program in enumerate(programs)}
+        vocab: Dict[str, int] = {}
+        token_ids = [np.array([vocab.setdefault(t, len(vocab)) for t in r[4]], dtype=np.int32) for r in requests]
+        lengths = [len(r[3]) for r in requests]
+        arrays = {
+            "logprobs": np.concatenate([r[3] for r in requests] or [np.empty(0, np.float16)]).astype(np.float16),
+            "token_ids": np.concatenate(token_ids or [np.empty(0, np.int32)]),
+            "offsets": np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)]).astype(np.int64),
+            "starts": np.array([r[2] for r in requests], dtype=np.int32),
+            "windows": np.array([r[1] for r in requests], dtype=np.int32),
+            "program": np.array([program_index[r[0]] for r in requests], dtype=np.int32),
+            "programs": _encode_json(programs),
+            "vocab": _encode_json(list(vocab)),
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(f, **arrays)
+        os.replace(tmp_path, path)
+        print(f"Written {int(arrays['offsets'][-1])} token logprobs of {len(programs)} files to {path}")
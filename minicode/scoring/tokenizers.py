@@ -0,0 +1,32 @@
+"""
+Tokenizer registry shared by the scoring layouts.
+
+tiktoken encodings are loaded once per process and reused, instead of every
+scorer (and every count_tokens call) resolving its own.
+"""
+
+from functools import lru_cache
+from typing import Optional
+
+import tiktoken
+
+# used for models tiktoken has no mapping for (e.g. qwen2.5)
+FALLBACK_ENCODING = "cl100k_base"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(name: str = FALLBACK_ENCODING):
+    """The tiktoken encoding called `name`."""
+    return tiktoken.get_encoding(name)
+
+
+@lru_cache(maxsize=None)
+def encoding_for_model(model: str, fallback: Optional[str] = None):
+    """The tiktoken encoding for `model`, else the `fallback` encoding, else None."""
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        if fallback is None:
+            return None
+        print(f"[WARN] No tiktoken encoding for {model}; using '{fallback}'.")
+        return get_encoding(fallback)
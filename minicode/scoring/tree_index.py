@@ -0,0 +1,128 @@
+"""
+Filesystem index of a library tree, shared by setup and scoring.
+
+Setup (finding persona directories, placing __init__.py files) and scoring
+(listing programs, building the RepoIndex) all need the same two things from
+a tree: its directories and its Python files. A TreeIndex gets both from a
+single os.scandir walk that never descends into IGNORED_DIRS (or the
+leftovers of an interrupted staged rebuild), so a populated .venv or .git
+costs nothing, and tree_index() keeps the indexes of recently
+used trees for reuse within a process. A cached index is checked against the
+inode and mtime of every directory it covers (only adding, removing or
+renaming entries changes what it records) and rescanned if any changed, or
+if any was modified so shortly before the scan that a later change could
+share its (coarse) timestamp, as git does for racily clean files.
+"""
+
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterator, List, Optional, Tuple
+
+# VCS metadata, virtualenvs and tool caches, never scored and never inputs to a setup step
+IGNORED_DIRS = frozenset(
+    {".venv", "venv", "__pycache__", ".git", "node_modules", ".pytest_cache", ".mypy_cache", ".ruff_cache"}
+)
+# leftovers of an interrupted staged rebuild (minicode.setup.incremental): .<tree>.staging, .<tree>.old
+BUILD_DIR_SUFFIXES = (".staging", ".old")
+# trees whose indexes tree_index() keeps
+CACHE_SIZE = 64
+# directories modified less than this long before a scan may change again without a new mtime
+RACY_NS = 1_000_000_000
+
+
+def is_ignored_dir(name: str, ignored: FrozenSet[str] = IGNORED_DIRS) -> bool:
+    """Whether a directory named `name` is skipped: one of `ignored`, or a staged rebuild's leftover."""
+    return name in ignored or (name.startswith(".") and name.endswith(BUILD_DIR_SUFFIXES))
+
+
+class TreeIndex:
+    """Directories and Python files under `root`, from one pruned scandir walk."""
+
+    def __init__(self, root, ignored: FrozenSet[str] = IGNORED_DIRS):
+        self.root = Path(os.path.abspath(root))
+        self.ignored = frozenset(ignored)
+        # directory relative to root ("" for root) -> (sorted subdirectories, sorted Python files)
+        self._entries: Dict[str, Tuple[List[str], List[str]]] = {}
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._scanned_ns = time.time_ns()
+        self._scan()
+
+    def _scan(self):
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            path = os.path.join(self.root, rel)
+            dirs, files = [], []
+            try:
+                st = os.stat(path)
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            if not is_ignored_dir(entry.name, self.ignored):
+                                dirs.append(entry.name)
+                        elif entry.name.endswith(".py") and entry.is_file():
+                            files.append(entry.name)
+            except OSError:
+                continue
+            self._stamps[rel] = (st.st_ino, st.st_mtime_ns)
+            self._entries[rel] = (sorted(dirs), sorted(files))
+            stack.extend(os.path.join(rel, name) for name in dirs)
+
+    def is_fresh(self) -> bool:
+        """Whether no indexed directory has gained, lost or renamed an entry since the scan."""
+        for rel, stamp in self._stamps.items():
+            try:
+                st = os.stat(os.path.join(self.root, rel))
+            except OSError:
+                return False
+            if (st.st_ino, st.st_mtime_ns) != stamp or st.st_mtime_ns >= self._scanned_ns - RACY_NS:
+                return False
+        return bool(self._stamps) or not self.root.is_dir()
+
+    def _rel(self, directory) -> str:
+        rel = os.path.relpath(os.path.abspath(directory), self.root)
+        return "" if rel == "." else rel
+
+    def walk(self, under=None) -> Iterator[Tuple[Path, List[str], List[str]]]:
+        """(directory, subdirectories, Python files) top-down under `under` (default: root), paths based on `under`."""
+        base = self.root if under is None else Path(under)
+        start = self._rel(base)
+        if start not in self._entries:
+            return
+        stack = [(start, base)]
+        while stack:
+            rel, path = stack.pop()
+            dirs, files = self._entries[rel]
+            yield path, dirs, files
+            stack.extend((os.path.join(rel, name), path / name) for name in reversed(dirs))
+
+    def directories(self, under=None) -> List[Path]:
+        return [path for path, _, _ in self.walk(under)]
+
+    def python_files(self, under=None) -> List[Path]:
+        return [path / name for path, _, files in self.walk(under) for name in files]
+
+    def has_python(self, under=None) -> bool:
+        return any(files for _, _, files in self.walk(under))
+
+    def is_package(self, directory) -> bool:
+        entry = self._entries.get(self._rel(directory))
+        return entry is not None and "__init__.py" in entry[1]
+
+
+_CACHE: "OrderedDict[Tuple[str, FrozenSet[str]], TreeIndex]" = OrderedDict()
+
+
+def tree_index(root, ignored: Optional[FrozenSet[str]] = None) -> TreeIndex:
+    """TreeIndex of `root`, reused from earlier calls unless the tree's directories changed since."""
+    ignored = IGNORED_DIRS if ignored is None else frozenset(ignored)
+    key = (os.path.abspath(root), ignored)
+    index = _CACHE.pop(key, None)
+    if index is None or not index.is_fresh():
+        index = TreeIndex(root, ignored)
+    _CACHE[key] = index
+    while len(_CACHE) > CACHE_SIZE:
+        _CACHE.popitem(last=False)
+    return index
@@ -0,0 +1,15 @@
+# Shared repository setup infrastructure
+"""
+The steps behind setup_repos and setup_large_repos that are not specific to
+either split: getting persona repositories onto disk and preparing them.
+
+These tools provide:
+- Concurrent, bounded git cloning with shallow/partial clones, timeouts and retries
+- Persistent bare mirrors of persona repositories, for local and offline clones
+- A pinned local manifest of the minicode-repos dataset (rows plus commit SHAs)
+- A single-pass, token-aware import rewriter shared by both setups
+- Reflink/hardlink copies of persona trees and copy-on-write refactor workspaces
+- A process pool running each library's setup with captured logs and isolated failures
+- Incremental, staged rebuilds of unified trees keyed on persona content hashes
+- Per-project merging of persona requirements with conflict reports and an optional uv lock
+"""
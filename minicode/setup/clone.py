@@ -0,0 +1,214 @@
+"""
+Concurrent git cloning.
+
+Setup clones hundreds of persona repositories, each a small, mostly
+network-bound `git clone`. CloneManager runs them on a bounded thread pool
+(each clone is its own git process) and, per clone:
+1. Clones shallow (--depth) and/or partial (--filter) when asked to
+2. Kills clones that exceed a timeout and retries failures with backoff
+3. Clones into a temporary directory renamed into place, so a killed or
+   failed attempt never leaves a half-cloned repository behind
+4. Checks out the job's pinned commit, if it has one
+5. Skips repositories already cloned by an earlier run
+6. With a MirrorStore, clones from a local bare mirror instead (see mirrors.py)
+
+Progress is printed as clones finish, and a summary of the failures at the end.
+"""
+
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+from minicode.setup.git import repo_name, run_git
+from minicode.setup.mirrors import DEFAULT_MIRROR_DIR, MirrorStore
+
+DEFAULT_WORKERS = 8
+DEFAULT_TIMEOUT = 600.0
+
+
+@dataclass
+class CloneJob:
+    """Clone `url` into `parent_dir`/`name` (the repository name by default), at `commit` if given."""
+
+    url: str
+    parent_dir: str
+    name: Optional[str] = None
+    commit: Optional[str] = None
+
+    @property
+    def dest(self) -> str:
+        return os.path.join(self.parent_dir, self.name or repo_name(self.url))
+
+
+@dataclass
+class CloneResult:
+    job: CloneJob
+    status: str  # "cloned", "skipped" (already on disk) or "failed"
+    attempts: int = 0
+    seconds: float = 0.0
+    error: str = ""
+
+    @property
+    def ok(self) -> bool:
+        return self.status != "failed"
+
+
+class CloneManager:
+    """Run git clones concurrently on a bounded pool.
+
+    Args:
+        workers: Clones in flight at once
+        depth: Shallow-clone depth (None for full history)
+        filter: Partial-clone filter spec, e.g. "blob:none" (None for a full clone)
+        timeout: Seconds before a clone attempt is killed
+        retries: Further attempts after a failed or timed-out clone
+        backoff: Seconds before the first retry, doubled for each further one
+        git: git executable
+        mirrors: Optional MirrorStore to clone through
+    """
+
+    def __init__(
+        self,
+        workers: int = DEFAULT_WORKERS,
+        depth: Optional[int] = None,
+        filter: Optional[str] = None,
+        timeout: Optional[float] = DEFAULT_TIMEOUT,
+        retries: int = 2,
+        backoff: float = 2.0,
+        git: str = "git",
+        mirrors: Optional[MirrorStore] = None,
+    ):
+        self.workers = max(1, workers)
+        self.depth = depth
+        self.filter = filter
+        self.timeout = timeout
+        self.retries = max(0, retries)
+        self.backoff = backoff
+        self.git = git
+        self.mirrors = mirrors
+
+    def command(self, url: str, dest: str) -> List[str]:
+        cmd = [self.git, "clone", "--quiet"]
+        if self.depth:
+            cmd += ["--depth", str(self.depth)]
+        if self.filter:
+            cmd += [f"--filter={self.filter}"]
+        return cmd + ["--", url, dest]
+
+    def checkout(self, dest: str, commit: str) -> Optional[str]:
+        """Detach `dest` at `commit`, fetching it first if the clone does not have it."""
+        if run_git([self.git, "-C", dest, "cat-file", "-e", f"{commit}^{{commit}}"]) is not None:
+            if self.mirrors is not None and self.mirrors.offline:
+                return f"pinned commit {commit} is not in the mirror (offline)"
+            fetch = [self.git, "-C", dest, "fetch", "--quiet"]
+            if self.depth and self.mirrors is None:
+                fetch += ["--depth", str(self.depth)]
+            error = run_git(fetch + ["origin", commit], self.timeout)
+            if error is not None:
+                return f"could not fetch pinned commit {commit}: {error}"
+        return run_git([self.git, "-C", dest, "checkout", "--quiet", "--detach", commit], self.timeout)
+
+    def clone(self, job: CloneJob) -> CloneResult:
+        """Clone one repository, retrying on failure; never raises for git errors."""
+        dest = job.dest
+        if os.path.isdir(os.path.join(dest, ".git")):
+            return CloneResult(job, "skipped")
+        if os.path.exists(dest):
+            return CloneResult(job, "failed", error=f"destination {dest} exists and is not a git repository")
+
+        os.makedirs(job.parent_dir, exist_ok=True)
+        if self.mirrors is not None and self.mirrors.offline and not self.mirrors.has(job.url):
+            return CloneResult(job, "failed", error=f"no mirror in {self.mirrors.root} (offline)")
+        tmp_dest = os.path.join(job.parent_dir, f".{os.path.basename(dest)}.partial")
+        start = time.monotonic()
+        for attempt in range(1, self.retries + 2):
+            shutil.rmtree(tmp_dest, ignore_errors=True)
+            if self.mirrors is not None:
+                error = self.mirrors.clone(job.url, tmp_dest, self.git, self.timeout)
+            else:
+                error = run_git(self.command(job.url, tmp_dest), self.timeout)
+            if error is None and job.commit:
+                error = self.checkout(tmp_dest, job.commit)
+            if error is None:
+                os.replace(tmp_dest, dest)
+                return CloneResult(job, "cloned", attempt, time.monotonic() - start)
+            if attempt <= self.retries:
+                time.sleep(self.backoff * 2 ** (attempt - 1))
+        shutil.rmtree(tmp_dest, ignore_errors=True)
+        return CloneResult(job, "failed", self.retries + 1, time.monotonic() - start, error)
+
+    def run(self, jobs: Iterable[CloneJob]) -> List[CloneResult]:
+        """Clone every job, printing progress as they finish; results are in job order.
+
+        Jobs with the same destination are cloned once and share its result.
+        """
+        jobs = list(jobs)
+        first = {}
+        for idx, job in enumerate(jobs):
+            first.setdefault(os.path.abspath(job.dest), idx)
+        results: List[Optional[CloneResult]] = [None] * len(jobs)
+        done = 0
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.clone, jobs[idx]): idx for idx in first.values()}
+            for future in as_completed(futures):
+                result = results[futures[future]] = future.result()
+                done += 1
+                progress = f"[{done}/{len(futures)}]"
+                if result.status == "failed":
+                    print(f"{progress} [WARN] failed {result.job.url}: {result.error}")
+                elif result.status == "skipped":
+                    print(f"{progress} already cloned {result.job.dest}")
+                else:
+                    print(f"{progress} cloned {result.job.url} ({result.seconds:.1f}s)")
+        for idx, job in enumerate(jobs):
+            results[idx] = results[idx] or results[first[os.path.abspath(job.dest)]]
+        return results
+
+
+def print_summary(results: List[CloneResult]):
+    results = list({id(r): r for r in results}.values())  # duplicate jobs share a result
+    counts = {status: sum(r.status == status for r in results) for status in ("cloned", "skipped", "failed")}
+    print(f"Clones: {counts['cloned']} cloned, {counts['skipped']} already present, {counts['failed']} failed")
+    for result in results:
+        if not result.ok:
+            print(f"  {result.job.url} -> {result.job.dest} ({result.attempts} attempts): {result.error}")
+
+
+def clone_all(jobs: Iterable[CloneJob], **options) -> List[CloneResult]:
+    """Clone `jobs` with a CloneManager(**options) and print the summary."""
+    results = CloneManager(**options).run(jobs)
+    print_summary(results)
+    return results
+
+
+def add_clone_arguments(parser):
+    """Clone flags for the setup CLIs: concurrency, depth/filter, timeouts and retries, and mirrors."""
+    parser.add_argument("--clone_workers", type=int, default=DEFAULT_WORKERS, help="concurrent git clones")
+    parser.add_argument("--depth", type=int, default=1, help="shallow-clone depth (0 for full history)")
+    parser.add_argument("--filter", type=str, default=None, help="partial-clone filter, e.g. blob:none")
+    parser.add_argument("--clone_timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds per clone attempt")
+    parser.add_argument("--clone_retries", type=int, default=2, help="retries per failed clone")
+    parser.add_argument(
+        "--mirror_dir", type=str, default=None, help=f"clone through bare mirrors kept here, e.g. {DEFAULT_MIRROR_DIR}"
+    )
+    parser.add_argument(
+        "--offline", action="store_true", default=False, help="clone only from existing mirrors, without the network"
+    )
+
+
+def clone_options(args) -> dict:
+    """CloneManager options from the parsed add_clone_arguments flags (--offline implies the default --mirror_dir)."""
+    mirrors = None
+    if args.mirror_dir or args.offline:
+        mirrors = MirrorStore(args.mirror_dir or DEFAULT_MIRROR_DIR, offline=args.offline)
+    return dict(
+        workers=args.clone_workers,
+        depth=args.depth or None,
+        filter=args.filter,
+        timeout=args.clone_timeout,
+        retries=args.clone_retries,
+        mirrors=mirrors,
+    )
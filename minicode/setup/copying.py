@@ -0,0 +1,121 @@
+"""
+Cheap copies of persona trees.
+
+Unified trees and refactor workspaces are mostly copies of files that are
+never modified. Instead of copying their bytes, a file can be:
+- reflinked (a copy-on-write clone, on btrfs, XFS and similar): a real,
+  independent copy that shares blocks until one side is written
+- hardlinked: the same inode under a second name, so an in-place write
+  shows through both names
+
+Modes:
+    auto      reflink, falling back to a real copy (always safe)
+    reflink   same as auto, but says so when the filesystem cannot reflink
+    hardlink  hardlink, falling back to a real copy (e.g. across filesystems)
+    copy      always a real copy (shutil.copy2)
+
+Hardlinks are only safe for trees that are written by replacing files, never
+in place: the setups write through `write_text` (a temporary file renamed
+over the old one), which gives the written path its own inode and leaves
+the file it was linked to alone. Trees agents edit in place must use auto.
+A destination that already exists is replaced, never written through.
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from collections import Counter
+from typing import Callable, Optional
+
+MODES = ("auto", "reflink", "hardlink", "copy")
+# linux/fs.h: _IOW(0x94, 9, int)
+FICLONE = 0x40049409
+# permissions of newly written files (mkstemp creates them 0600)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def reflink(src: str, dst: str) -> bool:
+    """Clone src into a new dst sharing its blocks; False (and no dst) where the filesystem can't."""
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    with open(src, "rb") as s:
+        fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.ioctl(fd, FICLONE, s.fileno())
+        except OSError:
+            os.close(fd)
+            os.unlink(dst)
+            return False
+        os.close(fd)
+    return True
+
+
+def copy_file(src: str, dst: str, mode: str = "auto") -> str:
+    """Copy src to dst (replacing dst) the cheapest way `mode` allows; how it was copied."""
+    if os.path.lexists(dst):
+        os.unlink(dst)
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    elif mode in ("auto", "reflink"):
+        if reflink(src, dst):
+            shutil.copystat(src, dst)
+            return "reflink"
+    elif mode != "copy":
+        raise ValueError(f"unknown copy mode {mode!r} (expected one of {', '.join(MODES)})")
+    shutil.copy2(src, dst)
+    return "copy"
+
+
+def copytree(
+    src: str,
+    dst: str,
+    mode: str = "auto",
+    ignore: Optional[Callable] = None,
+    dirs_exist_ok: bool = False,
+) -> Counter:
+    """shutil.copytree with copy_file; counts of how the files were copied."""
+    counts = Counter()
+
+    def copy_function(s, d):
+        counts[copy_file(s, d, mode)] += 1
+
+    shutil.copytree(src, dst, ignore=ignore, copy_function=copy_function, dirs_exist_ok=dirs_exist_ok)
+    if mode == "reflink" and counts["copy"]:
+        print(f"[WARN] {dst}: the filesystem cannot reflink; copied {counts['copy']} files instead")
+    return counts
+
+
+def write_text(path: str, text: str, encoding: Optional[str] = None, errors: Optional[str] = None):
+    """Write `text` to `path` by replacing the file (atomically), so a hardlinked original is never written through."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, errors=errors) as f:
+            f.write(text)
+        if os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        else:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def add_copy_arguments(parser, modes=MODES):
+    """--copy_mode for the setup CLIs, limited to `modes`."""
+    parser.add_argument(
+        "--copy_mode",
+        choices=modes,
+        default="auto",
+        help=f"how persona files are copied ({', '.join(modes)}); auto reflinks where the filesystem can",
+    )
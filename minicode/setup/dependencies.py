@@ -0,0 +1,134 @@
+"""
+Merging persona requirements into one installable set.
+
+A unified pyproject.toml depends on the union of its personas' requirements.
+Deduplicating the requirement strings textually kept `numpy>=1.20` and
+`numpy>=1.24` as two entries, and let contradictory ones (`numpy<1.20` and
+`numpy>=2`) through to a `pip install -e .` that failed minutes later.
+Requirements are instead parsed with `packaging` and merged per project:
+1. Names and extras are canonicalized (`Numpy[Dev]` is `numpy[dev]`), extras
+   are unioned and version specifiers intersected (`numpy>=1.20,>=1.24`)
+2. Requirements under a marker (`; python_version < "3.11"`) are merged with
+   those under the same normalized marker, and kept apart from the rest
+3. A merged specifier no version satisfies is returned as a conflict, with
+   the personas that asked for each part, and left unconstrained so the
+   install still resolves
+4. Strings `packaging` cannot parse are kept verbatim, with a warning
+
+write_lock optionally resolves a unified project into a pinned lock with
+`uv pip compile`, which catches the conflicts only an index can show.
+"""
+
+import os
+import subprocess
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from packaging.markers import Marker
+from packaging.requirements import InvalidRequirement, Requirement
+from packaging.specifiers import SpecifierSet
+from packaging.utils import canonicalize_name
+from packaging.version import InvalidVersion, Version
+
+
+@dataclass
+class _Merged:
+    name: str
+    marker: Optional[Marker]
+    extras: Set[str] = field(default_factory=set)
+    specifier: SpecifierSet = field(default_factory=SpecifierSet)
+    url: Optional[str] = None
+    sources: List[Tuple[str, str]] = field(default_factory=list)  # (origin, requirement as written)
+
+    def __str__(self) -> str:
+        extras = f"[{','.join(sorted(self.extras))}]" if self.extras else ""
+        requirement = f"{self.name}{extras} @ {self.url}" if self.url else f"{self.name}{extras}{self.specifier}"
+        if self.marker is not None:
+            requirement += f"{' ' if self.url else ''}; {self.marker}"
+        return requirement
+
+
+def _candidates(specifier: SpecifierSet) -> Set[Version]:
+    """Versions at and just past every bound of `specifier`: one of them satisfies it if any version does."""
+    candidates = {Version("0"), Version("0.1")}
+    for spec in specifier:
+        try:
+            version = Version(spec.version[:-2] if spec.version.endswith(".*") else spec.version)
+        except InvalidVersion:
+            continue
+        release = version.release
+        candidates.add(version)
+        for suffix in ((1,), (0, 1)):
+            candidates.add(Version(".".join(map(str, release + suffix))))
+        candidates.add(Version(str(release[0] + 1)))
+    return candidates
+
+
+def satisfiable(specifier: SpecifierSet) -> bool:
+    """Whether some version (pre-releases included) satisfies every part of `specifier`."""
+    if any(spec.operator == "===" for spec in specifier):
+        return True  # arbitrary equality: nothing to reason about
+    return any(specifier.contains(version, prereleases=True) for version in _candidates(specifier))
+
+
+def merge_requirements(groups: Iterable[Tuple[str, Iterable[str]]]) -> Tuple[List[str], List[str]]:
+    """Merge (origin, requirement strings) groups, e.g. one per persona.
+
+    Returns:
+        The merged requirement strings, in first-seen order, and a message per conflict found.
+    """
+    merged: Dict[Tuple[str, str], _Merged] = {}
+    unparsed: List[str] = []
+    conflicts: List[str] = []
+    for origin, requirements in groups:
+        for text in requirements:
+            try:
+                requirement = Requirement(text)
+            except InvalidRequirement as e:
+                if text not in unparsed:
+                    reason = str(e).splitlines()[0]
+                    print(f"[WARN] keeping unparseable requirement {text!r} from {origin} as is: {reason}")
+                    unparsed.append(text)
+                continue
+            marker = requirement.marker
+            key = (canonicalize_name(requirement.name), str(marker) if marker is not None else "")
+            entry = merged.setdefault(key, _Merged(key[0], marker))
+            entry.extras.update(canonicalize_name(extra) for extra in requirement.extras)
+            entry.specifier &= requirement.specifier
+            if requirement.url:
+                if entry.url and entry.url != requirement.url:
+                    conflicts.append(f"{entry.name}: {origin} wants {requirement.url}, not {entry.url}")
+                entry.url = entry.url or requirement.url
+            entry.sources.append((origin, text))
+
+    for entry in merged.values():
+        if entry.url and len(entry.specifier):
+            # a direct reference fixes the version
+            entry.specifier = SpecifierSet()
+        elif not satisfiable(entry.specifier):
+            asked = "; ".join(f"{origin}: {text}" for origin, text in entry.sources)
+            conflicts.append(f"{entry.name}{entry.specifier} cannot be satisfied ({asked}); leaving it unconstrained")
+            entry.specifier = SpecifierSet()
+    return [str(entry) for entry in merged.values()] + unparsed, conflicts
+
+
+def write_lock(
+    project_dir: str, output: str = "requirements.lock", uv: str = "uv", timeout: float = 600
+) -> Optional[str]:
+    """Resolve `project_dir`'s pyproject.toml (all extras) into a pinned `output` with uv; the error if that failed."""
+    path = os.path.join(project_dir, output)
+    cmd = [uv, "pip", "compile", "pyproject.toml", "--all-extras", "--quiet", "-o", output]
+    try:
+        result = subprocess.run(cmd, cwd=project_dir, capture_output=True, text=True, timeout=timeout)
+    except FileNotFoundError:
+        return f"{uv} not found; install uv to write {output}"
+    except subprocess.TimeoutExpired:
+        error = f"uv pip compile timed out after {timeout:.0f}s"
+    else:
+        if result.returncode == 0:
+            return None
+        error = result.stderr.strip() or f"uv pip compile exited with {result.returncode}"
+    if os.path.exists(path):
+        os.unlink(path)
+    return error
+
@@ -0,0 +1,142 @@
+"""
+Per-library setup on a process pool.
+
+Libraries (and the groups setup_repos splits them into) are independent, so
+both setups hand their per-library work to run_libraries instead of looping
+over it:
+1. Each task runs in its own worker process, with its output (prints and any
+   subprocess output, e.g. git) captured in `<log_dir>/<name>.log` instead of
+   interleaving on the terminal
+2. A task that raises is recorded as failed, with its traceback in its log,
+   and the other tasks carry on
+3. One progress line is printed per finished task, and a summary table at
+   the end
+
+Workers split the cores between them: import rewriting inside a worker uses
+(cores / workers) processes rather than every core.
+"""
+
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from minicode.setup import rewrite
+
+
+@dataclass
+class LibraryTask:
+    """One independent unit of setup: fn(*args, **kwargs), logged under `name`."""
+
+    name: str
+    fn: Callable
+    args: tuple = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class LibraryResult:
+    """How a LibraryTask went: status is ok or failed."""
+
+    name: str
+    status: str
+    seconds: float = 0.0
+    log: Optional[str] = None
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+@contextmanager
+def captured_output(path: str):
+    """Send stdout and stderr, of this process and of its subprocesses, to the file at `path`."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = os.dup(1), os.dup(2)
+    with open(path, "w", buffering=1, encoding="utf-8", errors="replace") as log:
+        os.dup2(log.fileno(), 1)
+        os.dup2(log.fileno(), 2)
+        try:
+            with redirect_stdout(log), redirect_stderr(log):
+                yield
+        finally:
+            os.dup2(saved[0], 1)
+            os.dup2(saved[1], 2)
+            os.close(saved[0])
+            os.close(saved[1])
+
+
+def run_task(task: LibraryTask, log_dir: str) -> LibraryResult:
+    """Run `task` with its output captured in its log; a failure is recorded, never raised."""
+    log = os.path.join(log_dir, f"{task.name}.log")
+    start = time.perf_counter()
+    status, error = "ok", None
+    with captured_output(log):
+        try:
+            task.fn(*task.args, **task.kwargs)
+        except (Exception, SystemExit) as e:
+            traceback.print_exc()
+            status, error = "failed", f"{type(e).__name__}: {e}"
+    return LibraryResult(task.name, status, time.perf_counter() - start, log, error)
+
+
+def _init_worker(rewrite_workers: int):
+    rewrite.DEFAULT_WORKERS = rewrite_workers
+
+
+def run_libraries(
+    tasks: Sequence[LibraryTask], workers: Optional[int] = None, log_dir: str = "logs"
+) -> List[LibraryResult]:
+    """Run `tasks` on up to `workers` processes (in this process for one); results in task order."""
+    os.makedirs(log_dir, exist_ok=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(tasks)))
+    print(f"Setting up {len(tasks)} libraries on {workers} workers (logs in {log_dir})")
+    results: Dict[str, LibraryResult] = {}
+
+    def report(result):
+        results[result.name] = result
+        detail = "" if result.ok else f" ({result.error}; see {result.log})"
+        print(f"[{len(results)}/{len(tasks)}] {result.name}: {result.status} in {result.seconds:.1f}s{detail}")
+
+    if workers == 1:
+        for task in tasks:
+            report(run_task(task, log_dir))
+    else:
+        rewrite_workers = max(1, (os.cpu_count() or 1) // workers)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(rewrite_workers,)) as executor:
+            futures = {executor.submit(run_task, task, log_dir): task for task in tasks}
+            for future in as_completed(futures):
+                task = futures[future]
+                try:
+                    report(future.result())
+                except BrokenProcessPool as e:
+                    # a worker died outright (e.g. killed for memory); its log stops where it did
+                    log = os.path.join(log_dir, f"{task.name}.log")
+                    report(LibraryResult(task.name, "failed", 0.0, log, f"worker process died: {e}"))
+    return [results[task.name] for task in tasks]
+
+
+def print_library_summary(results: Sequence[LibraryResult]):
+    width = max([len("Library")] + [len(r.name) for r in results])
+    print(f"\n{'Library':<{width}}  {'Status':<6}  {'Seconds':>8}  Log")
+    for r in results:
+        print(f"{r.name:<{width}}  {r.status:<6}  {r.seconds:>8.1f}  {r.log}")
+    failed = [r for r in results if not r.ok]
+    print(f"{len(results) - len(failed)} of {len(results)} libraries set up, {len(failed)} failed")
+    for r in failed:
+        print(f"  {r.name}: {r.error}")
+
+
+def add_library_arguments(parser, log_dir: str):
+    """Library pool flags for the setup CLIs."""
+    parser.add_argument(
+        "--library_workers", type=int, default=None, help="libraries set up in parallel (default: one per core)"
+    )
+    parser.add_argument("--log_dir", type=str, default=log_dir, help="directory for each library's setup log")
@@ -0,0 +1,42 @@
+"""Running git for setup: no prompts, a timeout, and errors as one-line messages."""
+
+import os
+import subprocess
+from typing import List, Optional, Tuple
+
+
+def repo_name(url: str) -> str:
+    """Directory name `git clone <url>` clones into."""
+    name = url.rstrip("/").rsplit("/", 1)[-1].rsplit(":", 1)[-1]
+    return name[: -len(".git")] if name.endswith(".git") else name
+
+
+def git_output(cmd: List[str], timeout: Optional[float] = None, cwd: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    """(stdout, error) of a git command; error is None on success, otherwise the last line git printed."""
+    # never prompt for credentials (a missing repo would block its worker forever)
+    env = dict(os.environ, GIT_TERMINAL_PROMPT="0")
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, env=env, cwd=cwd)
+    except subprocess.TimeoutExpired:
+        return "", f"timed out after {timeout:g}s"
+    except OSError as e:
+        return "", str(e)
+    if proc.returncode == 0:
+        return proc.stdout, None
+    lines = (proc.stderr or proc.stdout).strip().splitlines()
+    return proc.stdout, lines[-1] if lines else f"git exited with {proc.returncode}"
+
+
+def run_git(cmd: List[str], timeout: Optional[float] = None, cwd: Optional[str] = None) -> Optional[str]:
+    """Run a git command; None on success, otherwise the error."""
+    return git_output(cmd, timeout, cwd)[1]
+
+
+def remote_head(url: str, git: str = "git", timeout: Optional[float] = None) -> Tuple[Optional[str], Optional[str]]:
+    """(commit SHA of the remote's HEAD, error), without cloning."""
+    output, error = git_output([git, "ls-remote", "--", url, "HEAD"], timeout)
+    if error is not None:
+        return None, error
+    if not output.strip():
+        return None, "remote has no HEAD"
+    return output.split()[0], None
@@ -0,0 +1,133 @@
+"""
+Incremental rebuilds of generated trees.
+
+A unified tree depends only on its inputs: the persona trees it is built
+from, a few repository files (e.g. prompts/REFACTOR.md) and the code that
+generates it. Each build records them in a manifest next to the tree,
+`.<tree>.json`:
+
+    {"version": 1, "inputs": {"<persona>": "<sha256 of its tree>", ...}}
+
+so a rerun with the same inputs and generator version skips the tree
+entirely. A tree whose inputs changed is rebuilt from scratch in a staging
+directory (`.<tree>.staging`) and then swapped in, so the tree is never
+half-built and never keeps stale files from an earlier build.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Mapping, Optional, Union
+
+from minicode.scoring.tree_index import is_ignored_dir
+
+_CHUNK = 1 << 20
+
+
+def _hash_into(h, path: str):
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK), b""):
+            h.update(chunk)
+
+
+def tree_hash(root) -> Optional[str]:
+    """sha256 over the relative paths and contents of the files under `root` (or of the file); None if missing.
+
+    IGNORED_DIRS (VCS metadata, virtualenvs, caches) and staging leftovers are not inputs and are skipped.
+    """
+    root = str(root)
+    h = hashlib.sha256()
+    if os.path.isfile(root):
+        _hash_into(h, root)
+        return h.hexdigest()
+    if not os.path.isdir(root):
+        return None
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(name for name in dirnames if not is_ignored_dir(name))
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            if not os.path.isfile(path):  # dangling symlinks, sockets
+                continue
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            h.update(rel.encode("utf-8", "surrogateescape") + b"\0")
+            file_hash = hashlib.sha256()
+            _hash_into(file_hash, path)
+            h.update(file_hash.digest())
+    return h.hexdigest()
+
+
+def input_hashes(inputs: Mapping[str, os.PathLike]) -> Dict[str, Optional[str]]:
+    """tree_hash of each named input path."""
+    return {name: tree_hash(path) for name, path in sorted(inputs.items())}
+
+
+def manifest_path(target) -> Path:
+    target = Path(target)
+    return target.parent / f".{target.name}.json"
+
+
+def staging_path(target) -> Path:
+    target = Path(target)
+    return target.parent / f".{target.name}.staging"
+
+
+def old_path(target) -> Path:
+    target = Path(target)
+    return target.parent / f".{target.name}.old"
+
+
+def clear_stale_builds(target):
+    """Remove the staging and replaced trees an interrupted build of `target` left behind."""
+    for path in (staging_path(target), old_path(target)):
+        if path.exists():
+            print(f"Removing {path} left by an interrupted build")
+            shutil.rmtree(path)
+
+
+def is_current(target, version: Union[int, str], hashes: Mapping[str, Optional[str]]) -> bool:
+    """Whether `target` exists and was built by generator `version` from exactly these input hashes."""
+    path = manifest_path(target)
+    if not Path(target).is_dir() or not path.exists():
+        return False
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return manifest == {"version": version, "inputs": dict(hashes)}
+
+
+def new_staging(target) -> Path:
+    """An empty staging directory for rebuilding `target` (clearing what an interrupted build left)."""
+    staging = staging_path(target)
+    if staging.exists():
+        shutil.rmtree(staging)
+    os.makedirs(staging)
+    return staging
+
+
+def swap_in(staging, target, version: Union[int, str], hashes: Mapping[str, Optional[str]]):
+    """Replace `target` with the finished `staging` tree and record the inputs it was built from.
+
+    The manifest is removed before the swap and written after it, so an interrupted swap only ever leaves a
+    tree without a manifest (rebuilt on the next run), never a manifest describing the wrong tree.
+    """
+    target = Path(target)
+    manifest = manifest_path(target)
+    old = old_path(target)
+    if manifest.exists():
+        os.unlink(manifest)
+    if old.exists():
+        shutil.rmtree(old)
+    if target.exists():
+        os.rename(target, old)
+    os.rename(staging, target)
+    shutil.rmtree(old, ignore_errors=True)
+
+    tmp_path = f"{manifest}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "inputs": dict(hashes)}, f, indent=1, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp_path, manifest)
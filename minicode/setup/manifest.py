@@ -0,0 +1,84 @@
+"""
+Pinned local snapshot of the celinelee/minicode-repos dataset.
+
+Setup only needs each row's library_name and github_link, so rather than
+loading the dataset (and importing `datasets`) on every run, the rows are
+kept in a small JSON manifest, together with the commit each repository's
+HEAD pointed at when the manifest was refreshed:
+
+    {
+      "dataset": "celinelee/minicode-repos",
+      "splits": {
+        "small": [{"library_name": ..., "github_link": ..., "commit": ...}, ...],
+        "large": [...]
+      }
+    }
+
+Clones check out the pinned commit, so a rebuild reproduces the same trees
+(and a mirror either has that commit or is known to be stale). The manifest
+is rewritten only by `python -m minicode.setup_manifest`; without one,
+setup falls back to the dataset, unpinned.
+"""
+
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Sequence
+
+from minicode.setup.git import remote_head
+
+DATASET = "celinelee/minicode-repos"
+DEFAULT_MANIFEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "minicode_repos.json")
+FIELDS = ("library_name", "github_link")
+
+
+def load_dataset_rows(split: str) -> List[Dict[str, str]]:
+    """The rows setup uses, read from the Hugging Face dataset (imported lazily: it is slow to import)."""
+    from datasets import load_dataset
+
+    return [{field: ex[field] for field in FIELDS} for ex in load_dataset(DATASET, split=split)]
+
+
+def dataset_rows(split: str, manifest: Optional[str] = DEFAULT_MANIFEST) -> List[Dict[str, str]]:
+    """Rows of `split` from the pinned manifest, or from the dataset (unpinned) when there is no manifest."""
+    if manifest and os.path.exists(manifest):
+        with open(manifest, "r", encoding="utf-8") as f:
+            splits = json.load(f)["splits"]
+        if split not in splits:
+            raise KeyError(f"split {split!r} is not in {manifest} (has {sorted(splits)}); refresh it with that split")
+        print(f"Using {len(splits[split])} pinned '{split}' repositories from {manifest}")
+        return splits[split]
+    if manifest:
+        print(f"[WARN] no dataset manifest at {manifest}; loading {DATASET} (run minicode.setup_manifest to pin it)")
+    return load_dataset_rows(split)
+
+
+def pin_commits(
+    rows: Sequence[Dict[str, str]], workers: int = 16, timeout: Optional[float] = 60
+) -> List[Dict[str, str]]:
+    """Copies of `rows` with the commit each github_link's HEAD points at (unresolvable rows are left unpinned)."""
+    urls = sorted({row["github_link"] for row in rows})
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        heads = dict(zip(urls, executor.map(lambda url: remote_head(url, timeout=timeout), urls)))
+    pinned = []
+    for row in rows:
+        commit, error = heads[row["github_link"]]
+        if commit is None:
+            print(f"[WARN] leaving {row['github_link']} unpinned: {error}")
+            pinned.append(dict(row))
+        else:
+            pinned.append(dict(row, commit=commit))
+    return pinned
+
+
+def write_manifest(path: str, splits: Dict[str, List[Dict[str, str]]]):
+    """Write the manifest atomically, keeping the splits of an existing one that are not being refreshed."""
+    existing = {}
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            existing = json.load(f)["splits"]
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"dataset": DATASET, "splits": {**existing, **splits}}, f, indent=1)
+        f.write("\n")
+    os.replace(tmp_path, path)
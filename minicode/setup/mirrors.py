@@ -0,0 +1,89 @@
+"""
+Persistent bare mirrors of persona repositories.
+
+A MirrorStore keeps one `git clone --mirror` per URL under a root directory
+that outlives setup runs. Working trees are cloned from the mirror with
+`--shared`, so they borrow its objects through alternates instead of copying
+them, and their origin is pointed back at the real URL. Online, each mirror
+is fetched (once per run) before it is used; offline, the mirrors are used
+as they are and a repository without one fails to clone.
+
+Mirrors hold full history, so --depth and --filter do not apply to clones
+made from them. Working trees depend on their mirror's objects: deleting the
+store breaks them (`git repack -a -d` and removing .git/objects/info/alternates
+detaches one).
+"""
+
+import hashlib
+import os
+import shutil
+import threading
+from typing import Dict, Optional, Set, Tuple
+
+from minicode.setup.git import repo_name, run_git
+
+DEFAULT_MIRROR_DIR = os.path.join(os.path.expanduser("~"), ".cache", "minicode", "mirrors")
+
+
+class MirrorStore:
+    """Bare mirrors keyed by URL.
+
+    Args:
+        root: Directory holding the mirrors
+        offline: Use existing mirrors only; never fetch or create one
+    """
+
+    def __init__(self, root: str = DEFAULT_MIRROR_DIR, offline: bool = False):
+        self.root = os.path.abspath(root)
+        self.offline = offline
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+        self._updated: Set[str] = set()
+
+    def path(self, url: str) -> str:
+        """Mirror directory of `url`: the repository name plus a hash of the full URL."""
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.root, f"{repo_name(url)}-{digest}.git")
+
+    def has(self, url: str) -> bool:
+        return os.path.isfile(os.path.join(self.path(url), "HEAD"))
+
+    def _lock(self, url: str) -> threading.Lock:
+        with self._locks_lock:
+            return self._locks.setdefault(url, threading.Lock())
+
+    def update(self, url: str, git: str = "git", timeout: Optional[float] = None) -> Tuple[str, Optional[str]]:
+        """(mirror path, error): create the mirror, or fetch into it once per run; offline, only check it exists."""
+        mirror = self.path(url)
+        with self._lock(url):
+            if self.has(url) and (self.offline or url in self._updated):
+                return mirror, None
+            if self.offline:
+                return mirror, f"no mirror of {url} in {self.root} (offline)"
+            if self.has(url):
+                error = run_git([git, "-C", mirror, "fetch", "--quiet", "--prune", "origin"], timeout)
+                if error is not None:
+                    # a stale mirror still beats no clone at all
+                    print(f"[WARN] could not fetch {url} ({error}); using the mirror as it is")
+                    error = None
+            else:
+                os.makedirs(self.root, exist_ok=True)
+                tmp_mirror = f"{mirror}.partial"
+                shutil.rmtree(tmp_mirror, ignore_errors=True)
+                error = run_git([git, "clone", "--quiet", "--mirror", "--", url, tmp_mirror], timeout)
+                if error is None:
+                    os.replace(tmp_mirror, mirror)
+                else:
+                    shutil.rmtree(tmp_mirror, ignore_errors=True)
+            if error is None:
+                self._updated.add(url)
+            return mirror, error
+
+    def clone(self, url: str, dest: str, git: str = "git", timeout: Optional[float] = None) -> Optional[str]:
+        """Clone `url` into `dest` from its (updated) mirror; None on success, else the error."""
+        mirror, error = self.update(url, git, timeout)
+        if error is not None:
+            return error
+        return run_git([git, "clone", "--quiet", "--shared", "--", mirror, dest], timeout) or run_git(
+            [git, "-C", dest, "remote", "set-url", "origin", url], timeout
+        )
@@ -0,0 +1,245 @@
+"""
+Import rewriting for unified repositories.
+
+Both setups move persona code under a new package path and then rewrite
+imports to match: setup_repos prefixes a persona's local modules with
+`unified.<persona>`, and setup_large_repos moves a persona's `tests.*`
+under `tests.<persona>` and, for nested packages, `<pkg>.*` under
+`<pkg>.<pkg>`. Rather than a regex pass (and filesystem checks) per rule,
+a file is tokenized once and every import statement is rewritten by
+precompiled RewriteRules:
+1. Module names are matched against renamed prefixes and a precomputed set
+   of local modules, so nothing touches the filesystem per import
+2. Only import statements (and, when asked, string literals) change, never
+   comments or text that merely looks like an import
+3. Files are read and written once each, on a process pool for large trees,
+   and unchanged files are copied with copy_file (see copying.py)
+"""
+
+import io
+import os
+import sys
+import tokenize
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from typing import FrozenSet, List, Optional, Sequence, Tuple
+
+from minicode.scoring.tree_index import tree_index
+from minicode.setup.copying import copy_file, write_text
+
+# tokens after which a NAME starts a new statement
+_STATEMENT_BREAKS = {tokenize.NEWLINE, tokenize.INDENT, tokenize.DEDENT}
+_SKIPPED = {tokenize.NL, tokenize.COMMENT}
+# processes per rewrite_files call when not given (None: one per core); library pool workers lower it
+DEFAULT_WORKERS = None
+
+
+def local_modules(root: str) -> FrozenSet[str]:
+    """Dotted names of every module (.py file) and directory under `root`, relative to it.
+
+    Directories come from the shared tree index, so .git, .venv, __pycache__ and the like are left out.
+    """
+    modules = set()
+    for dirpath, dirnames, filenames in tree_index(root).walk(root):
+        rel = os.path.relpath(dirpath, root)
+        parts = [] if rel == "." else rel.split(os.sep)
+        if any(part.startswith(".") for part in parts):  # .github and friends
+            continue
+        for name in dirnames:
+            if not name.startswith("."):
+                modules.add(".".join(parts + [name]))
+        for name in filenames:
+            modules.add(".".join(parts + [name[:-3]]))
+    return frozenset(modules)
+
+
+def _rename(module: str, renames: Sequence[Tuple[str, str]]) -> Optional[str]:
+    for old, new in renames:
+        if module.startswith(old + "."):
+            return new + module[len(old) :]
+    return None
+
+
+@dataclass(frozen=True)
+class RewriteRules:
+    """How to rewrite one persona's files.
+
+    Args:
+        renames: (old, new) package prefixes; a module strictly under `old` moves under `new`
+        local: Modules that move under `local_prefix` (see local_modules), unless stdlib builtins
+        local_prefix: Package the local modules move under, e.g. "unified.<persona>"
+        namespaced: Prefixes of modules that are already namespaced and never move under `local_prefix`
+        string_renames: `renames` applied to string literals too (e.g. mock.patch targets)
+        strip_pytest_plugins: Remove `pytest_plugins = ...` statements (conftests)
+    """
+
+    renames: Tuple[Tuple[str, str], ...] = ()
+    local: FrozenSet[str] = field(default_factory=frozenset)
+    local_prefix: str = ""
+    namespaced: Tuple[str, ...] = ()
+    string_renames: Tuple[Tuple[str, str], ...] = ()
+    strip_pytest_plugins: bool = False
+
+    def __bool__(self) -> bool:
+        return bool(self.renames or self.local or self.string_renames or self.strip_pytest_plugins)
+
+    def module(self, module: str) -> Tuple[Optional[str], bool]:
+        """(new name or None, whether a plain `import` of it needs an alias to keep binding its last name)."""
+        renamed = _rename(module, self.renames)
+        if renamed is not None:
+            return renamed, False
+        if module in self.local:
+            if "." not in module and module in sys.builtin_module_names:
+                return None, False
+            if module.startswith(self.namespaced):
+                return None, False
+            return f"{self.local_prefix}.{module}", True
+        return None, False
+
+
+def _dotted_name(tokens, idx):
+    """(name, start, end, next index) of the dotted name starting at tokens[idx]."""
+    start = tokens[idx].start
+    parts = [tokens[idx].string]
+    end = tokens[idx].end
+    idx += 1
+    while (
+        idx + 1 < len(tokens)
+        and tokens[idx].type == tokenize.OP
+        and tokens[idx].string == "."
+        and tokens[idx + 1].type == tokenize.NAME
+    ):
+        parts.append(tokens[idx + 1].string)
+        end = tokens[idx + 1].end
+        idx += 2
+    return ".".join(parts), start, end, idx
+
+
+def _string_literal(token: str, renames) -> Optional[str]:
+    """A plain (not f-, b- or r-prefixed) string literal with its content renamed, if it is under a renamed prefix."""
+    quote_at = min((i for i in (token.find('"'), token.find("'")) if i >= 0), default=-1)
+    if quote_at < 0 or token[:quote_at].lower() not in ("", "u"):
+        return None
+    quote = token[quote_at:][:3] if token[quote_at:][:3] in ('"""', "'''") else token[quote_at]
+    body = token[quote_at + len(quote) : len(token) - len(quote)]
+    renamed = _rename(body, renames)
+    if renamed is None:
+        return None
+    return f"{token[:quote_at]}{quote}{renamed}{quote}"
+
+
+def rewrite_source(source: str, rules: RewriteRules) -> str:
+    """`source` with its imports (and string literals, for string_renames) rewritten; as is if it does not tokenize."""
+    try:
+        tokens = [t for t in tokenize.generate_tokens(io.StringIO(source).readline) if t.type not in _SKIPPED]
+    except (tokenize.TokenError, IndentationError, SyntaxError):
+        return source
+
+    edits = []  # ((row, col) start, (row, col) end, replacement)
+    statement_start = True
+    idx = 0
+    while idx < len(tokens):
+        token = tokens[idx]
+        if token.type == tokenize.STRING and rules.string_renames:
+            renamed = _string_literal(token.string, rules.string_renames)
+            if renamed is not None:
+                edits.append((token.start, token.end, renamed))
+
+        if statement_start and token.type == tokenize.NAME and token.string == "import":
+            # import a.b [as c], d ...
+            idx += 1
+            while idx < len(tokens) and tokens[idx].type == tokenize.NAME:
+                module, start, end, idx = _dotted_name(tokens, idx)
+                has_alias = idx < len(tokens) and tokens[idx].string == "as"
+                new, needs_alias = rules.module(module)
+                if new is not None:
+                    alias = f" as {module.rsplit('.', 1)[-1]}" if needs_alias and not has_alias else ""
+                    edits.append((start, end, new + alias))
+                if has_alias:
+                    idx += 2
+                if idx < len(tokens) and tokens[idx].string == ",":
+                    idx += 1
+                else:
+                    break
+            statement_start = False
+            continue
+
+        if statement_start and token.type == tokenize.NAME and token.string == "from":
+            # from a.b import ... (relative imports stay as they are)
+            idx += 1
+            if idx < len(tokens) and tokens[idx].type == tokenize.NAME and tokens[idx].string != "import":
+                module, start, end, idx = _dotted_name(tokens, idx)
+                new, _ = rules.module(module)
+                if new is not None:
+                    edits.append((start, end, new))
+            statement_start = False
+            continue
+
+        if (
+            statement_start
+            and rules.strip_pytest_plugins
+            and token.type == tokenize.NAME
+            and token.string == "pytest_plugins"
+            and idx + 1 < len(tokens)
+            and tokens[idx + 1].string == "="
+        ):
+            end = idx
+            while tokens[end].type not in (tokenize.NEWLINE, tokenize.ENDMARKER) and tokens[end].string != ";":
+                end += 1
+            if tokens[end].string == ";":
+                replacement = "pass;"
+            else:
+                # a block may not be left empty
+                replacement = "" if token.start[1] == 0 else "pass" + tokens[end].string
+            edits.append((token.start, tokens[end].end, replacement))
+            idx = end + 1
+            statement_start = True
+            continue
+
+        statement_start = token.type in _STATEMENT_BREAKS or token.string in (";", ":")
+        idx += 1
+
+    if not edits:
+        return source
+    line_offsets = [0]
+    for line in io.StringIO(source):
+        line_offsets.append(line_offsets[-1] + len(line))
+    pieces, last = [], 0
+    for start, end, replacement in edits:
+        start_at = line_offsets[start[0] - 1] + start[1]
+        pieces.append(source[last:start_at])
+        pieces.append(replacement)
+        last = line_offsets[end[0] - 1] + end[1]
+    pieces.append(source[last:])
+    return "".join(pieces)
+
+
+def rewrite_file(paths: Tuple[str, str], rules: RewriteRules, copy_mode: str = "auto") -> bool:
+    """Rewrite src into dst (which may be the same file); whether the content changed.
+
+    An unchanged file is copied with copy_file when dst differs from src, and left alone otherwise. A changed
+    one is written by replacing dst, so a dst hardlinked to its original gets its own copy only now.
+    """
+    src, dst = paths
+    with open(src, "r", encoding="utf-8", errors="surrogateescape") as f:
+        source = f.read()
+    new_source = rewrite_source(source, rules)
+    if new_source == source:
+        if os.path.abspath(src) != os.path.abspath(dst):
+            copy_file(src, dst, copy_mode)
+        return False
+    write_text(dst, new_source, encoding="utf-8", errors="surrogateescape")
+    return True
+
+
+def rewrite_files(
+    paths: Sequence[Tuple[str, str]], rules: RewriteRules, workers: Optional[int] = None, copy_mode: str = "auto"
+) -> List[bool]:
+    """rewrite_file over (src, dst) pairs, on a process pool when there are enough files to be worth it."""
+    workers = workers or DEFAULT_WORKERS or os.cpu_count() or 1
+    if workers <= 1 or len(paths) < 4 * workers:
+        return [rewrite_file(p, rules, copy_mode) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunksize = max(1, len(paths) // (4 * workers))
+        return list(executor.map(partial(rewrite_file, rules=rules, copy_mode=copy_mode), paths, chunksize=chunksize))
@@ -30,30 +30,42 @@ import os
 import shutil
 import argparse
 import glob
+import json
 import re
 import configparser
 import tomli
+from packaging.utils import canonicalize_name
 from pathlib import Path
 from collections import defaultdict
-from datasets import load_dataset
-import subprocess
+from minicode.scoring.tree_index import tree_index
+from minicode.setup.clone import CloneJob, add_clone_arguments, clone_all, clone_options
+from minicode.setup.copying import add_copy_arguments, copy_file, copytree, write_text
+from minicode.setup.dependencies import merge_requirements, write_lock
+from minicode.setup.driver import LibraryTask, add_library_arguments, print_library_summary, run_libraries
+from minicode.setup.incremental import clear_stale_builds, input_hashes, is_current, new_staging, swap_in
+from minicode.setup.manifest import DEFAULT_MANIFEST, dataset_rows
+from minicode.setup.rewrite import RewriteRules, rewrite_files
 
 
 BASE_DIR = Path("large_repos")
+# Bump whenever the unified tree built from the same personas changes, so existing trees are rebuilt
+UNIFY_VERSION = 2
 
 
-def setup_large_repos(target_dir, split):
+def setup_large_repos(target_dir, split, clone_opts=None, manifest=DEFAULT_MANIFEST):
     """Clone repositories from the specified split of the celinelee/minicode-repos dataset.
 
     This function:
     1. Creates the target directory if it doesn't exist
-    2. Loads the dataset from the specified split
+    2. Loads the specified split from the pinned manifest (or the dataset, without one)
     3. Groups repositories by library name
-    4. Clones each repository into its library-specific directory
+    4. Clones the repositories into their library-specific directories, concurrently
 
     Args:
         target_dir: Directory where repositories will be cloned
         split: Dataset split to use ("small" or "large")
+        clone_opts: CloneManager options (workers, depth, filter, timeout, retries, mirrors)
+        manifest: Pinned dataset manifest (see minicode.setup.manifest)
 
     Returns:
         set: A set of paths to the library directories created
@@ -61,29 +73,30 @@ def setup_large_repos(target_dir, split):
     print(f"Cloning repositories from '{split}' split to '{target_dir}'...")
     os.makedirs(target_dir, exist_ok=True)
 
-    # Load dataset and clone repositories
-    ds = load_dataset("celinelee/minicode-repos", split=split)
+    # Load dataset rows and clone repositories
+    ds = dataset_rows(split, manifest)
 
     # Group repositories by library name
     library_paths = set()
+    clone_jobs = []
     for ex in ds:
         target_subdir = os.path.join(target_dir, ex["library_name"])
         if not os.path.exists(target_subdir):
             os.makedirs(target_subdir, exist_ok=True)
         library_paths.add(target_subdir)
+        clone_jobs.append(CloneJob(ex["github_link"], target_subdir, commit=ex.get("commit")))
 
-        # Clone the repository to the library-specific directory
-        print(f"Cloning {ex['github_link']} to {target_subdir}")
-        subprocess.run(["git", "clone", ex["github_link"]], cwd=target_subdir)
+    # Clone the repositories to their library-specific directories
+    clone_all(clone_jobs, **(clone_opts or {}))
 
     print(f"Cloned repositories for {len(library_paths)} libraries")
     return library_paths
 
 
-def create_unified_directory(library_name):
-    """Create the unified directory structure for a library."""
+def create_unified_directory(library_name, unified_dir=None):
+    """Create the unified directory structure for a library (in `unified_dir`, by default its unified/)."""
     library_dir = BASE_DIR / library_name
-    unified_dir = library_dir / "unified"
+    unified_dir = library_dir / "unified" if unified_dir is None else Path(unified_dir)
 
     # Create required directories if they don't exist
     os.makedirs(unified_dir, exist_ok=True)
@@ -117,15 +130,10 @@ def find_persona_dirs(library_name):
     for item in os.listdir(library_dir):
         item_path = library_dir / item
         # Consider repository directories that contain Python files as persona directories
-        if item_path.is_dir() and item != "unified":
-            # Check if the directory has any Python files (recursively)
-            has_python_files = False
-            for root, _, files in os.walk(item_path):
-                if any(file.endswith(".py") for file in files):
-                    has_python_files = True
-                    break
-
-            if has_python_files:
+        # (hidden ones hold build state, e.g. the staging tree)
+        if item_path.is_dir() and item != "unified" and not item.startswith("."):
+            # Check if the directory has any Python files (recursively, outside .venv, .git, ...)
+            if tree_index(item_path).has_python():
                 persona_dirs.append(item_path)
             else:
                 print(f"Skipping {item_path} - no Python files found")
@@ -181,8 +189,12 @@ def extract_package_name(persona_dir):
     return None
 
 
-def copy_persona_library(persona_dir, unified_dir, library_name):
-    """Copy the library code from a persona directory to the unified structure."""
+def copy_persona_library(persona_dir, unified_dir, library_name, copy_mode="auto"):
+    """Copy the library code from a persona directory to the unified structure.
+
+    Files are copied per copy_mode (see minicode.setup.copying); agents edit
+    the unified tree in place, so hardlinks would write through to the personas.
+    """
     # Extract package name from pyproject.toml or setup.py
     package_name = extract_package_name(persona_dir)
 
@@ -216,10 +228,9 @@ def copy_persona_library(persona_dir, unified_dir, library_name):
 
         if os.path.isdir(src_path):
             # Use copytree for directories
-            shutil.copytree(src_path, dst_path, dirs_exist_ok=True)
+            copytree(src_path, dst_path, copy_mode, dirs_exist_ok=True)
         elif os.path.isfile(src_path):
-            # Use copy2 for files
-            shutil.copy2(src_path, dst_path)
+            copy_file(src_path, dst_path, copy_mode)
 
     # Check if we have a nested package structure (e.g., package_name/package_name/...)
     nested_package_dir = package_dir / package_name
@@ -235,12 +246,7 @@ def copy_persona_library(persona_dir, unified_dir, library_name):
         os.makedirs(persona_tests_dir, exist_ok=True)
 
         # Copy the root conftest.py to the persona-specific tests directory
-        with open(root_conftest_path, "r") as f:
-            conftest_content = f.read()
-
-        # Write the modified content to the persona-specific tests directory
-        with open(persona_tests_dir / "conftest.py", "w") as f:
-            f.write(conftest_content)
+        copy_file(root_conftest_path, persona_tests_dir / "conftest.py", copy_mode)
 
         print(
             f"Copied root conftest.py from {persona_name} to {persona_tests_dir}/conftest.py"
@@ -262,206 +268,36 @@ def copy_persona_library(persona_dir, unified_dir, library_name):
                     "pytest_plugins = []\n"
                 )
 
-        # Copy test files, handling conftest.py files differently
-        for item in os.listdir(tests_dir):
-            src_path = tests_dir / item
-            dst_path = unified_tests_dir / item
-
-            if item == "conftest.py":
-                # Handle conftest.py specially - check if it contains pytest_plugins and fix import paths
-                with open(src_path, "r") as f:
-                    conftest_content = f.read()
-
-                # Remove any pytest_plugins declarations
-                if "pytest_plugins" in conftest_content:
-                    print(f"Found pytest_plugins in {src_path}, modifying...")
-                    modified_content = re.sub(
-                        r"pytest_plugins\s*=.*?(\n|$)", "", conftest_content
-                    )
+        # conftest.py files lose their pytest_plugins and import tests.* from the
+        # persona-specific directory; with a nested package structure
+        # (package_name/package_name/...), package_name.* imports in test files
+        # and "package_name.*" strings in conftests (patch targets) move under it
+        nested = ((package_name, f"{package_name}.{package_name}"),) if has_nested_structure else ()
+        conftest_rules = RewriteRules(
+            renames=(("tests", f"tests.{persona_short_name}"),), string_renames=nested, strip_pytest_plugins=True
+        )
+        test_rules = RewriteRules(renames=nested)
+
+        conftests, test_files = [], []
+        for root, dirs, files in os.walk(tests_dir):
+            rel_root = os.path.relpath(root, tests_dir)
+            dst_root = unified_tests_dir if rel_root == "." else unified_tests_dir / rel_root
+            os.makedirs(dst_root, exist_ok=True)
+
+            for file in files:
+                src_file = os.path.join(root, file)
+                dst_file = os.path.join(dst_root, file)
+                if file == "conftest.py":
+                    conftests.append((src_file, dst_file))
+                elif file.endswith(".py") and test_rules:
+                    test_files.append((src_file, dst_file))
                 else:
-                    modified_content = conftest_content
-
-                # Fix import paths for tests.* imports to include persona-specific directory
-                # e.g., "from tests.fixtures.test_data" -> "from tests.persona_name.fixtures.test_data"
-                if (
-                    "from tests." in modified_content
-                    or "import tests." in modified_content
-                ):
-                    print(
-                        f"Fixing test import paths in {src_path} for persona-specific structure"
-                    )
-                    # Fix from imports
-                    modified_content = re.sub(
-                        r"from tests\.([^.\s]+)",
-                        rf"from tests.{persona_short_name}.\1",
-                        modified_content,
-                    )
-                    # Fix direct imports
-                    modified_content = re.sub(
-                        r"import tests\.([^.\s]+)",
-                        rf"import tests.{persona_short_name}.\1",
-                        modified_content,
-                    )
-
-                # Fix import paths based on package structure
-                if has_nested_structure:
-                    # For nested packages (e.g., writer_text_editor.writer_text_editor.module),
-                    # we need to fix the import paths
-                    print(
-                        f"Fixing import paths in {src_path} for nested package structure"
-                    )
-                    # Replace direct package imports with the nested structure
-                    # e.g., "package_name.module" -> "package_name.package_name.module"
-                    modified_content = re.sub(
-                        rf'"{package_name}\.([^"]+)"',
-                        rf'"{package_name}.{package_name}.\1"',
-                        modified_content,
-                    )
+                    copy_file(src_file, dst_file, copy_mode)
 
-                # Write the modified content
-                with open(dst_path, "w") as f:
-                    f.write(modified_content)
-            elif os.path.isdir(src_path):
-                # For directories, we need to check for nested conftest.py files
-                os.makedirs(dst_path, exist_ok=True)
-
-                for root, dirs, files in os.walk(src_path):
-                    rel_root = os.path.relpath(root, src_path)
-                    dst_root = dst_path if rel_root == "." else dst_path / rel_root
-                    os.makedirs(dst_root, exist_ok=True)
-
-                    for file in files:
-                        src_file = os.path.join(root, file)
-                        dst_file = os.path.join(dst_root, file)
-
-                        if file == "conftest.py":
-                            # Handle nested conftest.py files
-                            with open(src_file, "r") as f:
-                                conftest_content = f.read()
-
-                            # Remove any pytest_plugins declarations
-                            if "pytest_plugins" in conftest_content:
-                                print(
-                                    f"Found pytest_plugins in nested conftest {src_file}, modifying..."
-                                )
-                                modified_content = re.sub(
-                                    r"pytest_plugins\s*=.*?(\n|$)", "", conftest_content
-                                )
-                            else:
-                                modified_content = conftest_content
-
-                            # Fix import paths for tests.* imports to include persona-specific directory
-                            if (
-                                "from tests." in modified_content
-                                or "import tests." in modified_content
-                            ):
-                                print(
-                                    f"Fixing test import paths in nested {src_file} for persona-specific structure"
-                                )
-                                # Fix from imports
-                                modified_content = re.sub(
-                                    r"from tests\.([^.\s]+)",
-                                    rf"from tests.{persona_short_name}.\1",
-                                    modified_content,
-                                )
-                                # Fix direct imports
-                                modified_content = re.sub(
-                                    r"import tests\.([^.\s]+)",
-                                    rf"import tests.{persona_short_name}.\1",
-                                    modified_content,
-                                )
-
-                            # Fix import paths based on package structure
-                            if has_nested_structure:
-                                print(
-                                    f"Fixing import paths in {src_file} for nested package structure"
-                                )
-                                # Replace direct package imports with the nested structure
-                                modified_content = re.sub(
-                                    rf'"{package_name}\.([^"]+)"',
-                                    rf'"{package_name}.{package_name}.\1"',
-                                    modified_content,
-                                )
-
-                            # Write the modified content
-                            with open(dst_file, "w") as f:
-                                f.write(modified_content)
-                        elif file.endswith(".py"):
-                            # For test files, also fix imports if needed
-                            if has_nested_structure:
-                                with open(src_file, "r") as f:
-                                    file_content = f.read()
-
-                                # Check if the file imports from the package
-                                if (
-                                    f"import {package_name}" in file_content
-                                    or f"from {package_name}" in file_content
-                                ):
-                                    print(
-                                        f"Fixing import paths in {src_file} for nested package structure"
-                                    )
-                                    # Fix direct imports (import package_name.module)
-                                    modified_content = re.sub(
-                                        rf"import {package_name}\.([^\s]+)",
-                                        rf"import {package_name}.{package_name}.\1",
-                                        file_content,
-                                    )
-                                    # Fix from imports (from package_name.module import X)
-                                    modified_content = re.sub(
-                                        rf"from {package_name}\.([^\s]+)",
-                                        rf"from {package_name}.{package_name}.\1",
-                                        modified_content,
-                                    )
-
-                                    with open(dst_file, "w") as f:
-                                        f.write(modified_content)
-                                else:
-                                    # Just copy the file as-is
-                                    shutil.copy2(src_file, dst_file)
-                            else:
-                                # Just copy the file as-is
-                                shutil.copy2(src_file, dst_file)
-                        else:
-                            # Copy other files as-is
-                            shutil.copy2(src_file, dst_file)
-            elif os.path.isfile(src_path) and src_path.name.endswith(".py"):
-                # For Python test files, also fix imports if needed
-                if has_nested_structure:
-                    with open(src_path, "r") as f:
-                        file_content = f.read()
-
-                    # Check if the file imports from the package
-                    if (
-                        f"import {package_name}" in file_content
-                        or f"from {package_name}" in file_content
-                    ):
-                        print(
-                            f"Fixing import paths in {src_path} for nested package structure"
-                        )
-                        # Fix direct imports (import package_name.module)
-                        modified_content = re.sub(
-                            rf"import {package_name}\.([^\s]+)",
-                            rf"import {package_name}.{package_name}.\1",
-                            file_content,
-                        )
-                        # Fix from imports (from package_name.module import X)
-                        modified_content = re.sub(
-                            rf"from {package_name}\.([^\s]+)",
-                            rf"from {package_name}.{package_name}.\1",
-                            modified_content,
-                        )
-
-                        with open(dst_path, "w") as f:
-                            f.write(modified_content)
-                    else:
-                        # Just copy the file as-is
-                        shutil.copy2(src_path, dst_path)
-                else:
-                    # Just copy the file as-is
-                    shutil.copy2(src_path, dst_path)
-            else:
-                # Copy regular files
-                shutil.copy2(src_path, dst_path)
+        # Copy the Python files with their imports rewritten, in one pass each
+        rewritten = sum(rewrite_files(conftests, conftest_rules, copy_mode=copy_mode))
+        rewritten += sum(rewrite_files(test_files, test_rules, copy_mode=copy_mode))
+        print(f"Rewrote imports in {rewritten} of {len(conftests) + len(test_files)} test files of {persona_name}")
 
     # Create a README file in the package directory
     readme_content = f"""# {package_name.capitalize()} package
@@ -471,8 +307,8 @@ This package is from the {persona_name} implementation.
 In the unified project, this package can be used directly, or you can import common
 functionality from the 'common' package.
 """
-    with open(package_dir / "README.md", "w") as f:
-        f.write(readme_content)
+    # (replacing, not writing through, a README.md copied from the persona)
+    write_text(package_dir / "README.md", readme_content)
 
     return package_name
 
@@ -611,13 +447,25 @@ def _get_default_merged_dependencies():
         },
         "project": {"dependencies": ["setuptools", "pytest", "pytest-json-report", "pytest-cov"], "optional-dependencies": {}},
         "tool": {},
+        "conflicts": [],
     }
 
 
-def merge_dependencies(all_dependencies):
-    """Merge dependencies from multiple persona pyproject.toml files."""
+def merge_dependencies(all_dependencies, origins=None):
+    """Merge dependencies from multiple persona pyproject.toml files.
+
+    Requirements are merged per project (see minicode.setup.dependencies):
+    version specifiers are intersected rather than listed side by side, and
+    unsatisfiable combinations are reported and listed in merged["conflicts"].
+
+    Args:
+        all_dependencies: Dependencies of each persona (see extract_dependencies_from_pyproject)
+        origins: Name of each persona, for conflict reports
+    """
     if not all_dependencies:
         return _get_default_merged_dependencies()
+    if origins is None:
+        origins = [f"persona {idx}" for idx in range(1, len(all_dependencies) + 1)]
 
     # Start with a default build system
     merged = {
@@ -629,11 +477,11 @@ def merge_dependencies(all_dependencies):
         "tool": defaultdict(dict),
     }
 
-    # Set of unique dependencies to avoid duplicates
-    unique_deps = {"setuptools", "pytest", "pytest-json-report", "pytest-cov"}
-    unique_optional_deps = defaultdict(set)
+    # Requirements per persona, merged per project once all are collected
+    dependency_groups = [("unified defaults", merged["project"]["dependencies"])]
+    optional_groups = defaultdict(list)
 
-    for deps in all_dependencies:
+    for origin, deps in zip(origins, all_dependencies):
         # Merge build-system requirements if any
         if deps["build-system"]:
             # Take the most comprehensive build-system requires list
@@ -642,22 +490,12 @@ def merge_dependencies(all_dependencies):
             ) > len(merged["build-system"].get("requires", [])):
                 merged["build-system"]["requires"] = deps["build-system"]["requires"]
 
-        # Merge project dependencies
-        for dep in deps["project"].get("dependencies", []):
-            # Convert list items to string format for deduplication
-            dep_str = dep if isinstance(dep, str) else str(dep)
-            if dep_str not in unique_deps:
-                unique_deps.add(dep_str)
-                merged["project"]["dependencies"].append(dep)
+        # Collect project dependencies
+        dependency_groups.append((origin, [str(dep) for dep in deps["project"].get("dependencies", [])]))
 
-        # Merge optional dependencies
+        # Collect optional dependencies (extra names normalized, so "Dev" and "dev" are one extra)
         for dep_type, dep_list in deps["project"]["optional-dependencies"].items():
-            for dep in dep_list:
-                # Convert list items to string format for deduplication
-                dep_str = dep if isinstance(dep, str) else str(dep)
-                if dep_str not in unique_optional_deps[dep_type]:
-                    unique_optional_deps[dep_type].add(dep_str)
-                    merged["project"]["optional-dependencies"][dep_type].append(dep)
+            optional_groups[canonicalize_name(dep_type)].append((origin, [str(dep) for dep in dep_list]))
 
         # Merge tool configurations
         for tool_name, tool_config in deps["tool"].items():
@@ -674,6 +512,15 @@ def merge_dependencies(all_dependencies):
             else:
                 merged["tool"][tool_name] = tool_config
 
+    # Merge requirements per project: intersected specifiers, unioned extras
+    merged["project"]["dependencies"], conflicts = merge_requirements(dependency_groups)
+    for dep_type, groups in optional_groups.items():
+        merged["project"]["optional-dependencies"][dep_type], extra_conflicts = merge_requirements(groups)
+        conflicts += [f"[{dep_type}] {conflict}" for conflict in extra_conflicts]
+    for conflict in conflicts:
+        print(f"[WARN] dependency conflict: {conflict}")
+    merged["conflicts"] = conflicts
+
     # Convert defaultdicts to regular dicts for serialization
     merged["project"]["optional-dependencies"] = dict(
         merged["project"]["optional-dependencies"]
@@ -684,10 +531,11 @@ def merge_dependencies(all_dependencies):
 
 
 def create_init_files(directory):
-    """Create __init__.py files in all subdirectories."""
-    for root, dirs, files in os.walk(directory):
-        if "__init__.py" not in files:
-            open(os.path.join(root, "__init__.py"), "w").close()
+    """Create __init__.py files in all subdirectories (other than .venv, __pycache__, ...)."""
+    index = tree_index(directory)
+    for package_dir in index.directories(directory):
+        if not index.is_package(package_dir):
+            open(os.path.join(package_dir, "__init__.py"), "w").close()
 
 
 def _format_packages_list(package_names):
@@ -773,8 +621,9 @@ def create_pyproject_toml(
     )
 
     # Add dependencies if present
+    # (JSON strings are TOML basic strings; normalized markers contain double quotes)
     if "dependencies" in pyproject_dict["project"]:
-        deps_str = str(pyproject_dict["project"]["dependencies"]).replace("'", '"')
+        deps_str = json.dumps(pyproject_dict["project"]["dependencies"])
         pyproject_content += f"dependencies = {deps_str}\n"
 
     # Add optional dependencies if present
@@ -783,7 +632,7 @@ def create_pyproject_toml(
         for dep_type, deps in pyproject_dict["project"][
             "optional-dependencies"
         ].items():
-            deps_str = str(deps).replace("'", '"')
+            deps_str = json.dumps(deps)
             pyproject_content += f"{dep_type} = {deps_str}\n"
 
     # Add tool configurations
@@ -921,16 +770,22 @@ def copy_instructions_from_personas(unified_dir, persona_dirs, library_name):
         print("No REFACTOR.md found in root directory")
 
 
-def process_library(library_name, library_paths=None):
+def process_library(library_name, library_paths=None, copy_mode="auto", force=False, lock=False):
     """Process a single library: find persona directories and unify them.
 
+    A library whose unified tree was built by this UNIFY_VERSION from the same
+    persona trees is skipped; otherwise the tree is rebuilt from scratch in a
+    staging directory and swapped in (see minicode.setup.incremental).
+
     Args:
         library_name: Name of the library to process
         library_paths: Optional set of library paths
+        copy_mode: How persona files are copied (see minicode.setup.copying)
+        force: Rebuild the unified tree even if it is up to date
+        lock: Also resolve the merged dependencies into unified/requirements.lock (needs uv)
     """
-    # Create unified directory structure
-    unified_dir = create_unified_directory(library_name)
-    print(f"Created unified directory structure at {unified_dir}")
+    # An interrupted earlier build may have left its staging tree behind
+    clear_stale_builds(BASE_DIR / library_name / "unified")
 
     # Find persona directories
     persona_dirs = find_persona_dirs(library_name)
@@ -940,6 +795,20 @@ def process_library(library_name, library_paths=None):
 
     print(f"Found {len(persona_dirs)} persona directories for {library_name}")
 
+    # Skip the library if nothing the unified tree is built from has changed
+    target_dir = BASE_DIR / library_name / "unified"
+    inputs = {persona_dir.name: persona_dir for persona_dir in persona_dirs}
+    inputs["prompts/REFACTOR.md"] = Path("prompts/REFACTOR.md")
+    hashes = input_hashes(inputs)
+    version = f"{UNIFY_VERSION}+lock" if lock else UNIFY_VERSION
+    if not force and is_current(target_dir, version, hashes):
+        print(f"{target_dir} is up to date with its persona directories; skipping {library_name}")
+        return
+
+    # Create unified directory structure, in a staging directory swapped in once complete
+    unified_dir = create_unified_directory(library_name, new_staging(target_dir))
+    print(f"Created unified directory structure at {unified_dir}")
+
     # Copy persona libraries to unified structure
     processed_count = 0
     package_names = set()  # Store unique package names
@@ -952,13 +821,15 @@ def process_library(library_name, library_paths=None):
         all_dependencies.append(dependencies)
 
     # Merge all dependencies
-    merged_dependencies = merge_dependencies(all_dependencies)
-    print("Merged dependencies from all persona directories")
+    merged_dependencies = merge_dependencies(all_dependencies, [persona_dir.name for persona_dir in persona_dirs])
+    print(
+        f"Merged dependencies from all persona directories ({len(merged_dependencies['conflicts'])} conflicts)"
+    )
 
     # Now copy the libraries
     for persona_dir in persona_dirs:
         print(f"Processing {persona_dir}...")
-        package_name = copy_persona_library(persona_dir, unified_dir, library_name)
+        package_name = copy_persona_library(persona_dir, unified_dir, library_name, copy_mode)
         if package_name:
             package_names.add(package_name)
             processed_count += 1
@@ -967,6 +838,7 @@ def process_library(library_name, library_paths=None):
         print(
             "No libraries were processed. Check if the persona directories have valid Python code."
         )
+        shutil.rmtree(unified_dir)
         return
 
     # Create __init__.py files in all package directories and tests
@@ -981,9 +853,21 @@ def process_library(library_name, library_paths=None):
     create_pyproject_toml(unified_dir, library_name, package_names, merged_dependencies)
     create_setup_py(unified_dir, library_name, package_names)
 
+    # Optionally pin the merged dependencies, which also checks them against the index
+    if lock:
+        error = write_lock(unified_dir)
+        if error:
+            print(f"[WARN] could not lock the dependencies of {library_name}: {error}")
+        else:
+            print(f"Locked the merged dependencies in {unified_dir / 'requirements.lock'}")
+
     # Copy INSTRUCTIONS.md from each persona
     copy_instructions_from_personas(unified_dir, persona_dirs, library_name)
 
+    # Replace the previous unified tree (and any stale files in it) with the new one
+    swap_in(unified_dir, target_dir, version, hashes)
+    print(f"Swapped the new unified tree into {target_dir}")
+
     print(
         f"Setup complete for {library_name}. The unified directory structure is ready for refactoring."
     )
@@ -997,25 +881,47 @@ def process_library(library_name, library_paths=None):
 
 def main():
     """Main function to clone and process all libraries."""
+    parser = argparse.ArgumentParser(description="Clone the large split and build each library's unified repo.")
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        default=DEFAULT_MANIFEST,
+        help="pinned dataset manifest (falls back to the Hugging Face dataset if missing)",
+    )
+    add_clone_arguments(parser)
+    # agents edit the unified tree in place, so it never hardlinks to the personas
+    add_copy_arguments(parser, modes=("auto", "reflink", "copy"))
+    add_library_arguments(parser, log_dir=str(BASE_DIR / ".logs"))
+    parser.add_argument(
+        "--force", action="store_true", default=False, help="rebuild unified trees even if their personas are unchanged"
+    )
+    parser.add_argument(
+        "--lock",
+        action="store_true",
+        default=False,
+        help="resolve each unified pyproject.toml into a pinned requirements.lock with uv pip compile",
+    )
+    args = parser.parse_args()
+
     # Fixed parameters
     split = "large"
 
     # Clone all repositories from the large split
-    library_paths = setup_large_repos(BASE_DIR, split)
+    library_paths = setup_large_repos(BASE_DIR, split, clone_options(args), args.manifest)
 
     # Process all libraries found in the base directory
     if not BASE_DIR.exists() or not BASE_DIR.is_dir():
         print(f"Base directory {BASE_DIR} does not exist or is not a directory")
         return
 
-    libraries = [d.name for d in BASE_DIR.iterdir() if d.is_dir()]
+    libraries = sorted(d.name for d in BASE_DIR.iterdir() if d.is_dir() and not d.name.startswith("."))
     print(f"Found {len(libraries)} libraries in {BASE_DIR}")
 
-    for library_name in libraries:
-        print(f"\nProcessing library: {library_name}")
-        process_library(library_name)
-
-    print(f"\nAll {len(libraries)} libraries have been processed.")
+    # Libraries are independent: process them in parallel, each logging to its own file
+    options = {"copy_mode": args.copy_mode, "force": args.force, "lock": args.lock}
+    tasks = [LibraryTask(name, process_library, (name,), options) for name in libraries]
+    results = run_libraries(tasks, workers=args.library_workers, log_dir=args.log_dir)
+    print_library_summary(results)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,34 @@
+import argparse
+
+from minicode.setup.manifest import DEFAULT_MANIFEST, load_dataset_rows, pin_commits, write_manifest
+
+# Thin CLI over minicode.setup.manifest: refresh the pinned snapshot of the
+# minicode-repos dataset that setup_repos and setup_large_repos read.
+
+
+def main(args):
+    splits = {}
+    for split in args.splits:
+        rows = load_dataset_rows(split)
+        if not args.no_commits:
+            print(f"Resolving HEAD commits of {len(rows)} '{split}' repositories...")
+            rows = pin_commits(rows, workers=args.workers)
+        splits[split] = rows
+        print(f"{split}: {len(rows)} repositories")
+    write_manifest(args.output, splits)
+    print(f"Written manifest to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the pinned minicode-repos manifest used by setup.")
+    parser.add_argument("--splits", nargs="+", default=["small", "large"], help="dataset splits to refresh")
+    parser.add_argument("--output", type=str, default=DEFAULT_MANIFEST, help="manifest file to write")
+    parser.add_argument("--workers", type=int, default=16, help="concurrent git ls-remote calls")
+    parser.add_argument("--no_commits", action="store_true", default=False, help="write the rows without commits")
+    args = parser.parse_args()
+
+    main(args)
+
+# ---- Example usage ----
+# python -m minicode.setup_manifest
+# python -m minicode.setup_manifest --splits small
@@ -13,100 +13,58 @@ Usage:
   uv run python -m minicode.setup_large_repos
 """
 
-from datasets import load_dataset
-from multiprocessing import Pool, cpu_count, set_start_method
-from functools import partial
-import subprocess, os, glob, itertools, sys, re, numpy as np
+from multiprocessing import cpu_count, set_start_method
+import os, glob, argparse, numpy as np
 import shutil
-from thefuzz import fuzz
-from sklearn.cluster import AgglomerativeClustering
+from minicode.grouping.cache import SimilarityCache
+from minicode.grouping.clustering import average_linkage_clusters, rank_clusters
+from minicode.grouping.neighbors import neighbor_clusters
+from minicode.grouping.similarity import condensed_similarity, read_task_strings
+from minicode.scoring.tree_index import tree_index
+from minicode.setup.clone import CloneJob, add_clone_arguments, clone_all, clone_options
+from minicode.setup.copying import add_copy_arguments, copytree
+from minicode.setup.driver import LibraryTask, add_library_arguments, print_library_summary, run_libraries
+from minicode.setup.manifest import DEFAULT_MANIFEST, dataset_rows
+from minicode.setup.rewrite import RewriteRules, local_modules, rewrite_files
 
 # Login using e.g. `huggingface-cli login` to access this dataset
 	
-def setup_all_flat(target_dir, split):
-    ds = load_dataset("celinelee/minicode-repos", split=split)
-    for ex in ds:
-        subprocess.run(["git", "clone", ex["github_link"]], cwd=target_dir)
-
-def string_similarities(s1, s2):
-    return {
-        "ratio": fuzz.ratio(s1, s2),
-        "partial_ratio": fuzz.partial_ratio(s1, s2),
-        "token_sort_ratio": fuzz.token_sort_ratio(s1, s2),
-        "token_set_ratio": fuzz.token_set_ratio(s1, s2),
-    }
-
-def compute_pairwise_similarity(pair, task_strings):
-    i, j = pair
-    # compute average fuzzy similarity on tasks
-    t_sim = string_similarities(task_strings[i], task_strings[j])
-    task_avg = sum(t_sim.values()) / len(t_sim)
-    return i, j, task_avg
-
-def compute_string_matrices_parallel(directory_paths, processes=None):
-    # read all TASK.md strings and code once
-    task_strings = []
-    for path in directory_paths:
-        with open(os.path.join(path, "TASK.md"), 'r', encoding='utf-8') as f:
-            task_strings.append(f.read())
-
-    n = len(directory_paths)
-    task_sim = np.zeros((n, n))
-
-    pairs = list(itertools.combinations(range(n), 2))
-    procs = min(processes or cpu_count(), cpu_count())
-
-    with Pool(processes=procs) as pool:
-        func = partial(compute_pairwise_similarity,
-                       task_strings=task_strings)
-        for i, j, task_avg in pool.map(func, pairs):
-            task_sim[i][j] = task_sim[j][i] = task_avg
-
-    return task_sim
+def setup_all_flat(target_dir, split, clone_opts=None, manifest=DEFAULT_MANIFEST):
+    ds = dataset_rows(split, manifest)
+    clone_all([CloneJob(ex["github_link"], target_dir, commit=ex.get("commit")) for ex in ds], **(clone_opts or {}))
 
 #### CLUSTERING CODE ####
-from sklearn.cluster import AgglomerativeClustering
-
-def agglomerative_clustering(embeddings, embedding_clusterer):
-    X = np.array(embeddings)
-    print("shape of X", X.shape)
-    clustering = embedding_clusterer.fit_predict(X)
-    return clustering
-
-def get_string_clusters(directory_paths, num_clusters, processes=None):
-    # compute similarity matrices in parallel
-    task_sim = compute_string_matrices_parallel(directory_paths, processes)
 
-    # convert similarity to distance
-    task_dist = 100 - task_sim
-    if task_dist.shape[0] <= 1:
-        print(f"{task_dist.shape} matrix... will not cluster")
+def get_string_clusters(directory_paths, num_clusters, processes=None, approximate=False, n_neighbors=None, cache=None):
+    if approximate:
+        # top-k TF-IDF neighbours instead of the dense matrix: O(n*k) memory
+        if len(directory_paths) <= 1:
+            print(f"{len(directory_paths)} personas... will not cluster")
+            return (None, None)
+        return neighbor_clusters(read_task_strings(directory_paths), num_clusters, n_neighbors)
+
+    # score every pair once, straight into condensed form (no n x n matrices);
+    # with a SimilarityCache, only pairs not scored on an earlier run
+    workers = min(processes or cpu_count(), cpu_count())
+    task_strings = read_task_strings(directory_paths)
+    if cache is not None:
+        task_sim = cache.condensed(task_strings, workers=workers)
+    else:
+        task_sim = condensed_similarity(task_strings, workers=workers)
+
+    # convert similarity to distance (in place)
+    task_dist = np.subtract(100, task_sim, out=task_sim)
+    if len(directory_paths) <= 1:
+        print(f"{len(directory_paths)} personas... will not cluster")
         return (None, task_dist)
 
-    # cluster with precomputed distances
-    clusterer = AgglomerativeClustering(
-        n_clusters=num_clusters,
-        metric='precomputed',
-        linkage='average'
-    )
-    task_labels = clusterer.fit_predict(task_dist)
-
-    task_clusters = [[] for _ in range(num_clusters)]
-    for idx, lab in enumerate(task_labels):
-        task_clusters[lab].append(idx)
-
+    # average linkage on the condensed distances
+    task_clusters = average_linkage_clusters(task_dist, num_clusters)
     return (task_clusters, task_dist)
 
 def sort_string_clusters(clusters, dist_matrix):
-    avg_dists = []
-    for cluster in clusters:
-        if len(cluster) < 2:
-            avg_dists.append(float('inf'))
-        else:
-            pairs = list(itertools.combinations(cluster, 2))
-            avg = sum(dist_matrix[i][j] for i,j in pairs) / len(pairs)
-            avg_dists.append(avg)
-    return [cluster for (_, cluster) in sorted(zip(avg_dists, clusters))]
+    # dist_matrix: condensed distances, a square distance matrix, or a NeighborGraph
+    return rank_clusters(clusters, dist_matrix)
 
 """
 Directory structure created:
@@ -123,51 +81,26 @@ Directory structure created:
 """
 
         
-def _rewrite_imports(file_path: str, persona: str, search_root: str):
+def _persona_rules(persona: str, persona_root: str) -> RewriteRules:
     """
-    Generic import-rewriter:
-    - prefixes any local imports with unified.<persona>.
+    Import rules for one persona:
+    - prefixes any local imports (modules found under persona_root) with unified.<persona>.
     - for `import module`, adds `as module` to preserve symbol names.
     """
-    with open(file_path, 'r') as f:
-        content = f.read()
-
-    def replace(match):
-        imp, mod = match.group(1), match.group(2)
-        # skip stdlib modules
-        if '.' not in mod and mod in sys.builtin_module_names:
-            return match.group(0)
-        # already namespaced?
-        if mod.startswith(f"{persona}.") or mod.startswith("unified."):
-            return match.group(0)
-        # check if this module exists in the search_root (either original or unified)
-        mod_py = os.path.join(search_root, persona, *mod.split('.')) + '.py'
-        mod_pkg = os.path.join(search_root, persona, *mod.split('.'))
-        if os.path.exists(mod_py) or os.path.isdir(mod_pkg):
-            if imp.strip() == 'import':
-                alias = mod.split('.')[-1]
-                return f"import unified.{persona}.{mod} as {alias}"
-            else:
-                return f"{imp}unified.{persona}.{mod}"
-        return match.group(0)
-
-    pattern = re.compile(r'^(\s*from\s+|import\s+)([A-Za-z_]\w*(?:\.[A-Za-z_]\w*)*)', re.MULTILINE)
-    new_content = pattern.sub(replace, content)
-
-    if new_content != content:
-        with open(file_path, 'w') as f:
-            f.write(new_content)
+    return RewriteRules(
+        local=local_modules(persona_root), local_prefix=f"unified.{persona}", namespaced=(f"{persona}.", "unified.")
+    )
 
 
 def _place_inits(unified_root: str):
-    """Ensure every directory under unified_root is a Python package."""
-    for dirpath, _, _ in os.walk(unified_root):
-        init = os.path.join(dirpath, "__init__.py")
-        if not os.path.exists(init):
-            open(init, "w").close()
+    """Ensure every directory under unified_root (other than .venv, __pycache__, ...) is a Python package."""
+    index = tree_index(unified_root)
+    for dirpath in index.directories(unified_root):
+        if not index.is_package(dirpath):
+            open(os.path.join(dirpath, "__init__.py"), "w").close()
 
 
-def setup_for_refactor(root_dir: str):
+def setup_for_refactor(root_dir: str, copy_mode: str = "auto"):
     unified_dir = os.path.join(root_dir, "unified")
     persona_dirs = [
         d for d in os.listdir(root_dir)
@@ -179,17 +112,17 @@ def setup_for_refactor(root_dir: str):
         shutil.rmtree(unified_dir)
     os.makedirs(unified_dir)
 
-    # 2) Copy each persona package (excluding tests)
+    # 2) Copy each persona package (excluding tests), reflinked or hardlinked per copy_mode
     for persona in persona_dirs:
         src = os.path.join(root_dir, persona)
         dst = os.path.join(unified_dir, persona)
-        shutil.copytree(
-            src, dst,
+        copytree(
+            src, dst, copy_mode,
             ignore=shutil.ignore_patterns("test_*.py", "__pycache__")
         )
-        # 2a) Rewrite imports inside the source code
-        for py in glob.glob(os.path.join(dst, "**", "*.py"), recursive=True):
-            _rewrite_imports(py, persona, unified_dir)
+        # 2a) Rewrite imports inside the source code (rewritten files replace their links)
+        sources = glob.glob(os.path.join(dst, "**", "*.py"), recursive=True)
+        rewrite_files([(py, py) for py in sources], _persona_rules(persona, dst))
 
     # 3) Create common/ if needed
     os.makedirs(os.path.join(unified_dir, "common"), exist_ok=True)
@@ -200,14 +133,14 @@ def setup_for_refactor(root_dir: str):
 
     for persona in persona_dirs:
         persona_src = os.path.join(root_dir, persona)
-        for dirpath, _, files in os.walk(persona_src):
-            for fn in files:
-                if fn.startswith("test_") and fn.endswith(".py"):
-                    orig = os.path.join(dirpath, fn)
-                    new_name = f"test_{persona}_{fn[len('test_'):]}"
-                    dst = os.path.join(tests_dest, new_name)
-                    shutil.copy2(orig, dst)
-                    _rewrite_imports(dst, persona, root_dir)
+        test_files = []
+        for orig in tree_index(persona_src).python_files(persona_src):
+            fn = orig.name
+            if fn.startswith("test_"):
+                new_name = f"test_{persona}_{fn[len('test_'):]}"
+                test_files.append((str(orig), os.path.join(tests_dest, new_name)))
+        # copy each test with its imports rewritten
+        rewrite_files(test_files, _persona_rules(persona, persona_src), copy_mode=copy_mode)
 
     # 5) Inject __init__.py everywhere under unified/
     _place_inits(unified_dir)
@@ -240,21 +173,32 @@ dependencies = []
     with open(os.path.join(unified_dir, "pyproject.toml"), "w") as f:
         f.write(pyproject)
         
-def setup_grouped(target_dir, split, num_groups=3):
-    ds = load_dataset("celinelee/minicode-repos", split=split)
+def setup_grouped(target_dir, split, num_groups=3, approximate=False, n_neighbors=None, similarity_cache=None,
+                  clone_opts=None, manifest=DEFAULT_MANIFEST, copy_mode="auto", library_workers=None,
+                  log_dir=os.path.join("small_repos", ".logs")):
+    ds = dataset_rows(split, manifest)
+    # TASK.md pair similarities persist across runs, keyed by content hash
+    cache = None if similarity_cache is None or approximate else SimilarityCache(similarity_cache)
     
-    # first clone everything
+    # first clone everything, concurrently
     library_paths = set()
+    clone_jobs = []
     for ex in ds:
         target_subdir = os.path.join(target_dir, ex["library_name"])
         if not os.path.exists(target_subdir): os.makedirs(target_subdir, exist_ok=True)
         library_paths.add(target_subdir)
-        subprocess.run(["git", "clone", ex["github_link"]], cwd=target_subdir)
+        clone_jobs.append(CloneJob(ex["github_link"], target_subdir, commit=ex.get("commit")))
+    clone_all(clone_jobs, **(clone_opts or {}))
     
-    # then rearrange into group_size
-    for library_path in library_paths:
+    # then rearrange into group_size (clustering shares the similarity cache, so libraries go one at a time)
+    group_dirs = []
+    for library_path in sorted(library_paths):
         library_personas = glob.glob(os.path.join(library_path, "*/"))
-        clusters, distances = get_string_clusters(library_personas, num_groups)
+        clusters, distances = get_string_clusters(
+            library_personas, num_groups, approximate=approximate, n_neighbors=n_neighbors, cache=cache
+        )
+        if cache is not None:
+            cache.save()
         if clusters is None:
             continue
         clusters_sorted = sort_string_clusters(clusters, distances)
@@ -263,14 +207,36 @@ def setup_grouped(target_dir, split, num_groups=3):
             if not os.path.exists(group_dir): os.makedirs(group_dir, exist_ok=True)
             for c_idx in cluster_indices:
                 shutil.move(library_personas[c_idx], os.path.join(group_dir, os.path.relpath(library_personas[c_idx], library_path)))
-
-            setup_for_refactor(group_dir)
+            group_dirs.append(group_dir)
         # todo remove now-empty folder
 
+    # groups are independent: build their unified trees in parallel, each logging to its own file
+    tasks = [LibraryTask(os.path.basename(g), setup_for_refactor, (g, copy_mode)) for g in group_dirs]
+    print_library_summary(run_libraries(tasks, workers=library_workers, log_dir=log_dir))
+
 if __name__ == "__main__":
     try:
         set_start_method("fork")
     except RuntimeError:
         pass
 
-    setup_grouped("small_repos", "small")
+    parser = argparse.ArgumentParser(description="Clone the small split and group each library's personas.")
+    parser.add_argument("--num_groups", type=int, default=3, help="groups per library")
+    parser.add_argument("--approximate", action="store_true", default=False,
+                        help="cluster on top-k TF-IDF neighbours instead of the exact fuzzy matrix (large libraries)")
+    parser.add_argument("--n_neighbors", type=int, default=None, help="neighbours per persona with --approximate")
+    parser.add_argument("--similarity_cache", type=str, default=os.path.join("small_repos", ".similarity_cache.npz"),
+                        help="file caching TASK.md pair similarities across runs")
+    parser.add_argument("--no_similarity_cache", action="store_true", default=False,
+                        help="score every pair from scratch and do not touch the cache file")
+    parser.add_argument("--manifest", type=str, default=DEFAULT_MANIFEST,
+                        help="pinned dataset manifest (falls back to the Hugging Face dataset if missing)")
+    add_clone_arguments(parser)
+    add_copy_arguments(parser)
+    add_library_arguments(parser, log_dir=os.path.join("small_repos", ".logs"))
+    args = parser.parse_args()
+
+    setup_grouped("small_repos", "small", args.num_groups, approximate=args.approximate, n_neighbors=args.n_neighbors,
+                  similarity_cache=None if args.no_similarity_cache else args.similarity_cache,
+                  clone_opts=clone_options(args), manifest=args.manifest, copy_mode=args.copy_mode,
+                  library_workers=args.library_workers, log_dir=args.log_dir)
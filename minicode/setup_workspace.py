@@ -0,0 +1,46 @@
+import argparse
+import fnmatch
+import os
+import sys
+
+from minicode.setup.copying import copytree
+
+# Thin CLI over minicode.setup.copying for the agent scripts: copy a repo
+# directory into a fresh refactor workspace, reflinking files where the
+# filesystem supports it (near-instant, sharing blocks until a file is
+# edited) and copying them otherwise. Workspaces are edited in place, so
+# they are never hardlinked.
+
+
+def main(args):
+    if os.path.exists(args.destination):
+        print(f"Error: workspace '{args.destination}' already exists")
+        sys.exit(1)
+    source = os.path.abspath(args.source)
+
+    def ignore(directory, names):
+        if os.path.abspath(directory) != source:
+            return []
+        return [name for name in names if any(fnmatch.fnmatch(name, pattern) for pattern in args.exclude)]
+
+    counts = copytree(args.source, args.destination, args.copy_mode, ignore=ignore)
+    summary = ", ".join(f"{n} {how}" for how, n in sorted(counts.items())) or "no files"
+    print(f"Created workspace {args.destination} from {args.source} ({summary})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create a refactor workspace as a copy-on-write copy of a directory.")
+    parser.add_argument("source", type=str, help="directory to copy")
+    parser.add_argument("destination", type=str, help="workspace to create (must not exist)")
+    parser.add_argument(
+        "--exclude", nargs="*", default=[], help="glob patterns of top-level entries to leave out (e.g. eval outputs)"
+    )
+    parser.add_argument("--copy_mode", choices=("auto", "reflink", "copy"), default="auto", help="how files are copied")
+    args = parser.parse_args()
+
+    main(args)
+
+# ---- Example usage ----
+# python -m minicode.setup_workspace small_repos/workflow_A small_repos/workflow_A_refactor_cl \
+#     --exclude 'LIBRARYBENCH_metrics*' report.json test_output.txt
+# python -m minicode.setup_workspace codecontests codecontests_original
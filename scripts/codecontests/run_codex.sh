@@ -1,7 +1,7 @@
 source .env
 
 mkdir -p results/codecontests
-cp -r codecontests codecontests_original
+python -m minicode.setup_workspace codecontests codecontests_original
 
 # Loop through all cluster directories
 for i in {0..7}; do
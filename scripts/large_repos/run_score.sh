@@ -10,14 +10,23 @@ fi
 
 directory="$1"
 
+# provider limits for the logprob requests; override via environment
+RATE_LIMIT_ARGS="--max_concurrency ${MAX_CONCURRENCY:-8}"
+if [ -n "$REQUESTS_PER_MINUTE" ]; then
+    RATE_LIMIT_ARGS="$RATE_LIMIT_ARGS --requests_per_minute $REQUESTS_PER_MINUTE"
+fi
+if [ -n "$TOKENS_PER_MINUTE" ]; then
+    RATE_LIMIT_ARGS="$RATE_LIMIT_ARGS --tokens_per_minute $TOKENS_PER_MINUTE"
+fi
+
 if [ ! -d "large_repos/$directory" ]; then
     echo "Error: Directory '$directory' does not exist"
     exit 1
 fi
 
 echo "Running scoring script on refactored repository..."
-uv run python -m minicode.score_large_repos --directory "large_repos/$directory/unified" --enable_logprobs > results/large_repos/$directory/score_unified.txt
-uv run python -m minicode.score_large_repos --directory "large_repos/$directory" --enable_logprobs  --skip_unified > results/large_repos/$directory/score_original.txt
+uv run python -m minicode.score_large_repos --directory "large_repos/$directory/unified" --enable_logprobs $RATE_LIMIT_ARGS > results/large_repos/$directory/score_unified.txt
+uv run python -m minicode.score_large_repos --directory "large_repos/$directory" --enable_logprobs --skip_unified $RATE_LIMIT_ARGS > results/large_repos/$directory/score_original.txt
 
 cp large_repos/$directory/unified/test_output_original.txt results/large_repos/$directory/test_output_original.txt
 cp large_repos/$directory/unified/test_output.txt results/large_repos/$directory/test_output.txt
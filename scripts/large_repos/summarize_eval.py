@@ -21,6 +21,11 @@ def load_json_metrics(file_path: Path) -> Dict:
     if not file_path.exists():
         return {}
 
+    # The compact summary written next to the metrics has the same totals
+    summary_path = file_path.with_name(file_path.stem + ".summary.json")
+    if summary_path.exists():
+        file_path = summary_path
+
     try:
         with open(file_path, "r") as f:
             data = json.load(f)
@@ -25,11 +25,9 @@ base_dir="$PWD"
 
 # make a copy to refactor
 new_directory="${directory}_refactor_cl" 
-cp -r $directory $new_directory
-# remove unwanted eval files in copyig
-rm -f "$new_directory/LIBRARYBENCH_metrics.json"
-rm -f "$new_directory/report.json"
-rm -f "$new_directory/test_output.txt"
+# (copy-on-write where the filesystem supports it, leaving out the eval outputs)
+python -m minicode.setup_workspace "$directory" "$new_directory" \
+  --exclude 'LIBRARYBENCH_metrics*' report.json test_output.txt
 
 # Push into the target directory
 pushd "$new_directory" >/dev/null
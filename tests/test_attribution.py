@@ -0,0 +1,64 @@
+"""Tests for per-definition token and logprob attribution."""
+
+import re
+
+import numpy as np
+
+from minicode.scoring.attribution import align, attribute, attribute_file, hot_spots
+from minicode.scoring.token_store import TokenLogprobs, TokenStore
+
+CODE = """import os
+
+@decorator
+def branchy(x):
+    if x:
+        return 1
+    return 2
+
+class Thing:
+    size = 3
+
+    def method(self):
+        return os.sep
+"""
+
+
+def _words(code):
+    # whitespace-preserving "tokens": each word with the blank text before it
+    return re.findall(r"\s*\S+|\s+$", code)
+
+
+def _rows(rows):
+    return {row["name"]: row for row in rows}
+
+
+def test_tokens_land_in_their_definitions():
+    tokens = _words(CODE)
+    assert "".join(tokens) == CODE
+    rows = _rows(attribute(CODE, align(tokens, CODE), np.full(len(tokens), -1.0)))
+
+    assert list(rows) == ["<module>", "branchy", "Thing", "Thing.method"]
+    assert rows["branchy"]["lineno"] == 3  # the decorator belongs to the function
+    assert rows["branchy"]["tokens"] == 9  # @decorator def branchy(x): if x: return 1 return 2
+    assert rows["branchy"]["cyclomatic"] == 2
+    assert rows["Thing.method"]["tokens"] == 5  # with the file's final newline
+    assert rows["Thing"]["tokens"] == 5  # class Thing: size = 3
+    assert rows["<module>"]["tokens"] == 2
+    assert sum(row["tokens"] for row in rows.values()) == len(tokens)
+    assert sum(row["logprobs"] for row in rows.values()) == -len(tokens)
+
+
+def test_stored_tokens_skip_context_and_markers(tmp_path):
+    tokens = _words(CODE)
+    context = ["# context\n", "x = 1\n", "# === MAIN CODE START ===\n"]
+    store = TokenStore()
+    store.add("lib.py", 0, len(context), [-5.0] * len(context) + [-0.5] * len(tokens), context + tokens)
+    store.save(tmp_path / "run.logprobs.npz")
+    data = TokenLogprobs.load(tmp_path / "run.logprobs.npz")
+
+    rows = _rows(attribute_file(CODE, "lib.py", data))
+    assert rows["branchy"]["logprobs"] == -4.5
+    assert sum(row["tokens"] for row in rows.values()) == len(tokens)
+
+    report = {"lib.py": list(rows.values())}
+    assert [row["name"] for row in hot_spots(report, top=2)] == ["branchy", "Thing"]
@@ -0,0 +1,68 @@
+"""Tests for JSONL scoring checkpoints."""
+
+import json
+import math
+
+import pytest
+
+from minicode.scoring.checkpoint import Checkpoint, checkpoint_path, should_run
+
+
+def test_checkpoint_path_sits_next_to_output():
+    assert checkpoint_path("repo/LIBRARYBENCH_metrics.json") == "repo/LIBRARYBENCH_metrics.checkpoint.jsonl"
+
+
+def test_resume_reloads_records_and_skips_torn_line(tmp_path):
+    path = str(tmp_path / "run.checkpoint.jsonl")
+    with Checkpoint(path) as checkpoint:
+        checkpoint.append("a.py", logprobs=-1.5, tokens=3, metrics={"loc": float("nan")})
+        checkpoint.append("b.py", logprobs=-2.0, tokens=4, metrics={"loc": 2})
+    with open(path, "a") as f:
+        f.write('{"program": "c.py", "logp')
+
+    with Checkpoint(path, resume=True) as checkpoint:
+        assert "a.py" in checkpoint and "b.py" in checkpoint
+        assert "c.py" not in checkpoint
+        assert math.isnan(checkpoint.records["a.py"]["metrics"]["loc"])
+        checkpoint.append("c.py", logprobs=0.0, tokens=1, metrics={})
+
+    assert set(Checkpoint(path, resume=True).records) == {"a.py", "b.py", "c.py"}
+
+
+def test_fresh_run_truncates_checkpoint(tmp_path):
+    path = str(tmp_path / "run.checkpoint.jsonl")
+    with Checkpoint(path) as checkpoint:
+        checkpoint.append("a.py", logprobs=0.0)
+    with Checkpoint(path):
+        pass
+    assert Checkpoint(path, resume=True).records == {}
+
+
+def test_should_run_policies(tmp_path):
+    output = tmp_path / "metrics.json"
+    assert should_run(output, "skip", resume=False)
+    output.write_text("{}")
+    assert not should_run(output, "skip", resume=False)
+    assert should_run(output, "overwrite", resume=False)
+    assert should_run(output, "error", resume=True)
+    with pytest.raises(FileExistsError):
+        should_run(output, "error", resume=False)
+
+
+def test_records_keep_import_counts_and_the_file_keeps_code(tmp_path):
+    path = str(tmp_path / "run.checkpoint.jsonl")
+    imports = ["def a():\n    pass\n", "class B:\n    pass\n"]
+    with Checkpoint(path) as checkpoint:
+        checkpoint.append("a.py", logprobs=-1.0, tokens=2, metrics={"loc": 2, "internal_imports": imports})
+        assert checkpoint.records["a.py"]["metrics"] == {"loc": 2, "internal_imports": 2}
+        checkpoint.append("b.py", logprobs=-1.0, tokens=2, metrics={"internal_imports": imports[:1]})
+        checkpoint.append("b.py", logprobs=-2.0, tokens=2, metrics={"internal_imports": imports})
+    with open(path) as f:
+        assert json.loads(f.readline())["metrics"]["internal_imports"] == imports
+    resumed = Checkpoint(path, resume=True)
+    assert resumed.records["a.py"]["metrics"]["internal_imports"] == 2
+    # the metrics output gets the imported code back, from the latest record of each file
+    full = resumed.full_records()
+    assert full["a.py"]["metrics"]["internal_imports"] == imports
+    assert full["b.py"]["logprobs"] == -2.0 and full["b.py"]["metrics"]["internal_imports"] == imports
+    resumed.close()
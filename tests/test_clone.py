@@ -0,0 +1,120 @@
+"""Tests for the concurrent git clone manager and mirror store, against local file:// bare repositories."""
+
+import os
+import stat
+import subprocess
+
+import pytest
+
+from minicode.setup.clone import CloneJob, CloneManager, clone_all, repo_name
+from minicode.setup.mirrors import MirrorStore
+
+
+def _git(*args, cwd=None):
+    return subprocess.run(["git", *args], cwd=cwd, check=True, capture_output=True, text=True).stdout
+
+
+def _bare_repo(root, name, commits=3):
+    work = root / f"{name}_work"
+    work.mkdir()
+    _git("init", "-q", cwd=work)
+    for idx in range(commits):
+        (work / "TASK.md").write_text(f"revision {idx}\n")
+        _git("add", "TASK.md", cwd=work)
+        _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-m", f"commit {idx}", cwd=work)
+    bare = root / f"{name}.git"
+    _git("clone", "-q", "--bare", str(work), str(bare))
+    return f"file://{bare}"
+
+
+@pytest.fixture
+def remotes(tmp_path):
+    root = tmp_path / "remotes"
+    root.mkdir()
+    return [_bare_repo(root, name) for name in ("alpha", "beta", "gamma")]
+
+
+def test_repo_name():
+    assert repo_name("https://github.com/user/persona_repo") == "persona_repo"
+    assert repo_name("https://github.com/user/persona_repo.git/") == "persona_repo"
+    assert repo_name("git@github.com:user/persona_repo.git") == "persona_repo"
+
+
+def test_concurrent_shallow_clones_and_rerun(tmp_path, remotes, capsys):
+    target = tmp_path / "library"
+    jobs = [CloneJob(url, str(target)) for url in remotes]
+    results = clone_all(jobs, workers=2, depth=1)
+
+    assert [r.status for r in results] == ["cloned"] * 3
+    for name in ("alpha", "beta", "gamma"):
+        assert (target / name / "TASK.md").read_text() == "revision 2\n"
+        assert _git("rev-list", "--count", "HEAD", cwd=target / name).strip() == "1"
+    assert sorted(os.listdir(target)) == ["alpha", "beta", "gamma"]  # no partial clones left
+    assert "3 cloned, 0 already present, 0 failed" in capsys.readouterr().out
+
+    # a rerun (with a duplicate job) skips what is already on disk
+    results = CloneManager(workers=2).run(jobs + jobs[:1])
+    assert [r.status for r in results] == ["skipped"] * 4
+
+
+def test_failures_are_retried_and_summarized(tmp_path, remotes, capsys):
+    missing = remotes[0].replace("alpha.git", "missing.git")
+    results = clone_all([CloneJob(missing, str(tmp_path)), CloneJob(remotes[1], str(tmp_path))], retries=2, backoff=0)
+
+    failed, cloned = results
+    assert (failed.status, failed.attempts) == ("failed", 3)
+    assert cloned.status == "cloned"
+    assert not (tmp_path / "missing").exists()
+    out = capsys.readouterr().out
+    assert "1 cloned, 0 already present, 1 failed" in out
+    assert f"{missing} -> {failed.job.dest} (3 attempts)" in out
+
+
+def test_timeouts_kill_the_clone(tmp_path):
+    slow_git = tmp_path / "slow_git"
+    slow_git.write_text("#!/bin/sh\nsleep 10\n")
+    slow_git.chmod(slow_git.stat().st_mode | stat.S_IEXEC)
+
+    manager = CloneManager(timeout=0.2, retries=1, backoff=0, git=str(slow_git))
+    (result,) = manager.run([CloneJob("file:///nowhere/slow.git", str(tmp_path / "library"))])
+    assert result.status == "failed"
+    assert result.error == "timed out after 0.2s"
+    assert result.attempts == 2
+    assert result.seconds < 5
+
+
+def test_mirrors_serve_clones_online_and_offline(tmp_path, remotes):
+    store = MirrorStore(str(tmp_path / "mirrors"))
+    results = CloneManager(mirrors=store).run([CloneJob(url, str(tmp_path / "first")) for url in remotes[:2]])
+    assert [r.status for r in results] == ["cloned", "cloned"]
+    alpha = tmp_path / "first" / "alpha"
+    assert (alpha / ".git" / "objects" / "info" / "alternates").read_text().strip() == os.path.join(
+        store.path(remotes[0]), "objects"
+    )
+    assert _git("remote", "get-url", "origin", cwd=alpha).strip() == remotes[0]
+
+    # new upstream commits reach the next online run through a fetch into the mirror
+    work = tmp_path / "remotes" / "alpha_work"
+    (work / "TASK.md").write_text("revision 3\n")
+    _git("-c", "user.name=t", "-c", "user.email=t@t", "commit", "-q", "-am", "commit 3", cwd=work)
+    _git("push", "-q", remotes[0], "HEAD", cwd=work)
+    CloneManager(mirrors=MirrorStore(store.root)).run([CloneJob(remotes[0], str(tmp_path / "second"))])
+    assert (tmp_path / "second" / "alpha" / "TASK.md").read_text() == "revision 3\n"
+
+    # offline, mirrored repositories still clone and the others fail without retrying
+    offline = CloneManager(mirrors=MirrorStore(store.root, offline=True), retries=3)
+    cloned, missing = offline.run([CloneJob(url, str(tmp_path / "offline")) for url in (remotes[0], remotes[2])])
+    assert cloned.status == "cloned"
+    assert (tmp_path / "offline" / "alpha" / "TASK.md").read_text() == "revision 3\n"
+    assert (missing.status, missing.attempts) == ("failed", 0)
+    assert "offline" in missing.error
+
+
+@pytest.mark.parametrize("depth", [1, None])
+def test_pinned_commits_are_checked_out(tmp_path, remotes, depth):
+    bare = remotes[0][len("file://") :]
+    first = _git("rev-list", "--reverse", "HEAD", cwd=bare).split()[0]
+    (result,) = CloneManager(depth=depth).run([CloneJob(remotes[0], str(tmp_path), commit=first)])
+    assert result.status == "cloned", result.error
+    assert (tmp_path / "alpha" / "TASK.md").read_text() == "revision 0\n"
+    assert _git("rev-parse", "HEAD", cwd=tmp_path / "alpha").strip() == first
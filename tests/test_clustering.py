@@ -0,0 +1,40 @@
+"""Tests for condensed average-linkage clustering and cluster ranking."""
+
+import itertools
+
+import numpy as np
+from scipy.spatial.distance import squareform
+from sklearn.cluster import AgglomerativeClustering
+
+from minicode.grouping.clustering import average_linkage_clusters, mean_pair_distance, rank_clusters
+
+
+def _distances(n, seed=0):
+    points = np.random.default_rng(seed).random((n, 3)) * 50
+    square = np.sqrt(((points[:, None] - points[None]) ** 2).sum(-1))
+    return squareform(square, checks=False), square
+
+
+def test_matches_precomputed_agglomerative_clustering():
+    condensed, square = _distances(40)
+    for num_clusters in (2, 3, 6):
+        labels = AgglomerativeClustering(
+            n_clusters=num_clusters, metric="precomputed", linkage="average"
+        ).fit_predict(square)
+        expected = sorted(sorted(np.flatnonzero(labels == label).tolist()) for label in set(labels))
+        assert sorted(average_linkage_clusters(condensed, num_clusters)) == expected
+
+
+def test_ranking_by_mean_pair_distance():
+    condensed, square = _distances(25, seed=1)
+    clusters = average_linkage_clusters(condensed, 4) + [[7]]
+    for cluster in clusters:
+        pairs = list(itertools.combinations(cluster, 2))
+        expected = sum(square[i][j] for i, j in pairs) / len(pairs) if pairs else float("inf")
+        assert np.isclose(mean_pair_distance(cluster, condensed), expected)
+        assert np.isclose(mean_pair_distance(cluster, square), expected)
+    ranked = rank_clusters(clusters, condensed)
+    assert ranked == rank_clusters(clusters, square)
+    assert ranked[-1] == [7]
+    means = [mean_pair_distance(cluster, condensed) for cluster in ranked]
+    assert means == sorted(means)
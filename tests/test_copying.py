@@ -0,0 +1,97 @@
+"""Tests for reflink/hardlink copies of persona trees and refactor workspaces."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+from minicode.setup.copying import copy_file, copytree, write_text
+from minicode.setup.rewrite import RewriteRules, rewrite_file
+
+
+def _same_file(a, b):
+    return os.stat(a).st_ino == os.stat(b).st_ino
+
+
+def test_copy_file_modes(tmp_path):
+    src = tmp_path / "src.py"
+    src.write_text("x = 1\n")
+
+    assert copy_file(str(src), str(tmp_path / "linked.py"), "hardlink") == "hardlink"
+    assert _same_file(src, tmp_path / "linked.py")
+
+    for mode in ("auto", "reflink", "copy"):
+        dst = tmp_path / f"{mode}.py"
+        assert copy_file(str(src), str(dst), mode) in ("reflink", "copy")
+        assert not _same_file(src, dst)
+        dst.write_text("changed\n")
+        assert src.read_text() == "x = 1\n"
+
+    with pytest.raises(ValueError):
+        copy_file(str(src), str(tmp_path / "bad.py"), "symlink")
+
+
+def test_existing_destination_is_replaced_not_written_through(tmp_path):
+    src, other = tmp_path / "src.py", tmp_path / "other.py"
+    src.write_text("new\n")
+    other.write_text("keep\n")
+    dst = tmp_path / "dst.py"
+    os.link(other, dst)
+
+    copy_file(str(src), str(dst), "copy")
+    assert dst.read_text() == "new\n"
+    assert other.read_text() == "keep\n"
+
+
+def test_write_text_breaks_hardlinks_and_keeps_the_mode(tmp_path):
+    original = tmp_path / "original.sh"
+    original.write_text("echo a\n")
+    original.chmod(0o755)
+    linked = tmp_path / "linked.sh"
+    os.link(original, linked)
+
+    write_text(str(linked), "echo b\n")
+    assert linked.read_text() == "echo b\n"
+    assert original.read_text() == "echo a\n"
+    assert os.stat(linked).st_mode & 0o777 == 0o755
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_copytree_counts_and_rewrite_leaves_hardlinked_originals_alone(tmp_path):
+    src = tmp_path / "persona"
+    (src / "tests").mkdir(parents=True)
+    (src / "tests" / "test_a.py").write_text("from tests.helpers import h\n")
+    (src / "tests" / "test_b.py").write_text("import os\n")
+    (src / "data.txt").write_text("data\n")
+
+    dst = tmp_path / "unified"
+    counts = copytree(str(src), str(dst), "hardlink")
+    assert counts == {"hardlink": 3}
+
+    rules = RewriteRules(renames=(("tests", "tests.persona"),))
+    for name in ("test_a.py", "test_b.py"):
+        path = str(dst / "tests" / name)
+        rewrite_file((path, path), rules, "hardlink")
+    assert (dst / "tests" / "test_a.py").read_text() == "from tests.persona.helpers import h\n"
+    assert (src / "tests" / "test_a.py").read_text() == "from tests.helpers import h\n"
+    assert _same_file(src / "tests" / "test_b.py", dst / "tests" / "test_b.py")
+
+
+def test_setup_workspace_excludes_top_level_eval_outputs(tmp_path):
+    src = tmp_path / "workflow"
+    (src / "sub").mkdir(parents=True)
+    for name in ("main.py", "report.json", "LIBRARYBENCH_metrics.json", "LIBRARYBENCH_metrics.summary.json"):
+        (src / name).write_text("{}\n")
+    (src / "sub" / "report.json").write_text("{}\n")
+    dst = tmp_path / "workflow_refactor"
+
+    cmd = [sys.executable, "-m", "minicode.setup_workspace", str(src), str(dst)]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    subprocess.run(cmd + ["--exclude", "LIBRARYBENCH_metrics*", "report.json"], cwd=root, check=True)
+    assert sorted(p.name for p in dst.iterdir()) == ["main.py", "sub"]
+    assert (dst / "sub" / "report.json").exists()
+
+    again = subprocess.run(cmd, cwd=root, capture_output=True, text=True)
+    assert again.returncode == 1
+    assert "already exists" in again.stdout
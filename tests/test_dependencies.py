@@ -0,0 +1,89 @@
+"""Tests for merging persona requirements."""
+
+from collections import defaultdict
+
+import pytest
+import tomli
+from packaging.specifiers import SpecifierSet
+
+from minicode.setup.dependencies import merge_requirements, satisfiable, write_lock
+from minicode.setup_large_repos import create_pyproject_toml, merge_dependencies
+
+
+@pytest.mark.parametrize(
+    "specifier, expected",
+    [
+        (">=1.20,>=1.24", True),
+        (">1.0,<1.1", True),
+        ("<1,!=0", True),
+        ("~=1.4.5,<1.5", True),
+        ("==1.*,!=1.0", True),
+        (">=1,<1", False),
+        ("<1.0,>=1.5", False),
+        ("!=1.*,>=1,<2", False),
+    ],
+)
+def test_satisfiable(specifier, expected):
+    assert satisfiable(SpecifierSet(specifier)) is expected
+
+
+def test_merge_intersects_unions_and_reports_conflicts():
+    requirements, conflicts = merge_requirements(
+        [
+            ("alice", ["numpy>=1.20", "Requests[Socks]>=2", "tomli; python_version < '3.11'", "scipy<1.0"]),
+            ("bob", ["NumPy>=1.24", "requests[security]", 'tomli>=2 ; python_version<"3.11"', "tomli", "not valid!"]),
+            ("carol", ["scipy>=1.5", "pkg @ https://example.com/pkg.whl"]),
+        ]
+    )
+    assert requirements == [
+        "numpy>=1.20,>=1.24",
+        "requests[security,socks]>=2",
+        'tomli>=2; python_version < "3.11"',
+        "scipy",
+        "tomli",
+        "pkg @ https://example.com/pkg.whl",
+        "not valid!",
+    ]
+    assert len(conflicts) == 1
+    assert "scipy<1.0,>=1.5" in conflicts[0] and "alice: scipy<1.0" in conflicts[0] and "carol: scipy>=1.5" in conflicts[0]
+
+
+def _deps(dependencies, optional=None):
+    return {
+        "build-system": {},
+        "project": {"dependencies": dependencies, "optional-dependencies": defaultdict(list, optional or {})},
+        "tool": {},
+    }
+
+
+def test_merged_dependencies_write_a_valid_pyproject(tmp_path):
+    merged = merge_dependencies(
+        [
+            _deps(["numpy>=1.20", "tomli; python_version < '3.11'"], {"Dev": ["ruff>=0.1"]}),
+            _deps(["numpy<1.0"], {"dev": ["ruff<0.5"]}),
+        ],
+        ["alice", "bob"],
+    )
+    assert merged["project"]["dependencies"] == [
+        "setuptools",
+        "pytest",
+        "pytest-json-report",
+        "pytest-cov",
+        "numpy",
+        'tomli; python_version < "3.11"',
+    ]
+    assert merged["project"]["optional-dependencies"] == {"dev": ["ruff<0.5,>=0.1"]}
+    assert len(merged["conflicts"]) == 1 and merged["conflicts"][0].startswith("numpy")
+
+    create_pyproject_toml(tmp_path, "lib", {"pkg"}, merged)
+    with open(tmp_path / "pyproject.toml", "rb") as f:
+        project = tomli.load(f)["project"]
+    assert project["dependencies"][-1] == 'tomli; python_version < "3.11"'
+    assert project["optional-dependencies"] == {"dev": ["ruff<0.5,>=0.1"]}
+
+
+def test_write_lock_reports_a_missing_uv(tmp_path):
+    (tmp_path / "pyproject.toml").write_text("")
+    error = write_lock(str(tmp_path), uv=str(tmp_path / "no-uv"))
+    assert "not found" in error
+    assert not (tmp_path / "requirements.lock").exists()
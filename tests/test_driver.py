@@ -0,0 +1,44 @@
+"""Tests for the per-library setup pool."""
+
+import subprocess
+import sys
+
+import pytest
+
+from minicode.setup.driver import LibraryTask, print_library_summary, run_libraries
+
+
+def _noisy(name):
+    print(f"python output from {name}")
+    subprocess.run([sys.executable, "-c", f"print('subprocess output from {name}')"], check=True)
+
+
+def _broken(name):
+    print(f"starting {name}")
+    raise RuntimeError(f"{name} has no personas")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_run_libraries_captures_logs_and_isolates_failures(tmp_path, capsys, workers):
+    tasks = [
+        LibraryTask("lib_a", _noisy, ("lib_a",)),
+        LibraryTask("lib_b", _broken, ("lib_b",)),
+        LibraryTask("lib_c", _noisy, kwargs={"name": "lib_c"}),
+    ]
+    results = run_libraries(tasks, workers=workers, log_dir=str(tmp_path / "logs"))
+
+    assert [(r.name, r.status) for r in results] == [("lib_a", "ok"), ("lib_b", "failed"), ("lib_c", "ok")]
+    assert results[1].error == "RuntimeError: lib_b has no personas"
+    log_a = (tmp_path / "logs" / "lib_a.log").read_text()
+    assert "python output from lib_a" in log_a and "subprocess output from lib_a" in log_a
+    log_b = (tmp_path / "logs" / "lib_b.log").read_text()
+    assert "starting lib_b" in log_b and "Traceback" in log_b
+
+    out = capsys.readouterr().out
+    assert "output from" not in out
+    assert "lib_b: failed" in out
+
+    print_library_summary(results)
+    out = capsys.readouterr().out
+    assert "2 of 3 libraries set up, 1 failed" in out
+    assert "lib_b: RuntimeError: lib_b has no personas" in out
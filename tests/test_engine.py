@@ -0,0 +1,120 @@
+"""Tests for the layout-driven scoring engine."""
+
+import math
+
+from minicode.scoring import layouts
+from minicode.scoring.checkpoint import Checkpoint
+from minicode.scoring.engine import Layout, ScoringEngine, ScoringUnit
+from minicode.scoring.scheduler import RequestScheduler, ScheduledRequest
+
+
+def _line_count(code):
+    return {"lines": len(code.splitlines())}
+
+
+class WordLayout(Layout):
+    """Scores each file in two-line windows; a window's "logprob" is minus its word count."""
+
+    metrics_fn = staticmethod(_line_count)
+
+    def __init__(self, files):
+        self.files = files
+
+    def discover(self):
+        return self.files.items()
+
+    def load(self, key, path):
+        code = path.read_text()
+        return ScoringUnit(key, path, code=code) if code.strip() else None
+
+    def requests(self, unit, code_metrics):
+        lines = unit.code.splitlines()
+        return [
+            ScheduledRequest(key=(unit.key, i), text="\n".join(lines[i : i + 2]), tokens=len(lines[i : i + 2]))
+            for i in range(0, len(lines), 2)
+        ]
+
+    def logprobs(self, text):
+        return -len(text.split())
+
+    def record(self, unit, code_metrics, responses):
+        return {
+            "logprobs": sum(response for _, response in responses),
+            "tokens": len(responses),
+            "metrics": code_metrics,
+            "windows": [request.key[1] for request, _ in responses],
+        }
+
+
+def test_engine_runs_layout_into_checkpoint(tmp_path):
+    files = {}
+    for name, text in {"a": "one two\nthree\nfour five six\n", "b": "x\n", "empty": "  \n"}.items():
+        files[name] = tmp_path / f"{name}.py"
+        files[name].write_text(text)
+
+    checkpoint = Checkpoint()
+    checkpoint.append("b", logprobs=0.0, tokens=0, metrics={}, windows=[])  # already scored
+    ScoringEngine(max_concurrency=3, processes=1, buffer_size=1).run(WordLayout(files), checkpoint)
+
+    assert set(checkpoint.records) == {"a", "b"}
+    record = checkpoint.records["a"]
+    assert record["logprobs"] == -6
+    assert record["tokens"] == 2
+    assert record["metrics"] == {"lines": 3}
+    assert record["windows"] == [0, 2]
+    assert checkpoint.records["b"]["tokens"] == 0
+
+
+class FlakyLayout(WordLayout):
+    """WordLayout whose requests containing "boom" always fail."""
+
+    def logprobs(self, text):
+        if "boom" in text:
+            raise RuntimeError("provider error")
+        return super().logprobs(text)
+
+
+def test_engine_records_failed_files_and_resume_retries_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(RequestScheduler, "_backoff", lambda self, attempt: 0.0)
+    files = {}
+    for name, text in {"ok": "one two\n", "bad": "fine\nline\nboom\n"}.items():
+        files[name] = tmp_path / f"{name}.py"
+        files[name].write_text(text)
+    path = str(tmp_path / "run.checkpoint.jsonl")
+
+    engine = ScoringEngine(max_concurrency=2, processes=1, buffer_size=1)
+    with Checkpoint(path) as checkpoint:
+        engine.run(FlakyLayout(files), checkpoint)  # does not raise
+    assert checkpoint.records["ok"]["logprobs"] == -2
+    failed = checkpoint.records["bad"]
+    assert math.isnan(failed["logprobs"]) and math.isnan(failed["tokens"])
+    assert failed["metrics"] == {"lines": 3} and "provider error" in failed["error"]
+
+    with Checkpoint(path, resume=True) as resumed:
+        assert set(resumed.records) == {"ok"}
+        engine.run(WordLayout(files), resumed)
+    assert resumed.records["bad"]["logprobs"] == -3 and "error" not in resumed.records["bad"]
+
+
+def test_cluster_layout_failures_are_recorded_not_scored_as_zero(tmp_path, monkeypatch):
+    monkeypatch.setattr(RequestScheduler, "_backoff", lambda self, attempt: 0.0)
+
+    def echo_logprobs(text, model):
+        if "boom" in text:
+            raise RuntimeError("provider error")
+        return [-1.0, -2.0], ["a", "b"]
+
+    monkeypatch.setattr(layouts, "echo_logprobs", echo_logprobs)
+    refactored, original = tmp_path / "refactored", tmp_path / "original"
+    refactored.mkdir()
+    for name, code in {"ok": "print(1)\n", "bad": "print('boom')\n"}.items():
+        (original / name).mkdir(parents=True)
+        (original / name / "main.py").write_text(code)
+
+    checkpoint = Checkpoint()
+    layout = layouts.ClusterLayout(refactored, original, "gpt-4o", enable_logprobs=True)
+    ScoringEngine(max_concurrency=2, processes=1).run(layout, checkpoint)
+    assert checkpoint.records["original/ok"]["logprobs"] == -3.0
+    failed = checkpoint.records["original/bad"]
+    assert math.isnan(failed["logprobs"]) and "provider error" in failed["error"]
+    assert failed["problem_name"] == "bad" and failed["file_path"] == str(original / "bad" / "main.py")
@@ -0,0 +1,79 @@
+"""Tests for incremental rescoring from a previous metrics file."""
+
+import json
+from pathlib import Path
+
+from minicode.scoring.incremental import build_manifest, reusable_results, stale_programs, write_manifest
+
+
+def _tree(tmp_path):
+    root = tmp_path / "lib"
+    root.mkdir()
+    (root / "util.py").write_text("def helper():\n    return 1\n")
+    (root / "core.py").write_text("from util import helper\n")
+    (root / "other.py").write_text("x = 1\n")
+    # imported, but not scored itself
+    (root / "test_fixtures.py").write_text("def fixture():\n    return 2\n")
+    (root / "uses_fixture.py").write_text("from test_fixtures import fixture\n")
+    return root, {f"lib/{name}": root / name for name in ["util.py", "core.py", "other.py", "uses_fixture.py"]}
+
+
+def _imports(root):
+    deps = {"core.py": [root / "util.py"], "uses_fixture.py": [root / "test_fixtures.py"]}
+    return lambda path: [dep for dep in deps.get(path.name, []) if dep.exists()]
+
+
+def test_stale_programs_include_importers_of_unscored_and_deleted_files(tmp_path):
+    root, programs = _tree(tmp_path)
+    imported_files = _imports(root)
+    changed = {(root / "util.py").resolve()}
+    assert stale_programs(programs, changed, imported_files) == {"lib/util.py", "lib/core.py"}
+    assert stale_programs(programs, changed) == {"lib/util.py"}
+    assert stale_programs(programs, {(root / "test_fixtures.py").resolve()}, imported_files) == {"lib/uses_fixture.py"}
+
+    (root / "util.py").unlink()
+    del programs["lib/util.py"]
+    previous_imports = {"lib/core.py": [root / "util.py"]}
+    assert stale_programs(programs, changed, imported_files) == set()
+    assert stale_programs(programs, changed, imported_files, previous_imports) == {"lib/core.py"}
+
+
+def _previous_run(tmp_path, programs):
+    previous = {"total_tokens": 6} | {program: {"logprobs": -1.0, "tokens": 2, "metrics": {}} for program in programs}
+    # written before per-file tokens existed: always rescored
+    del previous["lib/other.py"]["tokens"]
+    metrics_file = tmp_path / "LIBRARYBENCH_metrics.json"
+    metrics_file.write_text(json.dumps(previous))
+    return str(metrics_file)
+
+
+def test_reusable_results_from_manifest(tmp_path):
+    root, programs = _tree(tmp_path)
+    metrics_file = _previous_run(tmp_path, programs)
+    imports = {program: _imports(root)(path) for program, path in programs.items()}
+    write_manifest(tmp_path / "LIBRARYBENCH_metrics.manifest.json", build_manifest(root, imports))
+
+    (root / "test_fixtures.py").write_text("def fixture():\n    return 3\n")
+    reusable = reusable_results(programs, metrics_file, root, imported_files=_imports(root))
+    assert set(reusable) == {"lib/util.py", "lib/core.py"}
+
+    # a deleted module: its importer no longer resolves it, but the manifest remembers
+    (root / "util.py").unlink()
+    del programs["lib/util.py"]
+    reusable = reusable_results(programs, metrics_file, root, imported_files=_imports(root))
+    assert set(reusable) == set()
+
+
+def test_reusable_results_without_a_manifest_rescore_everything(tmp_path, capsys):
+    root, programs = _tree(tmp_path)
+    metrics_file = _previous_run(tmp_path, programs)
+    assert reusable_results(programs, metrics_file, root) == {}
+    assert "[WARN] No manifest" in capsys.readouterr().out
+
+
+def test_manifest_of_a_relative_directory(tmp_path, monkeypatch):
+    root, programs = _tree(tmp_path)
+    monkeypatch.chdir(tmp_path)
+    manifest = build_manifest(Path("lib"), {"lib/core.py": [(root / "util.py").resolve()]})
+    assert manifest["imports"] == {"lib/core.py": ["lib/util.py"]}
+    assert set(manifest["files"]) == set(programs) | {"lib/test_fixtures.py"}
@@ -0,0 +1,89 @@
+"""Tests for incremental, staged rebuilds of unified trees."""
+
+import json
+
+from minicode.scoring.tree_index import tree_index
+from minicode.setup.incremental import (
+    clear_stale_builds,
+    input_hashes,
+    is_current,
+    manifest_path,
+    new_staging,
+    staging_path,
+    swap_in,
+    tree_hash,
+)
+
+
+def _persona(root, readme="persona\n"):
+    (root / "pkg").mkdir(parents=True)
+    (root / "pkg" / "mod.py").write_text("x = 1\n")
+    (root / "README.md").write_text(readme)
+    return root
+
+
+def test_tree_hash_covers_paths_and_contents_but_not_ignored_dirs(tmp_path):
+    a = _persona(tmp_path / "a")
+    before = tree_hash(a)
+    assert tree_hash(_persona(tmp_path / "b")) == before
+
+    (a / ".git").mkdir()
+    (a / ".git" / "HEAD").write_text("ref: refs/heads/main\n")
+    (a / "pkg" / "__pycache__").mkdir()
+    (a / "pkg" / "__pycache__" / "mod.pyc").write_bytes(b"\0")
+    for name in ("venv", ".venv", "node_modules"):
+        (a / name / "lib").mkdir(parents=True)
+        (a / name / "lib" / "site.py").write_text("")
+    assert tree_hash(a) == before
+
+    (a / "pkg" / "mod.py").write_text("x = 2\n")
+    assert tree_hash(a) != before
+    (a / "pkg" / "mod.py").write_text("x = 1\n")
+    (a / "pkg" / "mod.py").rename(a / "pkg" / "other.py")
+    assert tree_hash(a) != before
+
+    assert tree_hash(a / "README.md") is not None
+    assert tree_hash(tmp_path / "missing") is None
+
+
+def test_staged_rebuild_swaps_in_and_drops_stale_files(tmp_path):
+    persona = _persona(tmp_path / "lib" / "lib_alice")
+    target = tmp_path / "lib" / "unified"
+    hashes = input_hashes({"lib_alice": persona, "prompts/REFACTOR.md": tmp_path / "REFACTOR.md"})
+    assert not is_current(target, 1, hashes)
+
+    target.mkdir()
+    (target / "stale.py").write_text("")
+    staging = new_staging(target)
+    (staging / "pkg.py").write_text("built\n")
+    swap_in(staging, target, 1, hashes)
+
+    assert sorted(p.name for p in target.iterdir()) == ["pkg.py"]
+    assert sorted(p.name for p in target.parent.iterdir()) == [".unified.json", "lib_alice", "unified"]
+    assert json.loads(manifest_path(target).read_text())["inputs"]["prompts/REFACTOR.md"] is None
+    assert is_current(target, 1, hashes)
+    assert not is_current(target, 2, hashes)
+
+    (persona / "README.md").write_text("changed\n")
+    assert not is_current(target, 1, input_hashes({"lib_alice": persona, "prompts/REFACTOR.md": tmp_path / "x"}))
+
+
+def test_new_staging_clears_an_interrupted_build(tmp_path):
+    target = tmp_path / "unified"
+    (new_staging(target) / "half_written.py").write_text("")
+    assert list(new_staging(target).iterdir()) == []
+
+
+def test_interrupted_build_leftovers_are_skipped_and_cleared(tmp_path):
+    library = tmp_path / "lib"
+    persona = _persona(library / "lib_alice")
+    target = library / "unified"
+    before = tree_hash(library)
+    for leftover in (staging_path(target), library / ".unified.old"):
+        (leftover / "pkg").mkdir(parents=True)
+        (leftover / "pkg" / "mod.py").write_text("x = 1\n")
+    assert tree_hash(library) == before
+    assert tree_index(library).python_files() == [persona / "pkg" / "mod.py"]
+
+    clear_stale_builds(target)
+    assert sorted(p.name for p in library.iterdir()) == ["lib_alice"]
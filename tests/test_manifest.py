@@ -0,0 +1,44 @@
+"""Tests for the pinned dataset manifest."""
+
+import json
+import subprocess
+
+import pytest
+
+from minicode.setup.manifest import dataset_rows, pin_commits, write_manifest
+
+
+def _bare_repo(path):
+    subprocess.run(["git", "init", "-q", "--bare", str(path)], check=True)
+    work = path.parent / f"{path.name}_work"
+    subprocess.run(["git", "clone", "-q", str(path), str(work)], check=True, capture_output=True)
+    (work / "TASK.md").write_text("task\n")
+    for cmd in (["add", "TASK.md"], ["-c", "user.name=t", "-c", "user.email=t@t", "commit", "-qm", "init"]):
+        subprocess.run(["git", *cmd], cwd=work, check=True)
+    subprocess.run(["git", "push", "-q", "origin", "HEAD"], cwd=work, check=True, capture_output=True)
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=work, check=True, capture_output=True, text=True).stdout
+
+
+def test_pins_heads_and_leaves_unreachable_repos_unpinned(tmp_path, capsys):
+    head = _bare_repo(tmp_path / "persona.git").strip()
+    rows = [
+        {"library_name": "lib", "github_link": f"file://{tmp_path}/persona.git"},
+        {"library_name": "lib", "github_link": f"file://{tmp_path}/missing.git"},
+    ]
+    assert pin_commits(rows) == [dict(rows[0], commit=head), rows[1]]
+    assert f"[WARN] leaving file://{tmp_path}/missing.git unpinned" in capsys.readouterr().out
+
+
+def test_manifest_round_trip_keeps_other_splits(tmp_path):
+    path = str(tmp_path / "manifest.json")
+    small = [{"library_name": "a", "github_link": "https://example.com/u/a", "commit": "1" * 40}]
+    large = [{"library_name": "b", "github_link": "https://example.com/u/b", "commit": "2" * 40}]
+    write_manifest(path, {"small": small, "large": []})
+    write_manifest(path, {"large": large})
+
+    with open(path) as f:
+        assert json.load(f)["dataset"] == "celinelee/minicode-repos"
+    assert dataset_rows("small", path) == small
+    assert dataset_rows("large", path) == large
+    with pytest.raises(KeyError):
+        dataset_rows("medium", path)
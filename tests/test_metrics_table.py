@@ -0,0 +1,54 @@
+"""Tests for the columnar metrics table."""
+
+import json
+import math
+
+from minicode.scoring.metrics_table import MetricsTable, summary_path, table_path, write_summary
+from minicode.scoring.static_metrics import METRIC_NAMES
+
+
+def _record(logprobs, tokens, value, imports=()):
+    metrics = dict.fromkeys(METRIC_NAMES, value) | {"internal_imports": list(imports)}
+    return {"logprobs": logprobs, "tokens": tokens, "metrics": metrics}
+
+
+def test_totals_skip_nans():
+    table = MetricsTable.from_records(
+        {
+            "a.py": _record(-1.5, 3, 2, ["x"]),
+            "b.py": _record(-2.0, 4, float("nan")),
+            "c.py": _record(-0.5, 1, 5, ["y", "z"]),
+            # checkpointed records keep only the number of imports
+            "d.py": {"logprobs": float("nan"), "tokens": 0, "metrics": {"internal_imports": 4}},
+        }
+    )
+    totals = table.totals()
+    assert totals["logprobs"] == -4.0
+    assert totals["tokens"] == 8 and isinstance(totals["tokens"], int)
+    assert totals["lloc"] == 7 and isinstance(totals["lloc"], int)
+    assert totals["internal_imports"] == 7
+
+
+def test_empty_totals_and_groups():
+    nan = float("nan")
+    table = MetricsTable.concat(
+        [
+            MetricsTable.from_records({"lib": _record(nan, nan, nan)}, group="library"),
+            MetricsTable.from_records({"p1": _record(-1.0, 2, 1), "p2": _record(-3.0, 2, 1)}, group="mains"),
+        ]
+    )
+    assert len(table) == 3
+    assert table.group("mains").programs == ["p1", "p2"]
+    assert math.isnan(table.group("library").total("logprobs", empty=nan))
+    assert table.group("library").total("tokens") == 0
+    assert table.totals(("logprobs", "cyclomatic"), empty=nan) == {"logprobs": -4.0, "cyclomatic": 2}
+
+
+def test_paths_and_summary(tmp_path):
+    output_file = tmp_path / "LIBRARYBENCH_metrics.json"
+    assert table_path(output_file) == str(tmp_path / "LIBRARYBENCH_metrics.parquet")
+    assert summary_path(output_file) == str(tmp_path / "LIBRARYBENCH_metrics.summary.json")
+
+    write_summary(summary_path(output_file), {"total_logprobs": float("nan"), "ratios": {"tokens": 1.5}})
+    with open(summary_path(output_file)) as f:
+        assert json.load(f) == {"total_logprobs": None, "ratios": {"tokens": 1.5}}
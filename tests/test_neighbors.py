@@ -0,0 +1,39 @@
+"""Tests for the approximate top-k neighbour clustering."""
+
+import random
+
+from minicode.grouping.neighbors import NeighborGraph, neighbor_clusters, tfidf_vectors, top_k_neighbors
+
+TOPICS = [
+    "csv parser for sales data reports",
+    "image resizing and thumbnail gallery",
+    "http server routing and middleware",
+]
+
+
+def _tasks(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choice(TOPICS[i % 3].split()) for _ in range(30)) for i in range(n)]
+
+
+def test_top_k_graph_is_sparse_and_symmetric():
+    graph = top_k_neighbors(tfidf_vectors(_tasks(60)), k=4, block_size=7)
+    assert graph.shape == (60, 60)
+    assert graph.nnz <= 2 * 60 * 4
+    assert (graph != graph.T).nnz == 0
+    assert graph.diagonal().sum() == 0
+    assert graph.max() <= 100
+
+
+def test_clusters_follow_topics():
+    clusters, graph = neighbor_clusters(_tasks(60), 3, n_neighbors=5)
+    assert sorted(len(cluster) for cluster in clusters) == [20, 20, 20]
+    assert all(len({i % 3 for i in cluster}) == 1 for cluster in clusters)
+    assert isinstance(graph, NeighborGraph)
+    assert graph.mean_distance(clusters[0]) < graph.mean_distance([0, 1, 2])
+    assert graph.mean_distance([5]) == float("inf")
+
+
+def test_degenerate_inputs():
+    clusters, _ = neighbor_clusters(["", "", "abc"], 2)
+    assert sorted(map(sorted, clusters)) == [[0, 1], [2]]
@@ -0,0 +1,27 @@
+"""Tests for the shared result summaries."""
+
+import math
+
+from minicode.scoring.checkpoint import Checkpoint
+from minicode.scoring.output import failed_programs, package_all_metrics, summarize
+from minicode.scoring.static_metrics import METRIC_NAMES
+
+
+def test_failed_files_are_left_out_of_the_totals(capsys):
+    checkpoint = Checkpoint()
+    metrics = dict.fromkeys(METRIC_NAMES, 1) | {"internal_imports": ["def f():\n    pass\n"]}
+    checkpoint.append("a.py", logprobs=-1.5, tokens=3, metrics=metrics)
+    checkpoint.append("b.py", logprobs=-2.5, tokens=4, metrics=metrics)
+    nan = float("nan")
+    checkpoint.append("bad.py", logprobs=nan, tokens=nan, metrics=metrics, error="RuntimeError: provider error")
+
+    logprobs, total_logprob, metrics_dict, total_tokens = summarize(checkpoint)
+    assert total_logprob == -4.0 and total_tokens == 7
+    assert failed_programs(checkpoint) == ["bad.py"]
+    assert "Failed Files: 1" in capsys.readouterr().out
+
+    tokens = {program: record["tokens"] for program, record in checkpoint.records.items()}
+    result = package_all_metrics(logprobs, metrics_dict, tokens)
+    assert result["total_logprobs"] == total_logprob and result["total_tokens"] == total_tokens
+    assert result["total_lloc"] == 3 and result["total_internal_imports"] == 3
+    assert math.isnan(result["bad.py"]["logprobs"])
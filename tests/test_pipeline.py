@@ -0,0 +1,37 @@
+"""Tests for the bounded streaming pipeline stages."""
+
+import time
+
+import pytest
+
+from minicode.scoring.pipeline import batched, bounded_map
+
+
+def test_bounded_map_applies_backpressure():
+    produced = []
+
+    def items():
+        for i in range(100):
+            produced.append(i)
+            yield i
+
+    stream = bounded_map(lambda x: x * 2, items(), maxsize=4)
+    assert next(stream) == 0
+    time.sleep(0.2)
+    # the producer is blocked on the full queue rather than running ahead
+    assert len(produced) <= 4 + 2
+    assert list(stream) == [x * 2 for x in range(1, 100)]
+
+
+def test_bounded_map_reraises_errors():
+    def fail(x):
+        if x == 3:
+            raise ValueError("boom")
+        return x
+
+    with pytest.raises(ValueError, match="boom"):
+        list(bounded_map(fail, range(10), maxsize=2))
+
+
+def test_batched():
+    assert list(batched(range(5), 2)) == [[0, 1], [2, 3], [4]]
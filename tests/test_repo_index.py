@@ -0,0 +1,33 @@
+"""Tests for the repository module/symbol index."""
+
+from minicode.scoring.repo_index import RepoIndex
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_resolves_nearest_module_and_reexports(tmp_path):
+    for persona in ["alice", "bob"]:
+        _write(tmp_path / persona / "pkg" / "__init__.py", "from pkg.impl import helper\n")
+        _write(tmp_path / persona / "pkg" / "impl.py", f"def helper():\n    return '{persona}'\n")
+    main = _write(tmp_path / "bob" / "main.py", "from pkg import helper\nfrom pkg import impl\n")
+
+    index = RepoIndex(tmp_path)
+    assert index.resolve_module("pkg", main) == (tmp_path / "bob" / "pkg" / "__init__.py").resolve()
+    # re-exported name resolves to the file that defines it, in the same persona
+    assert index.resolve_import("pkg", "helper", main) == ((tmp_path / "bob" / "pkg" / "impl.py").resolve(), False)
+    # imported submodule resolves to the whole module
+    assert index.resolve_import("pkg", "impl", main) == ((tmp_path / "bob" / "pkg" / "impl.py").resolve(), True)
+    assert index.resolve_module("missing", main) is None
+
+
+def test_third_party_names_do_not_resolve_to_local_definitions(tmp_path):
+    _write(tmp_path / "app" / "models.py", "class BaseModel:\n    pass\n")
+    main = _write(tmp_path / "app" / "main.py", "from pydantic import BaseModel\n")
+
+    index = RepoIndex(tmp_path)
+    assert index.find_symbol("BaseModel", main) == (tmp_path / "app" / "models.py").resolve()
+    assert index.resolve_import("pydantic", "BaseModel", main) == (None, False)
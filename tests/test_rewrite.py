@@ -0,0 +1,114 @@
+"""Tests for the single-pass, token-aware import rewriter."""
+
+import textwrap
+
+from minicode.setup.rewrite import RewriteRules, local_modules, rewrite_files, rewrite_source
+
+
+def _persona(tmp_path):
+    root = tmp_path / "alice"
+    (root / "core").mkdir(parents=True)
+    (root / ".git").mkdir()
+    for path in ("utils.py", "core/__init__.py", "core/engine.py", "sys.py"):
+        (root / path).write_text("")
+    return root
+
+
+def test_local_modules(tmp_path):
+    assert local_modules(str(_persona(tmp_path))) == {"utils", "core", "core.__init__", "core.engine", "sys"}
+
+
+def test_local_imports_move_under_the_persona(tmp_path):
+    rules = RewriteRules(
+        local=local_modules(str(_persona(tmp_path))), local_prefix="unified.alice", namespaced=("alice.", "unified.")
+    )
+    source = textwrap.dedent(
+        """\
+        import os, utils
+        import core.engine
+        import utils as u
+        from core.engine import run
+        from . import utils
+        from .core import engine
+        import sys  # a builtin: left alone
+        # import utils
+        S = "import utils"
+
+        def f():
+            import utils; from utils import x
+            return utils
+        """
+    )
+    assert rewrite_source(source, rules) == textwrap.dedent(
+        """\
+        import os, unified.alice.utils as utils
+        import unified.alice.core.engine as engine
+        import unified.alice.utils as u
+        from unified.alice.core.engine import run
+        from . import utils
+        from .core import engine
+        import sys  # a builtin: left alone
+        # import utils
+        S = "import utils"
+
+        def f():
+            import unified.alice.utils as utils; from unified.alice.utils import x
+            return utils
+        """
+    )
+
+
+def test_conftest_and_nested_package_rules():
+    nested = (("pkg", "pkg.pkg"),)
+    conftest = RewriteRules(renames=(("tests", "tests.alice"),), string_renames=nested, strip_pytest_plugins=True)
+    source = textwrap.dedent(
+        """\
+        import pytest
+        pytest_plugins = [
+            "tests.fixtures",
+        ]
+        from tests.fixtures.data import X
+        from tests import helpers
+        import tests.fixtures
+        TARGET = "pkg.mod.thing"
+        OTHER = "pkg"
+        if True:
+            pytest_plugins = "a"
+        """
+    )
+    assert rewrite_source(source, conftest) == textwrap.dedent(
+        """\
+        import pytest
+        from tests.alice.fixtures.data import X
+        from tests import helpers
+        import tests.alice.fixtures
+        TARGET = "pkg.pkg.mod.thing"
+        OTHER = "pkg"
+        if True:
+            pass
+        """
+    )
+
+    test_file = RewriteRules(renames=nested)
+    source = 'from pkg.mod import f\nimport pkg.mod, pkg\nfrom pkg import mod\nS = "pkg.mod"\n'
+    expected = 'from pkg.pkg.mod import f\nimport pkg.pkg.mod, pkg\nfrom pkg import mod\nS = "pkg.mod"\n'
+    assert rewrite_source(source, test_file) == expected
+
+
+def test_untokenizable_source_is_left_alone():
+    rules = RewriteRules(renames=(("tests", "tests.alice"),))
+    source = "from tests.x import (\n"
+    assert rewrite_source(source, rules) == source
+
+
+def test_rewrite_files_on_a_pool(tmp_path):
+    rules = RewriteRules(renames=(("tests", "tests.alice"),))
+    pairs = []
+    for idx in range(12):
+        src = tmp_path / f"src_{idx}.py"
+        src.write_text("from tests.helpers import h\n" if idx % 2 else "import os\n")
+        pairs.append((str(src), str(tmp_path / f"dst_{idx}.py")))
+
+    assert rewrite_files(pairs, rules, workers=2) == [bool(idx % 2) for idx in range(12)]
+    assert (tmp_path / "dst_1.py").read_text() == "from tests.alice.helpers import h\n"
+    assert (tmp_path / "dst_2.py").read_text() == "import os\n"
@@ -0,0 +1,85 @@
+"""Tests for the rate-limited logprob request scheduler."""
+
+from minicode.scoring.scheduler import (
+    AdaptiveConcurrency,
+    RequestFailed,
+    RequestScheduler,
+    ScheduledRequest,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitError(Exception):
+    status_code = 429
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock)  # one token per second
+    assert bucket.try_acquire(60) == 0.0
+    assert bucket.try_acquire(1) == 1.0
+    clock.now = 2.0
+    assert bucket.try_acquire(2) == 0.0
+
+
+def test_token_bucket_caps_oversized_requests():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock)
+    # larger than capacity: waits for a full bucket instead of forever
+    assert bucket.try_acquire(1000) == 0.0
+    assert bucket.try_acquire(1000) == 60.0
+
+
+def test_adaptive_concurrency_halves_on_throttle():
+    limiter = AdaptiveConcurrency(max_limit=8, initial=8)
+    limiter.on_throttle()
+    assert limiter.limit == 4
+    for _ in range(4):
+        limiter.on_success(0.1)
+    assert limiter.limit == 5
+
+
+def test_scheduler_dispatches_longest_first():
+    order = []
+    scheduler = RequestScheduler(lambda text: order.append(text) or len(text), max_concurrency=1)
+    requests = [ScheduledRequest(key=t, text=t, tokens=len(t)) for t in ["aa", "a", "aaaa", "aaa"]]
+    results = dict((r.key, result) for r, result in scheduler.map(requests))
+    assert order == ["aaaa", "aaa", "aa", "a"]
+    assert results == {"a": 1, "aa": 2, "aaa": 3, "aaaa": 4}
+
+
+def test_scheduler_retries_rate_limited_requests():
+    calls = []
+
+    def flaky(text):
+        calls.append(text)
+        if len(calls) == 1:
+            raise RateLimitError("slow down")
+        return text
+
+    scheduler = RequestScheduler(flaky, max_concurrency=4, base_backoff=0.01)
+    results = list(scheduler.map([ScheduledRequest(key=0, text="x", tokens=1)]))
+    assert [result for _, result in results] == ["x"]
+    assert len(calls) == 2
+    assert scheduler.concurrency.limit == 2
+
+
+def test_scheduler_reports_requests_that_keep_failing():
+    def fail_on_b(text):
+        if text == "b":
+            raise ValueError("bad request")
+        return text
+
+    scheduler = RequestScheduler(fail_on_b, max_concurrency=2, max_retries=2, base_backoff=0.0)
+    requests = [ScheduledRequest(key=t, text=t, tokens=1) for t in "abc"]
+    results = {r.key: result for r, result in scheduler.map(requests)}
+    assert results["a"] == "a" and results["c"] == "c"
+    assert isinstance(results["b"], RequestFailed) and str(results["b"]) == "ValueError: bad request"
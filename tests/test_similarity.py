@@ -0,0 +1,48 @@
+"""Tests for the batched TASK.md similarity matrix."""
+
+import itertools
+
+from thefuzz import fuzz
+
+from scipy.spatial.distance import squareform
+
+from minicode.grouping.similarity import condensed_similarity, read_task_strings, similarity_matrix
+
+TASKS = [
+    "Build a CSV parser for sales data.",
+    "build a csv PARSER for sales-data!",
+    "Résumé formatter with naïve templates",
+    "Data pipeline: extract, transform, load.",
+    "",
+    "pipeline data load transform extract",
+]
+
+
+def _pairwise(strings):
+    # the per-pair thefuzz computation the batched matrix replaces
+    n = len(strings)
+    matrix = [[0.0] * n for _ in range(n)]
+    for i, j in itertools.combinations(range(n), 2):
+        scores = [
+            scorer(strings[i], strings[j])
+            for scorer in (fuzz.ratio, fuzz.partial_ratio, fuzz.token_sort_ratio, fuzz.token_set_ratio)
+        ]
+        matrix[i][j] = matrix[j][i] = sum(scores) / len(scores)
+    return matrix
+
+
+def test_matches_pairwise_thefuzz():
+    expected = _pairwise(TASKS)
+    for block_size in (1, 2, 64):
+        assert similarity_matrix(TASKS, workers=1, block_size=block_size).tolist() == expected
+        assert condensed_similarity(TASKS, block_size=block_size).tolist() == squareform(expected).tolist()
+
+
+def test_reads_task_files(tmp_path):
+    paths = []
+    for i, task in enumerate(TASKS[:2]):
+        (tmp_path / f"p{i}").mkdir()
+        (tmp_path / f"p{i}" / "TASK.md").write_text(task)
+        paths.append(str(tmp_path / f"p{i}") + "/")
+    assert read_task_strings(paths) == TASKS[:2]
+    assert similarity_matrix([]).shape == (0, 0)
@@ -0,0 +1,54 @@
+"""Tests for the persistent TASK.md similarity cache."""
+
+import random
+
+import numpy as np
+
+from minicode.grouping.cache import SimilarityCache
+from minicode.grouping.similarity import condensed_similarity
+
+WORDS = "parse render cache graph queue node tree schedule retry export".split()
+
+
+def _task_strings(n, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(3, 25))) for _ in range(n)]
+
+
+def test_matches_uncached_similarity_across_runs(tmp_path, capsys):
+    path = str(tmp_path / "similarity.npz")
+    strings = _task_strings(24)
+
+    cache = SimilarityCache(path)
+    np.testing.assert_array_equal(cache.condensed(strings[:16], block_size=5), condensed_similarity(strings[:16]))
+    cache.save()
+
+    # a later run with new personas, listed in another order, only scores the new pairs
+    reloaded = SimilarityCache(path)
+    reordered = strings[::-1]
+    capsys.readouterr()
+    np.testing.assert_array_equal(reloaded.condensed(reordered), condensed_similarity(reordered))
+    assert f"Scoring {24 * 23 // 2 - 16 * 15 // 2} uncached pairs ({16 * 15 // 2} cached)" in capsys.readouterr().out
+
+    reloaded.save()
+    capsys.readouterr()
+    SimilarityCache(path).condensed(strings)
+    assert "Scoring" not in capsys.readouterr().out
+
+
+def test_evicts_least_recently_used_pairs(tmp_path):
+    path = str(tmp_path / "similarity.npz")
+    old, new = _task_strings(8, seed=1), _task_strings(6, seed=2)
+
+    cache = SimilarityCache(path)
+    cache.condensed(old)
+    cache.save()
+    cache = SimilarityCache(path, max_pairs=15)
+    cache.condensed(new)
+    cache.save()
+
+    reloaded = SimilarityCache(path)
+    assert len(reloaded) == 15
+    # only the hashes of the most recent run's personas are still referenced
+    assert len(reloaded.hashes) == 6
+    np.testing.assert_array_equal(reloaded.condensed(new), condensed_similarity(new))
@@ -0,0 +1,38 @@
+"""Tests for symbol-sliced conditioning context."""
+
+from minicode.scoring.repo_index import RepoIndex
+from minicode.scoring.slicer import ContextSlicer
+
+
+def _write(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return path
+
+
+def test_slice_follows_dependencies_across_files(tmp_path):
+    _write(tmp_path / "pkg" / "__init__.py", "")
+    _write(tmp_path / "pkg" / "consts.py", "OFFSET = 10\nOTHER = 1\n")
+    _write(
+        tmp_path / "pkg" / "impl.py",
+        "from pkg import consts\n\nSCALE = 3\n\n"
+        "def _inner(x):\n    return x * SCALE\n\n"
+        "def helper(x):\n    return _inner(x) + consts.OFFSET\n\n"
+        "def unused():\n    return 1\n",
+    )
+    main = _write(tmp_path / "main.py", "import pkg.impl\nfrom pkg.impl import helper\n\nhelper(1) + pkg.impl.helper(2)\n")
+
+    slicer = ContextSlicer(RepoIndex(tmp_path))
+    assert slicer.slice(main) == [
+        "OFFSET = 10",
+        "SCALE = 3",
+        "def _inner(x):\n    return x * SCALE",
+        "def helper(x):\n    return _inner(x) + consts.OFFSET",
+    ]
+    assert {path.name for path in slicer.files(main)} == {"consts.py", "impl.py"}
+
+
+def test_slice_star_import_and_cycles(tmp_path):
+    _write(tmp_path / "library.py", "def a():\n    return b()\n\ndef b():\n    return a()\n\ndef c():\n    pass\n")
+    main = _write(tmp_path / "p1" / "main.py", "from library import *\nprint(a())\n")
+    assert ContextSlicer(RepoIndex(tmp_path)).slice(main) == ["def b():\n    return a()", "def a():\n    return b()"]
@@ -0,0 +1,70 @@
+"""Tests for the parse-once source cache."""
+
+import ast
+import os
+
+import pytest
+
+from minicode.scoring.source_cache import SourceCache, SourceEntry
+
+SOURCES = {
+    "multiline": 'class Greeter:\n    """Says hi."""\n\n    def greet(self, name):\n        return f"hi {name}"\n',
+    "non_ascii": 'def café(naïve="ünïcode"):\n    """Ça marche — 日本語."""\n    return {"ключ": naïve}  # ✓\n',
+    "crlf": "def f(\r\n    x,\r\n):\r\n    return x  # é\r\n",
+    "nested": "def outer():\n    def inner(ß):\n        return ß\n    return inner\n",
+}
+
+
+@pytest.mark.parametrize("name", sorted(SOURCES))
+def test_segments_match_ast_get_source_segment(tmp_path, name):
+    path = tmp_path / f"{name}.py"
+    path.write_bytes(SOURCES[name].encode())
+    entry = SourceEntry(path, path.read_text(encoding="utf-8"))
+    nodes = [node for node in ast.walk(entry.tree) if hasattr(node, "end_col_offset")]
+    assert nodes
+    for node in nodes:
+        assert entry.segment(node) == ast.get_source_segment(entry.text, node)
+
+
+def _bump(path, text):
+    """Rewrite `path` and move its mtime, so the change is seen even within the filesystem's mtime granularity."""
+    mtime = os.stat(path).st_mtime_ns
+    path.write_text(text)
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+
+
+def test_entries_are_reused_until_mtime_or_size_change(tmp_path):
+    path = tmp_path / "mod.py"
+    path.write_text("x = 1\n")
+    cache = SourceCache()
+    entry = cache.get(path)
+    assert cache.get(str(path)) is entry
+
+    _bump(path, "x = 2\n")  # same size, new mtime
+    changed = cache.get(path)
+    assert changed is not entry and changed.text == "x = 2\n"
+
+    mtime = os.stat(path).st_mtime_ns
+    path.write_text("x = 300\n")
+    os.utime(path, ns=(mtime, mtime))  # same mtime, new size
+    assert cache.text(path) == "x = 300\n"
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    paths = []
+    for name in "abc":
+        paths.append(tmp_path / f"{name}.py")
+        paths[-1].write_text(f"{name} = 1\n")
+    a, b, c = paths
+    cache = SourceCache(max_entries=2)
+    first_a = cache.get(a)
+    cache.get(b)
+    assert cache.get(a) is first_a  # a is now the most recently used
+    cache.get(c)  # evicts b
+    assert len(cache) == 2
+    assert cache.get(a) is first_a
+    first_c = cache.get(c)
+    cache.get(b)  # reloaded, evicting a
+    assert cache.get(c) is first_c
+    assert cache.get(a) is not first_a
@@ -0,0 +1,55 @@
+"""Tests for the pooled static (radon) metrics."""
+
+import math
+
+import pytest
+
+from minicode.scoring import static_metrics
+from minicode.scoring.static_metrics import (
+    MIN_PARALLEL_FILES,
+    compute_cluster_code_metrics,
+    compute_code_metrics,
+    stream_code_metrics,
+)
+
+SOURCES = [
+    "def f(x):\n    if x:\n        return 1\n    return 2\n",
+    "# comment\n\nx = 1\n",
+    "def broken(:\n    pass\n",  # unparseable
+    "",
+    '"""doc"""\nclass A:\n    def m(self):\n        for i in range(3):\n            pass\n',
+]
+
+
+def _nan_safe(metrics: dict) -> dict:
+    return {name: "nan" if isinstance(value, float) and math.isnan(value) else value for name, value in metrics.items()}
+
+
+@pytest.mark.parametrize("metrics_fn", [compute_code_metrics, compute_cluster_code_metrics])
+def test_pooled_metrics_equal_inline_ones(monkeypatch, metrics_fn):
+    monkeypatch.setattr(static_metrics, "cpu_count", lambda: 2)
+    codes = (SOURCES * MIN_PARALLEL_FILES)[: 2 * MIN_PARALLEL_FILES + 3]
+    results = list(stream_code_metrics(enumerate(codes), metrics_fn, processes=2, batch_size=2 * MIN_PARALLEL_FILES))
+    assert [payload for payload, _, _ in results] == list(range(len(codes)))
+    for (_, code, metrics), expected in zip(results, codes):
+        assert code == expected
+        assert _nan_safe(metrics) == _nan_safe(metrics_fn(code))
+    assert all(math.isnan(value) for value in compute_code_metrics(SOURCES[2]).values())
+
+
+def test_pool_starts_before_the_stream_is_read(monkeypatch):
+    events = []
+    real_pool = static_metrics.Pool
+
+    def pool(*args, **kwargs):
+        events.append("pool")
+        return real_pool(*args, **kwargs)
+
+    def items():
+        events.append("read")
+        yield from enumerate(SOURCES)
+
+    monkeypatch.setattr(static_metrics, "cpu_count", lambda: 2)
+    monkeypatch.setattr(static_metrics, "Pool", pool)
+    assert len(list(stream_code_metrics(items(), compute_code_metrics, processes=2))) == len(SOURCES)
+    assert events == ["pool", "read"]
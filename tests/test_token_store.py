@@ -0,0 +1,50 @@
+"""Tests for the per-token logprob store."""
+
+import numpy as np
+
+from minicode.scoring.token_store import TokenLogprobs, TokenStore, token_store_path
+
+
+def test_round_trip_and_totals(tmp_path):
+    path = tmp_path / "out.logprobs.npz"
+    store = TokenStore()
+    store.add("a.py", 0, 2, [-1.0, -2.0, -0.5, -0.25], ["ctx", "\n", "def", " f"])
+    store.add("a.py", 1, 1, [-3.0, -1.0], ["def", " g"])
+    store.add("b.py", 0, 0, [-4.0], ["x"])
+    store.save(path)
+
+    data = TokenLogprobs.load(path)
+    assert len(data) == 3
+    assert data.logprobs.dtype == np.float16 and data.token_ids.dtype == np.int32
+    assert data.program_totals() == {"a.py": (-1.75, 3), "b.py": (-4.0, 1)}
+    # other context cut points are re-aggregated from the same arrays
+    assert data.program_totals(context=np.zeros(3, dtype=int)) == {"a.py": (-7.75, 6), "b.py": (-4.0, 1)}
+
+    [(start, logprobs, tokens), _] = data.requests("a.py")
+    assert start == 2
+    assert tokens == ["ctx", "\n", "def", " f"]
+    assert logprobs.tolist() == [-1.0, -2.0, -0.5, -0.25]
+
+
+def test_save_carries_over_earlier_files(tmp_path):
+    path = token_store_path(tmp_path / "out.json")
+    first = TokenStore()
+    first.add("a.py", 0, 0, [-1.0], ["a"])
+    first.add("stale.py", 0, 0, [-2.0], ["s"])
+    first.save(path)
+
+    # a resumed run only scores b.py; a.py comes from the earlier store
+    second = TokenStore()
+    second.add("b.py", 0, 0, [-3.0], ["b"])
+    second.save(path, keep={"a.py"})
+    assert TokenLogprobs.load(path).program_totals() == {"a.py": (-1.0, 1), "b.py": (-3.0, 1)}
+
+
+def test_save_reports_carried_files_missing_from_the_store(tmp_path, capsys):
+    path = token_store_path(tmp_path / "out.json")
+    store = TokenStore()
+    store.add("b.py", 0, 0, [-3.0], ["b"])
+    # the earlier run checkpointed a.py but never saved its store
+    store.save(path, keep={"a.py"})
+    assert "[WARN] 1 resumed or reused files have no token logprobs" in capsys.readouterr().out
+    assert TokenLogprobs.load(path).programs == ["b.py"]
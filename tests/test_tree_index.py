@@ -0,0 +1,70 @@
+"""Tests for the shared scandir tree index."""
+
+import os
+
+from minicode.scoring.layouts import LargeRepoLayout
+from minicode.scoring.tree_index import TreeIndex, tree_index
+
+
+def _tree(root):
+    for path in (
+        "pkg/__init__.py",
+        "pkg/sub/mod.py",
+        "pkg/__pycache__/mod.py",
+        "main.py",
+        ".venv/lib/site.py",
+        ".git/hooks/hook.py",
+        "docs/readme.txt",
+    ):
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_text("")
+    return root
+
+
+def _age(root, seconds=60):
+    """Backdate every directory, so a cached index of the tree is not racily clean."""
+    for dirpath, _, _ in os.walk(root):
+        st = os.stat(dirpath)
+        os.utime(dirpath, ns=(st.st_atime_ns, st.st_mtime_ns - seconds * 10**9))
+
+
+def test_index_prunes_ignored_dirs_and_keeps_the_callers_paths(tmp_path):
+    root = _tree(tmp_path / "lib")
+    index = TreeIndex(root)
+    assert index.python_files() == [root / "main.py", root / "pkg" / "__init__.py", root / "pkg" / "sub" / "mod.py"]
+    rel = os.path.relpath(root / "pkg")
+    assert [str(p) for p in index.directories(rel)] == [rel, os.path.join(rel, "sub")]
+    assert index.is_package(root / "pkg") and not index.is_package(root / "pkg" / "sub")
+    assert index.has_python(root / "pkg" / "sub") and not index.has_python(root / "docs")
+    assert not index.has_python(root / "missing")
+
+
+def test_cached_index_is_reused_until_a_directory_changes(tmp_path):
+    root = _tree(tmp_path / "lib")
+    first = tree_index(root)
+    assert tree_index(root) is not first  # just written: racily clean, so rescanned
+
+    _age(root)
+    cached = tree_index(root)
+    assert tree_index(root) is cached
+
+    (root / "pkg" / "sub" / "new.py").write_text("")
+    rescanned = tree_index(root)
+    assert rescanned is not cached
+    assert root / "pkg" / "sub" / "new.py" in rescanned.python_files()
+
+
+def test_large_repo_programs_skip_unified_by_path_component(tmp_path):
+    root = _tree(tmp_path / "lib")
+    (root / "unified" / "pkg").mkdir(parents=True)
+    (root / "unified" / "pkg" / "mod.py").write_text("")
+    (root / "pkg" / "unified_helpers.py").write_text("")
+    (root / "pkg" / "test_mod.py").write_text("")
+
+    layout = LargeRepoLayout(root, None, skip_unified=True, condition_on_codebank=False)
+    assert sorted(layout.programs()) == [
+        "lib/main.py",
+        "lib/pkg/__init__.py",
+        "lib/pkg/sub/mod.py",
+        "lib/pkg/unified_helpers.py",
+    ]